@@ -0,0 +1,211 @@
+import argparse
+import glob
+import mmap
+import os
+import struct
+import time
+import pygame
+
+
+
+class SpriteAtlas:
+    '''
+    Кэш спрайтов игры. Каждое изображение загружается с диска один раз,
+    каждый его поворот строится один раз и, если дисплей уже создан,
+    сразу приводится к формату дисплея через convert_alpha().
+    Все объекты получают одни и те же общие поверхности, поэтому появление
+    врагов и улучшение сооружений ничего не выделяют, а вывод на екран
+    не тратит время на преобразование формата пикселей.
+    Общий на весь процесс атлас ATLAS переживает перезапуск игры,
+    а изображения можно заранее загрузить из пакета спрайтов (см. pack_bundle)
+
+    Attributes:
+        images (dict): путь -> изображение в исходном виде
+        surfaces (dict): (путь, угол) -> готовая к выводу поверхность
+        display_format (bool): истина если последняя поверхность приведена к формату дисплея
+        pending (set): ключи поверхностей, подготовленных без дисплея
+        bundles (list): открытые пакеты спрайтов, их память используют изображения
+    '''
+    def __init__(self) -> None:
+
+        self.images:dict[str, pygame.Surface] = {}
+        self.surfaces:dict[tuple, pygame.Surface] = {}
+        self.display_format = pygame.display.get_surface() is not None
+        self.pending:set[tuple] = set()
+        self.bundles:list[mmap.mmap] = []
+
+
+    def load(self, path: str) -> pygame.Surface:
+        '''
+        Returns:
+            pygame.Surface: изображение из файла в исходном виде
+        '''
+        image = self.images.get(path)
+        if image is None:
+            image = pygame.image.load(path)
+            self.images[path] = image
+        return image
+
+
+    def prepare(self, image: pygame.Surface, angle: int) -> pygame.Surface:
+        '''
+        Поворот изображения и приведение к формату дисплея если он есть
+        '''
+        if angle:
+            image = pygame.transform.rotate(image, angle)
+        self.display_format = pygame.display.get_surface() is not None
+        if self.display_format:
+            image = image.convert_alpha()
+        return image
+
+
+    def get(self, path: str, angle: int = 0) -> pygame.Surface:
+        '''
+        Args:
+            path (str): путь к изображению
+            angle (int): угол поворота в градусах против часовой стрелки
+
+        Returns:
+            pygame.Surface: общая поверхность для этого изображения и угла
+        '''
+        key = (path, angle)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.prepare(self.load(path), angle)
+            self.surfaces[key] = surface
+            if not self.display_format:
+                self.pending.add(key)
+        return surface
+
+
+    def get_list(self, img_path: str, count: int, angle: int = 0) -> list:
+        '''
+        Args:
+            img_path (str): путь к директории со спрайтами 1.png ... count.png
+            count (int): количество спрайтов
+            angle (int): угол поворота в градусах
+
+        Returns:
+            list: список общих поверхностей
+        '''
+        return [self.get(f"{img_path}{i}.png", angle) for i in range(1, count + 1)]
+
+
+    def convert(self) -> None:
+        '''
+        Приводит поверхности, подготовленные до создания дисплея,
+        к формату дисплея. Объекты, которые получили поверхности раньше,
+        нужно создать заново, чтобы они их увидели
+        '''
+        if not self.pending or pygame.display.get_surface() is None:
+            return
+        for (path, angle) in self.pending:
+            self.surfaces[(path, angle)] = self.prepare(self.load(path), angle)
+        self.pending.clear()
+
+
+    def load_bundle(self, path: str) -> int:
+        '''
+        Загрузка изображений из пакета спрайтов без декодирования PNG.
+        Файл отображается в память, изображения используют эту память напрямую.
+        Изображение берется из пакета, только если его PNG не менялся
+        после упаковки или отсутствует
+        Args:
+            path (str): путь к пакету
+
+        Returns:
+            int: количество загруженных изображений
+        '''
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, count = BUNDLE_HEADER.unpack_from(data)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            data.close()
+            raise ValueError(f"{path} is not a sprite bundle of version {BUNDLE_VERSION}")
+        view = memoryview(data)
+        position = BUNDLE_HEADER.size
+        loaded = 0
+        for _ in range(count):
+            name_size, width, height, offset, size, mtime = BUNDLE_ENTRY.unpack_from(data, position)
+            position += BUNDLE_ENTRY.size
+            name = bytes(view[position:position + name_size]).decode()
+            position += name_size
+            if name in self.images or not bundle_fresh(name, mtime):
+                continue
+            image = pygame.image.frombuffer(view[offset:offset + size], (width, height), "RGBA")
+            self.images[name] = image
+            loaded += 1
+        self.bundles.append(data)
+        return loaded
+
+
+
+BUNDLE = "src/sprites.bundle"
+BUNDLE_MAGIC = b"TDSB"
+BUNDLE_VERSION = 1
+# метка, версия, количество изображений
+BUNDLE_HEADER = struct.Struct("<4sBI")
+# длина пути, ширина, высота, смещение пикселей, их размер, mtime PNG в нс
+BUNDLE_ENTRY = struct.Struct("<HHHQQq")
+
+
+def bundle_fresh(name: str, mtime: int) -> bool:
+    '''
+    Returns:
+        bool: истина если PNG отсутствует или не менялся после упаковки
+    '''
+    try:
+        return os.stat(name).st_mtime_ns == mtime
+    except OSError:
+        return True
+
+
+def pack_bundle(path: str, root: str = "src") -> int:
+    '''
+    Упаковка всех PNG из директории root в один файл пикселей RGBA.
+    Формат: заголовок BUNDLE_HEADER, записи BUNDLE_ENTRY с путем к PNG,
+    затем пиксели всех изображений подряд
+    Args:
+        path (str): путь к создаваемому пакету
+        root (str): директория со спрайтами
+
+    Returns:
+        int: количество упакованных изображений
+    '''
+    to_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+    names = sorted(glob.glob(os.path.join(root, "**", "*.png"), recursive=True))
+    entries = []
+    pixels = []
+    for name in names:
+        image = pygame.image.load(name)
+        pixels.append(to_bytes(image, "RGBA"))
+        entries.append((name.replace(os.sep, "/").encode(), image.get_size(), os.stat(name).st_mtime_ns))
+    offset = BUNDLE_HEADER.size + sum(BUNDLE_ENTRY.size + len(entry[0]) for entry in entries)
+    with open(path, "wb") as file:
+        file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(entries)))
+        for (name, (width, height), mtime), data in zip(entries, pixels):
+            file.write(BUNDLE_ENTRY.pack(len(name), width, height, offset, len(data), mtime))
+            file.write(name)
+            offset += len(data)
+        for data in pixels:
+            file.write(data)
+    return len(entries)
+
+
+# общий на весь процесс атлас, все игры процесса получают из него одни и те же поверхности
+ATLAS = SpriteAtlas()
+
+
+def main(argv: list = None) -> None:
+
+    parser = argparse.ArgumentParser(description="Упаковка спрайтов игры в один файл")
+    parser.add_argument("path", nargs="?", default=BUNDLE, help="создаваемый пакет")
+    parser.add_argument("--root", default="src", help="директория со спрайтами")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    count = pack_bundle(args.path, args.root)
+    print(f"packed {count} sprites into {args.path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
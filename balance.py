@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from simulation import Simulation
+from snapshot import load
+
+'''
+Пакетный прогон безголовых игр для оценки баланса.
+Каждая игра получает свой seed и сценарий постройки сооружений,
+игры распределяются по процессам через ProcessPoolExecutor,
+а результаты сводятся в таблицу по сценариям
+
+Пример:
+    python balance.py --games 2000 --policy line --policy upgrade --workers 8
+'''
+
+# места для сооружений вдоль дороги, от крепости к краю экрана
+SLOTS = [(x, y) for x in range(250, 1000, 70) for y in (242, 462)]
+
+
+def free_slot(game: Simulation) -> tuple:
+    '''
+    Returns:
+        tuple: первое свободное место для сооружения или None
+    '''
+    for x, y in SLOTS:
+        if game.defenses.unit_at((x, y)) is None:
+            return (x, y)
+    return None
+
+
+def policy_none(game: Simulation) -> None:
+    '''
+    Сценарий без сооружений, показывает скорость роста волн
+    '''
+
+
+def policy_line(game: Simulation) -> None:
+    '''
+    Сценарий: строить новое сооружение в первом свободном месте,
+    как только хватает денег
+    '''
+    slot = free_slot(game)
+    if slot is not None:
+        game.click(Simulation.LEFT, slot)
+
+
+def policy_upgrade(game: Simulation, towers: int = 4) -> None:
+    '''
+    Сценарий: построить несколько сооружений,
+    а затем улучшать самое слабое из них
+    '''
+    defenses = game.defenses.defenses
+    if len(defenses) < towers:
+        policy_line(game)
+        return
+    weakest = min(defenses, key=lambda unit: unit.level)
+    game.click(Simulation.LEFT, weakest.sprite_rect.center)
+
+
+POLICIES = {
+    "none": policy_none,
+    "line": policy_line,
+    "upgrade": policy_upgrade,
+    }
+
+
+def run_game(task: tuple) -> dict:
+    '''
+    Одна безголовая игра до разрушения крепости или до max_ticks тиков.
+    Случайные числа задаются seed игры, поэтому результат воспроизводим.
+    Если задан снимок, игра начинается с его состояния, а генератор
+    случайных чисел снимка заменяется генератором с seed игры
+    Args:
+        task (tuple): (seed, название сценария, max_ticks, sample_every)
+        или (seed, название сценария, max_ticks, sample_every, путь к снимку)
+
+    Returns:
+        dict: seed, policy, ticks, score, level, money и кривая денег money_curve
+    '''
+    seed, policy_name, max_ticks, sample_every = task[:4]
+    snapshot = task[4] if len(task) > 4 else None
+    policy = POLICIES[policy_name]
+    if snapshot is None:
+        game = Simulation(seed=seed)
+    else:
+        game = load(snapshot)
+        game.seed = seed
+        game.rng.seed(seed)
+    start = game.ticks
+    money_curve = []
+    decide_every = Simulation.TICK_RATE
+    while game.ticks - start < max_ticks and not game.is_over():
+        if (game.ticks - start) % decide_every == 0:
+            policy(game)
+        game.step()
+        if (game.ticks - start) % sample_every == 0:
+            money_curve.append(game.statistic.money)
+    return {
+        "seed": seed,
+        "policy": policy_name,
+        "ticks": game.ticks,
+        "survived": not game.is_over(),
+        "score": game.statistic.score,
+        "level": game.statistic.level,
+        "money": game.statistic.money,
+        "towers": len(game.defenses.defenses),
+        "money_curve": money_curve,
+        }
+
+
+def run_batch(
+            games: int,
+            policies: list,
+            seed: int = 0,
+            max_ticks: int = 15000,
+            sample_every: int = 250,
+            workers: int = None,
+            snapshot: str = None
+            ) -> list:
+    '''
+    Прогон games игр для каждого сценария.
+    Сценарии играются на одних и тех же seed, чтобы их можно было сравнивать
+    Args:
+        games (int): количество игр на сценарий
+        policies (list): названия сценариев из POLICIES
+        seed (int): seed первой игры
+        max_ticks (int): наибольшая длина игры в тиках
+        sample_every (int): период записи денег в тиках
+        workers (int): количество процессов, 1 чтобы играть в текущем процессе
+        snapshot (str): путь к снимку, с которого начинается каждая игра
+
+    Returns:
+        list: результаты run_game
+    '''
+    tasks = [
+        (seed + i, name, max_ticks, sample_every, snapshot)
+        for name in policies for i in range(games)]
+    if workers == 1:
+        return [run_game(task) for task in tasks]
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_game, tasks, chunksize=chunksize))
+
+
+def summarize(results: list) -> dict:
+    '''
+    Сводка результатов по сценариям
+    Returns:
+        dict: сценарий -> средние и перцентили времени жизни, очков и уровня,
+        средняя кривая денег по играм которые еще шли в момент записи
+    '''
+    summary = {}
+    for name in dict.fromkeys(result["policy"] for result in results):
+        group = [result for result in results if result["policy"] == name]
+        seconds = np.array([result["ticks"] for result in group]) / Simulation.TICK_RATE
+        score = np.array([result["score"] for result in group])
+        level = np.array([result["level"] for result in group])
+        length = max(len(result["money_curve"]) for result in group)
+        money_curve = []
+        for i in range(length):
+            values = [result["money_curve"][i] for result in group if len(result["money_curve"]) > i]
+            money_curve.append(float(np.mean(values)))
+        summary[name] = {
+            "games": len(group),
+            "survived": sum(result["survived"] for result in group),
+            "seconds_mean": float(seconds.mean()),
+            "seconds_p10": float(np.percentile(seconds, 10)),
+            "seconds_p50": float(np.percentile(seconds, 50)),
+            "seconds_p90": float(np.percentile(seconds, 90)),
+            "score_mean": float(score.mean()),
+            "score_p50": float(np.percentile(score, 50)),
+            "level_mean": float(level.mean()),
+            "level_max": int(level.max()),
+            "money_curve": money_curve,
+            }
+    return summary
+
+
+def format_table(summary: dict, sample_every: int = 250) -> str:
+    '''
+    Returns:
+        str: сводка в виде текстовой таблицы
+    '''
+    header = (
+        f"{'policy':<10}{'games':>7}{'alive':>7}"
+        f"{'time p10':>10}{'time p50':>10}{'time p90':>10}"
+        f"{'score':>11}{'level':>7}{'max lvl':>8}")
+    rows = [header, "-" * len(header)]
+    for name, row in summary.items():
+        rows.append(
+            f"{name:<10}{row['games']:>7}{row['survived']:>7}"
+            f"{row['seconds_p10']:>9.1f}s{row['seconds_p50']:>9.1f}s{row['seconds_p90']:>9.1f}s"
+            f"{row['score_mean']:>11.0f}{row['level_mean']:>7.2f}{row['level_max']:>8}")
+    rows.append("")
+    rows.append(f"money every {sample_every / Simulation.TICK_RATE:.0f}s (mean over games still running)")
+    for name, row in summary.items():
+        curve = " ".join(f"{money:.0f}" for money in row["money_curve"])
+        rows.append(f"{name:<10}{curve}")
+    return "\n".join(rows)
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Monte Carlo прогон игр для оценки баланса")
+    parser.add_argument("--games", type=int, default=200, help="игр на каждый сценарий")
+    parser.add_argument(
+                        "--policy",
+                        action="append",
+                        choices=sorted(POLICIES),
+                        help="сценарий постройки, можно указать несколько раз")
+    parser.add_argument("--seed", type=int, default=0, help="seed первой игры")
+    parser.add_argument("--max-ticks", type=int, default=15000, help="наибольшая длина игры в тиках")
+    parser.add_argument("--sample-every", type=int, default=250, help="период записи денег в тиках")
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов")
+    parser.add_argument("--json", default=None, help="файл для сохранения всех результатов")
+    parser.add_argument(
+                        "--snapshot",
+                        default=None,
+                        help="снимок игры из snapshot.py, с которого начинается каждая игра")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> None:
+
+    args = parse_args(argv)
+    policies = args.policy or sorted(POLICIES)
+    start = time.perf_counter()
+    results = run_batch(
+                    args.games,
+                    policies,
+                    args.seed,
+                    args.max_ticks,
+                    args.sample_every,
+                    args.workers,
+                    args.snapshot)
+    elapsed = time.perf_counter() - start
+    summary = summarize(results)
+    print(format_table(summary, args.sample_every))
+    print(f"\n{len(results)} games in {elapsed:.1f}s ({len(results) / elapsed:.1f} games/s)")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"summary": summary, "results": results}, file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+import pygame
+from characters import Defense
+from flowfield import GameMap
+from simulation import Simulation
+from render import StaticLayer
+
+'''
+Набор замеров скорости горячих участков игры.
+Каждый замер запускается на нескольких масштабах (от 10 до 100k врагов
+и от 1 до 1k сооружений) с видеодрайвером SDL dummy, результаты сохраняются
+в JSON как опорные, а последующие прогоны сравниваются с ними и завершаются
+с ошибкой, если какой-то замер стал медленнее больше чем на tolerance процентов
+
+Пример:
+    python benchmark.py --save             # записать опорные результаты
+    python benchmark.py --tolerance 15     # сравнить с ними
+    python benchmark.py --quick --filter Enemies
+'''
+
+ENEMIES = (10, 100, 1000, 10000, 100000)
+TOWERS = (1, 10, 100, 1000)
+QUICK_ENEMIES = (10, 1000)
+QUICK_TOWERS = (1, 100)
+BASELINE = "bench_baseline.json"
+MAP = "src/maps/fork.txt"
+
+
+def make_screen() -> pygame.Surface:
+    '''
+    Returns:
+        pygame.Surface: экран на видеодрайвере dummy
+    '''
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.get_surface()
+    if screen is None:
+        screen = pygame.display.set_mode((1000, 600))
+    return screen
+
+
+def make_game(enemies: int = 0, towers: int = 0, seed: int = 0) -> Simulation:
+    '''
+    Игра с заданным количеством врагов на дороге и сооружений вдоль нее.
+    Враги получают огромное здоровье и почти нулевую скорость,
+    чтобы состав игры не менялся между повторами замера
+    Args:
+        enemies (int): количество врагов
+        towers (int): количество сооружений
+        seed (int): seed игры
+
+    Returns:
+        Simulation: подготовленная игра
+    '''
+    game = Simulation(1000, make_screen(), seed=seed)
+    rnd = np.random.default_rng(seed)
+    store = game.enemies.enemies
+    top, bottom = game.road.get_y_range
+    store.reserve(enemies)
+    for i in range(enemies):
+        x = rnd.uniform(250, 1000)
+        y = rnd.uniform(top, bottom)
+        store.append(
+            x=x,
+            prev_x=x,
+            y=y,
+            prev_y=y,
+            health=1e12,
+            total_health=1e12,
+            speed=1e-9,
+            damage=10,
+            money=2,
+            sprite=i % len(game.enemies.sprites),
+            uid=i)
+    game.enemies.next_uid = enemies
+    game.enemies.grid_dirty = True
+    defenses = game.defenses
+    for i in range(towers):
+        x = 250 + (i * 70) % 750
+        y = top - 35 - 70 * ((i // 11) % 3) if i % 2 else bottom + 35 + 70 * ((i // 11) % 2)
+        defenses.add(Defense(x, y, defenses.sprites, game.road.y, defenses.flipped_sprites))
+    return game
+
+
+def bench_enemies_move(n: int):
+
+    game = make_game(enemies=n)
+    return game.enemies.move
+
+
+def bench_enemies_move_map(n: int):
+    '''
+    Движение врагов по полю направлений карты: враги стоят в случайных
+    клетках дороги и почти не двигаются, как в make_game
+    '''
+    game = Simulation(screen=make_screen(), seed=0, game_map=GameMap.load(MAP))
+    game_map = game.road.map
+    rnd = np.random.default_rng(0)
+    rows, cols = np.nonzero(game_map.road & (game_map.field.distance > 0))
+    pick = rnd.integers(0, len(rows), n)
+    x = (cols[pick] + rnd.uniform(0, 1, n)) * game_map.cell
+    y = (rows[pick] + rnd.uniform(0, 1, n)) * game_map.cell
+    game.enemies.enemies.extend(
+                            n,
+                            x=x,
+                            prev_x=x,
+                            y=y,
+                            prev_y=y,
+                            health=1e12,
+                            total_health=1e12,
+                            speed=1e-9,
+                            damage=10,
+                            money=2,
+                            sprite=np.arange(n) % len(game.enemies.sprites),
+                            uid=np.arange(n))
+    return game.enemies.move
+
+
+def bench_grid_rebuild(n: int):
+
+    enemies = make_game(enemies=n).enemies
+    store = enemies.enemies
+    return lambda: enemies.grid.rebuild(store.x, store.y)
+
+
+def bench_defenses_fire(n: int):
+    '''
+    Выстрел одного готового сооружения, снаряд сразу убирается
+    '''
+    game = make_game(enemies=n, towers=1)
+    defenses = game.defenses
+    unit = defenses.defenses[0]
+    projectiles = defenses.projectiles
+    def run():
+        unit.wait = 0
+        defenses.fire()
+        projectiles.store.clear()
+    return run
+
+
+def bench_projectile_impact(n: int, splash: float):
+    '''
+    Попадание одного снаряда, уже долетевшего до врага 0:
+    splash=0 только по цели, иначе по всем врагам в радиусе splash
+    '''
+    game = make_game(enemies=n)
+    enemies = game.enemies
+    store = enemies.enemies
+    projectiles = game.defenses.projectiles
+    x, y = store.x[:1].copy(), store.y[:1].copy()
+    def run():
+        projectiles.launch(
+                        x, y, np.array([0]), np.array([1.0]), np.array([True]),
+                        splash=np.array([splash], dtype=np.float32))
+        projectiles.update()
+    return run
+
+
+def bench_enemies_spawn(n: int):
+
+    game = make_game(enemies=n)
+    enemies = game.enemies
+    store = enemies.enemies
+    def run():
+        size = store.size
+        enemies.spawn()
+        store.size = size
+    return run
+
+
+def bench_defenses_update(towers: int, n: int):
+
+    game = make_game(enemies=n, towers=towers)
+    defenses = game.defenses
+    def run():
+        for unit in defenses.defenses:
+            unit.wait = 0
+        defenses.update()
+    return run
+
+
+def bench_defenses_drow(towers: int):
+
+    defenses = make_game(towers=towers).defenses
+    defenses.drow()
+    return defenses.drow
+
+
+def bench_unit_at(towers: int):
+
+    defenses = make_game(towers=towers).defenses
+    position = defenses.defenses[-1].sprite_rect.center
+    return lambda: defenses.unit_at(position)
+
+
+def bench_static_layer(towers: int):
+
+    game = make_game(towers=towers)
+    layer = StaticLayer(game.screen.get_size(), (50,205,50))
+    layer.drow(game)
+    return lambda: layer.drow(game)
+
+
+def bench_enemies_drow(n: int):
+
+    return make_game(enemies=n).enemies.drow
+
+
+def bench_statistic_drow(changing: bool):
+
+    game = make_game()
+    statistic = game.statistic
+    screen = game.screen
+    statistic.drow(screen)
+    if not changing:
+        return lambda: statistic.drow(screen)
+    def run():
+        statistic.score += 1
+        statistic.drow(screen)
+    return run
+
+
+def benchmarks(quick: bool = False) -> list:
+    '''
+    Returns:
+        list: пары (имя замера, функция подготовки без аргументов)
+    '''
+    enemies = QUICK_ENEMIES if quick else ENEMIES
+    towers = QUICK_TOWERS if quick else TOWERS
+    found = []
+    for n in enemies:
+        found.append((f"Enemies.move[enemies={n}]", lambda n=n: bench_enemies_move(n)))
+        found.append((f"Enemies.move[map,enemies={n}]", lambda n=n: bench_enemies_move_map(n)))
+        found.append((f"SpatialGrid.rebuild[enemies={n}]", lambda n=n: bench_grid_rebuild(n)))
+        found.append((f"Defenses.fire[towers=1,enemies={n}]", lambda n=n: bench_defenses_fire(n)))
+        found.append((f"Enemies.spawn[enemies={n}]", lambda n=n: bench_enemies_spawn(n)))
+        for splash in (0, 60):
+            found.append((
+                f"Projectiles.update[splash={splash},enemies={n}]",
+                lambda n=n, splash=splash: bench_projectile_impact(n, splash)))
+        if n <= 10000:
+            found.append((f"Enemies.drow[enemies={n}]", lambda n=n: bench_enemies_drow(n)))
+    for t in towers:
+        for n in enemies:
+            if t * n <= 10**7:
+                found.append((
+                    f"Defenses.update[towers={t},enemies={n}]",
+                    lambda t=t, n=n: bench_defenses_update(t, n)))
+        found.append((f"Defenses.drow[towers={t}]", lambda t=t: bench_defenses_drow(t)))
+        found.append((f"StaticLayer.drow[towers={t}]", lambda t=t: bench_static_layer(t)))
+        found.append((f"Defenses.unit_at[towers={t}]", lambda t=t: bench_unit_at(t)))
+    found.append(("PlayStatistic.drow[unchanged]", lambda: bench_statistic_drow(False)))
+    found.append(("PlayStatistic.drow[changing]", lambda: bench_statistic_drow(True)))
+    return found
+
+
+def measure(run, min_time: float = 0.2, repeat: int = 3) -> float:
+    '''
+    Замер времени одного вызова: количество вызовов подбирается так,
+    чтобы серия длилась не меньше min_time, из repeat серий берется лучшая
+    Args:
+        run: функция без аргументов
+        min_time (float): наименьшая длительность серии в секундах
+        repeat (int): количество серий
+
+    Returns:
+        float: время одного вызова в секундах
+    '''
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 4:
+            break
+        number *= 4
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    best = elapsed / max(1, number)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_benchmarks(quick: bool = False, name_filter: str = None, min_time: float = 0.2) -> dict:
+    '''
+    Returns:
+        dict: имя замера -> время одного вызова в секундах
+    '''
+    results = {}
+    for name, setup in benchmarks(quick):
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(setup(), min_time)
+        print(f"{name:<48}{results[name] * 1e6:>14.1f} us", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    '''
+    Сравнение с опорными результатами
+    Args:
+        results (dict): текущие результаты
+        baseline (dict): опорные результаты
+        tolerance (float): допустимое замедление в процентах
+
+    Returns:
+        list: строки (имя, опорное время, текущее время, изменение в процентах)
+        для замеров, которые стали медленнее допустимого
+    '''
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        change = (seconds / baseline[name] - 1) * 100
+        if change > tolerance:
+            regressions.append((name, baseline[name], seconds, change))
+    return regressions
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Замеры скорости горячих участков игры")
+    parser.add_argument("--baseline", default=BASELINE, help="файл опорных результатов")
+    parser.add_argument("--save", action="store_true", help="записать результаты как опорные")
+    parser.add_argument(
+                        "--tolerance",
+                        type=float,
+                        default=20.0,
+                        help="допустимое замедление относительно опорных, в процентах")
+    parser.add_argument("--quick", action="store_true", help="только малые масштабы")
+    parser.add_argument("--filter", default=None, help="запускать только замеры с этой подстрокой")
+    parser.add_argument("--min-time", type=float, default=0.2, help="длительность серии в секундах")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+
+    args = parse_args(argv)
+    results = run_benchmarks(args.quick, args.filter, args.min_time)
+    if args.save:
+        data = {"machine": platform.platform(), "python": platform.python_version(), "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                data["results"] = json.load(file)["results"]
+        data["results"].update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline {args.baseline}, run with --save to create it")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for name, before, after, change in regressions:
+        print(f"SLOWER {name}: {before * 1e6:.1f} us -> {after * 1e6:.1f} us (+{change:.0f}%)")
+    if regressions:
+        print(f"{len(regressions)} benchmarks are more than {args.tolerance:.0f}% slower than baseline")
+        return 1
+    print(f"all benchmarks within {args.tolerance:.0f}% of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,16 @@
 import pygame
-from random import randint
+from random import Random
 from math import sqrt
+import numpy as np
+from spatial import SpatialGrid
+from enemy_store import EnemyStore
+from combat import nearest_targets
+from assets import SpriteAtlas
+from fonts import get_font, render_text
+from projectiles import Projectiles
+from occupancy import OccupancyGrid
+from waves import WaveScheduler
+from modifiers import Modifiers
 
 
 class PlayStatistic:
@@ -14,7 +24,11 @@ class PlayStatistic:
         score (int): текущее количество очков
         money (int): доступное количество денег игрока
         level (int): текущий уровень игры
-        font (pygame.font): шрифт для отображения текста
+        font (pygame.font): шрифт для отображения текста из общего реестра,
+        берется при первой отрисовке, поэтому статистика работает без дисплея
+        texts (list): последние отрисованные строки очков, денег и уровня
+        surfaces (list): надписи для строк из texts
+        rects (list): области последней отрисовки надписей
         w1 (int) : координата x для текста очков
         w2 (int) : координата x для текста денег
         w3 (int) :координата x для текста уровня игры
@@ -28,7 +42,10 @@ class PlayStatistic:
         self.score = 0
         self.money = 100
         self.level = 1
-        self.font = pygame.font.SysFont("arialalack", 50)
+        self.font = None
+        self.texts = [None, None, None]
+        self.surfaces = [None, None, None]
+        self.rects = [None, None, None]
         self.color = (255,255,255)
         self.w1 = width/15
         self.w2 = width/2.5
@@ -84,25 +101,39 @@ class PlayStatistic:
         self.level += 1
 
     
-    def drow(self, screen: pygame.Surface) -> None:
+    def drow(self, screen: pygame.Surface, background: pygame.Surface = None) -> list:
         '''
         Метот отрисовки всех данных статистики на екране
 
         Args:
             screen (pygame.Surface): The amount of distance traveled
+            background (pygame.Surface): если задан, то рисуются только
+            изменившиеся надписи, а место старой надписи сначала
+            восстанавливается из этого фона
+
+        Returns:
+            list: области екрана, которые были изменены
         '''
-        score = self.font.render(f"Score: {self.score} pts", True, self.color)
-        money = self.font.render(f"Money: {self.money} $", True, self.color)
-        level = self.font.render(f"LVL - {self.level}", True, self.color)
-        score_rect = score.get_rect()
-        money_rect = money.get_rect()
-        level_rect = level.get_rect()
-        score_rect.topleft = (self.w1, 0)
-        money_rect.topleft = (self.w2, 0)
-        level_rect.topleft = (self.w3, 0)
-        screen.blit(score, score_rect)
-        screen.blit(money, money_rect)
-        screen.blit(level, level_rect)
+        if self.font is None:
+            self.font = get_font("arialalack", 50)
+        texts = (f"Score: {self.score} pts", f"Money: {self.money} $", f"LVL - {self.level}")
+        positions = (self.w1, self.w2, self.w3)
+        dirty = []
+        for i in range(len(texts)):
+            changed = texts[i] != self.texts[i]
+            if changed:
+                self.texts[i] = texts[i]
+                self.surfaces[i] = self.font.render(texts[i], True, self.color)
+            elif background is not None:
+                continue
+            rect = self.surfaces[i].get_rect()
+            rect.topleft = (positions[i], 0)
+            if background is not None and self.rects[i] is not None:
+                screen.blit(background, self.rects[i], self.rects[i])
+                dirty.append(self.rects[i])
+            self.rects[i] = screen.blit(self.surfaces[i], rect)
+            dirty.append(self.rects[i])
+        return dirty
 
 
 
@@ -120,6 +151,8 @@ class StaticObject:
         sprite_rect (pygame.Rect): прямоугольная область спрайта
         
     '''
+    __slots__ = ("sprite", "sprite_rect")
+
     def __init__(self, x: int, y: int, sprite: pygame.Surface) -> None:
 
         self.sprite = sprite
@@ -141,8 +174,11 @@ class StaticObject:
         Метод отрисовки объекта на екране 
         Args:
             screen (pygame.Surface): екран на котором будет произведено рисование
+
+        Returns:
+            pygame.Rect: измененная область екрана
         '''
-        screen.blit(self.sprite, self.sprite_rect)
+        return screen.blit(self.sprite, self.sprite_rect)
     
 
     def check_collision(self, other_rect: pygame.Rect) -> bool:
@@ -177,6 +213,8 @@ class StaticHP(StaticObject):
         health (int): текущий уровень здоровья
         
     '''
+    __slots__ = ("total_health", "health")
+
     def __init__(self, x: int, y: int, sprite: pygame.Surface, health: int) -> None:
         '''
         '''
@@ -185,33 +223,39 @@ class StaticHP(StaticObject):
         self.health = health
 
 
-    def drow_HP(self, screen: pygame.Surface) -> None:
+    def drow_HP(self, screen: pygame.Surface) -> pygame.Rect:
         '''
         Метод отрисовки уровня здоровья для текущего объекта на екране 
         Args:
             screen (pygame.Surface): екран на котором будет произведено рисование
+
+        Returns:
+            pygame.Rect: измененная область екрана
         '''
         color_bg = (255,0,0)
         color = (0,255,0)
         height = 10
         start_pos = self.sprite_rect.topleft
         end_pos = self.sprite_rect.topright
-        pygame.draw.line(screen, color, start_pos, end_pos, height)
+        rect = pygame.draw.line(screen, color, start_pos, end_pos, height)
         width = int(self.sprite_rect.width*self.health/self.total_health)
         end_pos = end_pos[0]-width, end_pos[1]
-        pygame.draw.line(screen, color_bg, start_pos, end_pos, height)
+        return rect.union(pygame.draw.line(screen, color_bg, start_pos, end_pos, height))
 
 
-    def drow(self, screen: pygame.Surface) -> None:
+    def drow(self, screen: pygame.Surface) -> pygame.Rect:
         '''
         Метод отрисовки объекта на екране
         вызывает родительский метод отрисовки объекта + 
         метод отрисовки здоровья
         Args:
             screen (pygame.Surface): екран на котором будет произведено рисование
+
+        Returns:
+            pygame.Rect: измененная область екрана
         '''
-        StaticObject.drow(self, screen)
-        self.drow_HP(screen)
+        rect = StaticObject.drow(self, screen)
+        return rect.union(self.drow_HP(screen))
 
 
 
@@ -222,6 +266,7 @@ class Tower(StaticHP):
 
     Args:
         path_to_png (str): путь до изображения спрайта
+        atlas (SpriteAtlas): кэш спрайтов, по умолчанию создается свой
 
     Attributes:
         sprite (pygame.Surface): спрайт объекта
@@ -230,12 +275,14 @@ class Tower(StaticHP):
         health (int): текущий уровень здоровья
     '''
 
-    def __init__(self, path_to_png: str) -> None:
+    def __init__(self, path_to_png: str, atlas: SpriteAtlas = None) -> None:
 
         x = 100
         y = 250
         health = 1000
-        sprite = pygame.image.load(path_to_png)
+        if atlas is None:
+            atlas = SpriteAtlas()
+        sprite = atlas.get(path_to_png)
         StaticHP.__init__(self, x, y, sprite, health)
     
 
@@ -291,6 +338,7 @@ class Road(StaticObject):
         self.width = 150
         self.sprite_rect = pygame.Rect(0, 0, self.x1, self.width)
         self.sprite_rect.centery = self.y
+        self.map = None
 
 
     @property
@@ -314,6 +362,14 @@ class Road(StaticObject):
         return (self.x2, self.y)
 
 
+    def get_rects(self) -> list:
+        '''
+        Returns:
+            list: области, которые занимает дорога
+        '''
+        return [self.sprite_rect]
+
+
     def drow(self, screen: pygame.Surface) -> None:
         '''
         '''
@@ -321,49 +377,144 @@ class Road(StaticObject):
 
 
 
-class Enemy(StaticHP):
+class MapRoad(Road):
     '''
-    Класс вражеского объекта
-    Наследуется от StaticHP
+    Дорога по карте из клеток с поворотами, развилками и несколькими входами.
+    Враги на такой дороге идут по полю направлений карты, см. flowfield.GameMap
     Args:
-        sprite (pygame.image): спрайт объекта
-        road (Road): объект дороги
-        unit_level (int): уровень врага
-        speed (float): скорость передвижения врага
+        tower (Tower): обьект крепости, должен уже стоять на клетках крепости карты
+        game_map (GameMap): карта
+    Attributes:
+        map (GameMap): карта
+        rects (list): полосы клеток дороги
+        sprite_rect (pygame.Rect): область, охватывающая всю дорогу
+    '''
+    def __init__(self, tower: Tower, game_map) -> None:
+
+        Road.__init__(self, tower, game_map.width)
+        self.y = tower.sprite_rect.centery
+        self.map = game_map
+        self.rects = game_map.road_rects()
+        self.sprite_rect = self.rects[0].unionall(self.rects)
+
+
+    @property
+    def get_y_range(self) -> tuple:
+        '''
+        '''
+        return (0, self.map.height)
+
+
+    def get_rects(self) -> list:
+
+        return self.rects
+
+
+    def set_cell(self, cell: tuple, value: bool) -> pygame.Rect:
+        '''
+        Прокладка или разбор клетки дороги, поле направлений
+        пересчитывается частично
+        Args:
+            cell (tuple): клетка (ряд, столбец)
+            value (bool): дорога ли клетка теперь
+
+        Returns:
+            pygame.Rect: область клетки
+        '''
+        self.map.set_road(cell, value)
+        self.rects = self.map.road_rects()
+        self.sprite_rect = self.rects[0].unionall(self.rects)
+        return self.map.cell_rect(cell)
+
+
+    def drow(self, screen: pygame.Surface) -> None:
+
+        for rect in self.rects:
+            pygame.draw.rect(screen, self.color, rect)
+
+
+
+class Enemy:
+    '''
+    Класс вражеского объекта.
+    Данные всех врагов хранятся в массивах EnemyStore, объект Enemy
+    только читает поля одного врага по индексу, поэтому он действителен
+    до следующего удаления врагов из хранилища
+    Args:
+        enemies (Enemies): объект списка врагов
+        index (int): индекс врага в хранилище
     Attributes:
+        enemies (Enemies): объект списка врагов
+        index (int): индекс врага в хранилище
         sprite (pygame.Surface): спрайт объекта
         sprite_rect (pygame.Rect): прямоугольная область спрайта
-        total_health (int): максимальный уровень здоровья
-        health (int): текущий уровень здоровья
-        speed (float): скорость передвижения врага
+        total_health (float): максимальный уровень здоровья
+        health (float): текущий уровень здоровья
+        speed (float): текущая скорость врага с модификаторами
         damage (int): урон
         money (int): деньги за уничтожение
+        uid (int): порядковый номер врага, назначается списком врагов при появлении
     
     '''
-    def __init__(self, sprite: pygame.image, road: Road, unit_level: int, speed: float) -> None:
-        
-        x = randint(road.x1+10, road.x1+50)
-        y = randint(*road.get_y_range)
+    __slots__ = ("enemies", "index")
+
+    def __init__(self, enemies, index: int) -> None:
+
+        self.enemies = enemies
+        self.index = index
+
+
+    @staticmethod
+    def stats(unit_level):
+        '''
+        Характеристики врага указанного уровня,
+        работает и для чисел, и для массивов уровней
+        Args:
+            unit_level: уровень врага
+
+        Returns:
+            tuple: (здоровье, урон, деньги за уничтожение)
+        '''
         health = 150 + 10*(unit_level+10)
-        sprite = pygame.transform.rotate(sprite, 90)
-        StaticHP.__init__(self, x, y, sprite, health)
-        self.speed = speed
-        self.x = x
-        self.damage = 10 * unit_level
-        self.money = unit_level * 2
+        damage = 10 * unit_level
+        money = unit_level * 2
+        return health, damage, money
 
 
-    def move(self):
-        
-        self.x -= self.speed
-        self.sprite_rect.x = self.x
+    def field(self, name: str):
+
+        return getattr(self.enemies.enemies, name)[self.index].item()
+
+
+    x = property(lambda self: self.field("x"))
+    y = property(lambda self: self.field("y"))
+    health = property(lambda self: self.field("health"))
+    total_health = property(lambda self: self.field("total_health"))
+    speed = property(lambda self: self.enemies.modifiers.speed(self.index).item())
+    damage = property(lambda self: self.field("damage"))
+    money = property(lambda self: self.field("money"))
+    uid = property(lambda self: self.field("uid"))
+
+
+    @property
+    def sprite(self) -> pygame.Surface:
+
+        return self.enemies.unit_sprites[self.field("sprite")]
+
+
+    @property
+    def sprite_rect(self) -> pygame.Rect:
+
+        rect = self.sprite.get_rect()
+        rect.center = (self.x, self.y)
+        return rect
     
 
     def get_distance(self, rect: pygame.Rect) -> float:
         
         distance = sqrt(
-            (self.sprite_rect.centerx - rect.centerx) ** 2 +
-            (self.sprite_rect.centery - rect.centery) ** 2)
+            (self.x - rect.centerx) ** 2 +
+            (self.y - rect.centery) ** 2)
         
         return distance
     
@@ -383,125 +534,353 @@ class Enemies:
         road (Road): объект дороги
         screen (pygame.Surface): екран
         statistic (PlayStatistic): статистика игры
+        atlas (SpriteAtlas): кэш спрайтов, по умолчанию создается свой
+        rng (Random): генератор случайных чисел игры, по умолчанию создается свой
     Attributes:
-        enemies (list): список врагов
+        enemies (EnemyStore): массивы данных всех врагов
         sprites (list): список спрайтов для врагов
+        unit_sprites (list): спрайты повернутые по направлению движения
+        sprite_sizes (np.ndarray): размеры (ширина, высота) повернутых спрайтов
         road (Road): объект дороги
         target (Tower): объект крепости
         screen (pygame.Surface): екран
         statistic (PlayStatistic): объект статистики
-        speed (float): текущая скорость для всех врагов
+        speed (float): текущая скорость врагов без временных эффектов
+        modifiers (Modifiers): глобальные модификаторы и временные эффекты врагов
+        grid (SpatialGrid): пространственный индекс центров врагов
+        grid_dirty (bool): истина если враги изменились после раскладки сетки
+        next_uid (int): uid для следующего появившегося врага
+        rng (Random): генератор случайных чисел для появления врагов
+        slots (np.ndarray): точки (х,у) слотов появления на входе дороги
+        waves (WaveScheduler): расписание появления врагов
+        BASE_SPEED (float): базовая скорость врагов, которая хранится в EnemyStore
     
     '''
-    def __init__(self, img_path: str, target: Tower, road: Road, screen: pygame.Surface, statistic: PlayStatistic) -> None:
+    BASE_SPEED = 1.0
+
+    def __init__(
+                self,
+                img_path: str,
+                target: Tower,
+                road: Road,
+                screen: pygame.Surface,
+                statistic: PlayStatistic,
+                atlas: SpriteAtlas = None,
+                rng: Random = None
+                ) -> None:
 
-        self.enemies:list[Enemy] = []
-        self.sprites = [pygame.image.load(f"{img_path}{i}.png") for i in range(1,20)]
+        if atlas is None:
+            atlas = SpriteAtlas()
+        if rng is None:
+            rng = Random()
+        self.rng = rng
+        self.enemies = EnemyStore()
+        self.sprites = atlas.get_list(img_path, 19)
+        self.unit_sprites = atlas.get_list(img_path, 19, 90)
+        self.sprite_sizes = np.array([sprite.get_size() for sprite in self.unit_sprites])
         self.road = road
         self.target = target
         self.screen = screen
         self.statistic = statistic
-        self.speed = 1.0
+        self.modifiers = Modifiers(self)
+        self.grid = SpatialGrid()
+        self.grid_dirty = True
+        self.next_uid = 0
+        self.slots = self.spawn_slots()
+        self.waves = WaveScheduler(self)
+
+
+    def spawn_slots(self) -> np.ndarray:
+        '''
+        Слоты появления: на прямой дороге полосы по высоте спрайта
+        за правым краем поля, на карте центры клеток входов
+        Returns:
+            np.ndarray: точки (х,у) слотов
+        '''
+        game_map = self.road.map
+        if game_map is not None:
+            return np.array([
+                ((c + 0.5) * game_map.cell, (r + 0.5) * game_map.cell)
+                for r, c in game_map.entrances])
+        top, bottom = self.road.get_y_range
+        lanes = max(1, (bottom - top) // int(self.sprite_sizes[:, 1].max()))
+        ys = top + (np.arange(lanes) + 0.5) * (bottom - top) / lanes
+        return np.column_stack((np.full(lanes, self.road.x1 + 30.0), ys))
+
+
+    def __len__(self) -> int:
+
+        return len(self.enemies)
+
+
+    def get(self, index: int) -> Enemy:
+        '''
+        Returns:
+            Enemy: объект для чтения данных врага по индексу
+        '''
+        return Enemy(self, index)
+
+
+    @property
+    def speed(self) -> float:
+
+        return self.modifiers.value("speed", self.BASE_SPEED)
+
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        '''
+        Задание скорости всех врагов через глобальную прибавку
+        '''
+        self.modifiers.add["speed"] = value / self.modifiers.scale["speed"] - self.BASE_SPEED
 
 
     def next_score(self):
-        
-        self.speed += 0.5
-        for unit in self.enemies:
-            
-            unit.speed += 0.5
+        '''
+        Ускорение всех врагов, и живых, и будущих, глобальной прибавкой за O(1)
+        '''
+        self.modifiers.add["speed"] += 0.5
 
     def spawn(self) -> None:
-
+        '''
+        Появление одного врага случайного уровня в случайном слоте вне расписания
+        '''
         max_lvl = min(len(self.sprites)-1, self.statistic.level*2)
-        unit_level = randint(0, max_lvl)
-        unit = Enemy(self.sprites[unit_level], self.road, unit_level+1, self.speed)
-        for enemy in self.enemies:
-            if enemy.check_collision(unit.sprite_rect):
-                return
-        
-        self.enemies.append(unit)
+        unit_level = self.rng.randint(0, max_lvl)
+        slot = self.rng.randrange(len(self.slots))
+        self.spawn_batch([unit_level], [slot])
 
 
-    def move(self) -> None:
-        
-        i = 0
-        while i < len(self.enemies):
-            unit = self.enemies[i]
-            unit.move()
-            if unit.sprite_rect.centerx <= self.target.sprite_rect.centerx:
-                self.target.hit(unit.damage)
-                self.enemies.pop(i)
-                continue
-            i += 1
-            
-    
-    def drow(self) -> None:
-        
-        lvl = self.statistic.level
-        rnd = randint(0, 100)
-        if rnd < lvl:
-            self.spawn()
-        for unit in self.enemies:
-            unit.drow(self.screen)
-    
+    def spawn_batch(self, levels: list, slots: list) -> None:
+        '''
+        Появление пачки врагов одним векторным добавлением в хранилище.
+        Наложение не проверяется: расписание не ставит врага в занятый слот
+        Args:
+            levels (list): уровни врагов (индексы спрайтов)
+            slots (list): слоты появления
+        '''
+        levels = np.asarray(levels, dtype=np.int64)
+        count = len(levels)
+        if not count:
+            return
+        positions = self.slots[np.asarray(slots, dtype=np.int64)]
+        x = positions[:, 0]
+        y = positions[:, 1]
+        health, damage, money = Enemy.stats(levels+1)
+        self.enemies.extend(
+                        count,
+                        x=x,
+                        prev_x=x,
+                        y=y,
+                        prev_y=y,
+                        health=health,
+                        total_health=health,
+                        speed=self.BASE_SPEED,
+                        damage=damage,
+                        money=money,
+                        sprite=levels,
+                        uid=np.arange(self.next_uid, self.next_uid + count))
+        self.next_uid += count
+        self.grid_dirty = True
+
+
+    def nearest(self, rect: pygame.Rect, distance: int) -> int:
+        '''
+        Поиск ближайшего к центру области живого врага в радиусе distance.
+        При равных расстояниях выбирается враг, который появился раньше
+        Args:
+            rect (pygame.Rect): область от центра которой ведется поиск
+            distance (int): радиус поиска
 
-    def hit(self, index: int, demage: int) -> None:
-        
-        self.enemies[index].health -= demage
-        if self.statistic.add_score(demage):
-            self.next_score()
-        if self.enemies[index].not_alive():
-            money = self.enemies[index].money
-            self.statistic.add_money(money)
-            self.enemies.pop(index)
+        Returns:
+            int: индекс врага в хранилище или None
+        '''
+        store = self.enemies
+        return self.layout().nearest(*rect.center, distance, store.health > 0, store.uid)
 
 
+    def in_range(self, x: np.ndarray, y: np.ndarray, radius: np.ndarray) -> tuple:
+        '''
+        Поиск живых врагов в радиусе сразу от многих точек одним запросом к сетке
+        Args:
+            x (np.ndarray): координаты точек по горизонтали
+            y (np.ndarray): координаты точек по вертикали
+            radius (np.ndarray): радиус для каждой точки
 
+        Returns:
+            tuple: (номера точек, индексы врагов, квадраты расстояний) для каждой найденной пары
+        '''
+        return self.layout().query_many(x, y, radius, self.enemies.health > 0)
 
-class Bulet:
-    '''
-    Класс пули
-    Args:
-        start_pos (tuple): координаты начала полета пули
-        end_pos (tuple): координаты цели
-        width (int): ширина пули
-    Attributes:
-        start_pos (tuple): координаты начала полета пули
-        end_pos (tuple): координаты цели
-        color (tuple): цвет выстрела
-        width (int): ширина пули
-        timer (int): время полета пули
 
-    '''
-    def __init__(self, start_pos: tuple, end_pos: tuple, width: int) -> None:
-        
-        self.start_pos = start_pos
-        self.end_pos = end_pos
-        self.color = (255,0,0)
-        self.width = width+2
-        self.timer = 3
+    def layout(self) -> SpatialGrid:
+        '''
+        Returns:
+            SpatialGrid: сетка с текущими положениями врагов, перестраивается только после изменений
+        '''
+        if self.grid_dirty:
+            store = self.enemies
+            self.grid.rebuild(store.x, store.y)
+            self.grid_dirty = False
+        return self.grid
+
+
+    def update(self) -> None:
+        '''
+        Один игровой тик врагов без отрисовки:
+        появление врагов этого тика по расписанию и перемещение всех врагов
+        '''
+        self.spawn_batch(*self.waves.due())
+        self.move()
+
+
+    def velocity(self, rows: np.ndarray) -> tuple:
+        '''
+        Args:
+            rows (np.ndarray): индексы врагов в хранилище
+
+        Returns:
+            tuple: скорости врагов за тик по горизонтали и по вертикали
+        '''
+        store = self.enemies
+        speed = self.modifiers.speed(rows)
+        if self.road.map is None:
+            return -speed, np.zeros_like(speed)
+        x, y = store.x[rows], store.y[rows]
+        target_x, target_y, _ = self.road.map.steer(x, y)
+        dx, dy = target_x - x, target_y - y
+        scale = np.divide(speed, np.hypot(dx, dy), out=np.zeros_like(speed), where=(dx != 0) | (dy != 0))
+        return dx * scale, dy * scale
+
+
+    def move(self) -> None:
+        '''
+        Перемещение всех врагов одним векторным проходом.
+        Сначала тикают временные эффекты, урон ядом наносится одним hit_many.
+        На карте каждый враг идет к центру следующей клетки пути,
+        направления всех врагов берутся одним обращением к полю карты.
+        Прибывшие к крепости враги наносят ей урон, они и погибшие
+        враги удаляются одним уплотнением массивов
+        '''
+        store = self.enemies
+        if not len(store):
+            return
+        self.hit_many(*self.modifiers.tick())
+        speed = self.modifiers.speed()
+        store.prev_x[:] = store.x
+        store.prev_y[:] = store.y
+        alive = store.health > 0
+        game_map = self.road.map
+        if game_map is None:
+            store.x[:] -= speed
+            arrived = alive & (store.x <= self.target.sprite_rect.centerx)
+        else:
+            # враги, уже вошедшие в клетки крепости, в этот тик наносят урон
+            target_x, target_y, arrived = game_map.steer(store.x, store.y)
+            arrived &= alive
+            dx = target_x - store.x
+            dy = target_y - store.y
+            distance = np.hypot(dx, dy)
+            step = np.divide(
+                            np.minimum(speed, distance),
+                            distance,
+                            out=np.zeros_like(distance),
+                            where=distance > 0)
+            store.x[:] += dx * step
+            store.y[:] += dy * step
+        if arrived.any():
+            self.target.hit(int(store.damage[arrived].sum()))
+        store.remove(arrived | ~alive)
+        self.grid_dirty = True
+            
     
+    def drow(self, screen: pygame.Surface = None, alpha: float = 1.0) -> list:
+        '''
+        Отрисовка всех живых врагов и их здоровья
+        Args:
+            screen (pygame.Surface): поверхность для рисования, по умолчанию екран
+            alpha (float): доля тика прошедшая после последнего перемещения,
+            враги рисуются между прошлым и текущим положением
 
-    def tick(self) -> None:
-        
-        self.timer -= 1
-        
+        Returns:
+            list: области, которые занимает каждый нарисованный враг
+        '''
+        if screen is None:
+            screen = self.screen
+        store = self.enemies
+        xs = store.x
+        ys = store.y
+        if alpha < 1.0:
+            xs = store.prev_x + (store.x - store.prev_x) * alpha
+            ys = store.prev_y + (store.y - store.prev_y) * alpha
+        sprites = self.unit_sprites
+        dirty = []
+        color_bg = (255,0,0)
+        color = (0,255,0)
+        height = 10
+        for x, y, health, total, sprite in zip(
+                                xs.tolist(),
+                                ys.tolist(),
+                                store.health.tolist(),
+                                store.total_health.tolist(),
+                                store.sprite.tolist()):
+            if health <= 0:
+                continue
+            image = sprites[sprite]
+            rect = image.get_rect()
+            rect.center = (x, y)
+            rect = screen.blit(image, rect)
+            start_pos = rect.topleft
+            end_pos = rect.topright
+            line = pygame.draw.line(screen, color, start_pos, end_pos, height)
+            end_pos = end_pos[0] - int(rect.width*health/total), end_pos[1]
+            line = line.union(pygame.draw.line(screen, color_bg, start_pos, end_pos, height))
+            dirty.append(rect.union(line))
+        return dirty
+    
 
-    def drow(self, screen: pygame.Surface) -> None:
-        
-        pygame.draw.line(
-                    screen,
-                    self.color,
-                    self.start_pos,
-                    self.end_pos,
-                    self.width)
-        self.tick()
+    def hit(self, index: int, demage: int) -> None:
+        '''
+        Нанесение урона врагу с учетом модификаторов. Погибший враг сразу
+        приносит деньги, а удаляется из хранилища при следующем перемещении врагов
+        Args:
+            index (int): индекс врага в хранилище
+            demage (int): величина урона
+        '''
+        store = self.enemies
+        demage = self.modifiers.damage(index, demage).item()
+        health = store.health[index]
+        store.health[index] = health - demage
+        if self.statistic.add_score(int(demage)):
+            self.next_score()
+        if health > 0 >= health - demage:
+            self.statistic.add_money(int(store.money[index]))
 
 
-    def is_alive(self) -> bool:
-        
-        return self.timer > 0
+    def hit_many(self, indexes: np.ndarray, demages: np.ndarray) -> None:
+        '''
+        Нанесение урона сразу нескольким врагам одним векторным обновлением.
+        Урон по одному врагу суммируется, так что результат не зависит
+        от порядка попаданий. Урон проходит через модификаторы врагов.
+        Погибшие враги приносят деньги и удаляются
+        одним уплотнением хранилища, поэтому индексы после вызова меняются
+        Args:
+            indexes (np.ndarray): индексы врагов в хранилище, могут повторяться
+            demages (np.ndarray): урон для каждого попадания
+        '''
+        if not len(indexes):
+            return
+        store = self.enemies
+        demages = self.modifiers.damage(indexes, demages)
+        loss = np.bincount(indexes, weights=demages, minlength=len(store))
+        killed = (store.health > 0) & (store.health <= loss)
+        store.health[:] -= loss
+        if self.statistic.add_score(int(np.sum(demages))):
+            self.next_score()
+        if killed.any():
+            self.statistic.add_money(int(store.money[killed].sum()))
+        store.remove(store.health <= 0)
+        self.grid_dirty = True
 
 
 
@@ -514,56 +893,108 @@ class Defense(StaticObject):
         y (int): координаты по вертикали
         sprites (list): список спрайтов
         y_road (int): координата центра дороги по вертикали
+        flipped_sprites (list): спрайты повернутые на 180 градусов для
+        сооружений над дорогой, если не заданы то поворот строится при создании
 
     Attributes:
         direction (int): положение относсительно дороги
-        sprites (list): список спрайтов
+        sprites (list): общий список спрайтов в положении сооружения
         level (int): уровень сооружения
         max_level (int): максимальный возможный уровень
         wait (int): время между выстрелами
-        alpha_color (tuple): цвет границы поражения
-        font (pygame.font): шрифт надписи для стоимости
+        alpha_color (tuple): цвет границы поражения и подписи, общий для всех сооружений
         distance (int): дальность поражения
         demage (int): наносимый урон
         upgrade_coast (int): стоимость улучшения
-        caption (str): подпись
-        caption_rect (pygame.Rect): область подписи
+        caption (str): подпись из общей таблицы уровней
+        homing (bool): снаряды наводятся на цель в полете, иначе стреляют с упреждением
+        effect (tuple): временный эффект снарядов (эффект, сила, тики), см. modifiers.EFFECTS,
+        None без эффекта
+        splash (int): радиус поражения вокруг цели, 0 только по цели
+        chain (int): сколько ближайших к цели врагов в радиусе splash задевает снаряд, 0 все
+        RELOAD (int): время перезарядки на нулевом уровне
+        LEVELS (dict): max_level -> таблица (дальность, урон, стоимость, подпись) по уровням,
+        общая для всех сооружений
     
     '''
-    def __init__(self, x: int, y: int, sprites: list, y_road: int) -> None:
+    __slots__ = (
+        "direction", "sprites", "level", "max_level", "wait",
+        "distance", "demage", "upgrade_coast", "caption")
+    alpha_color = (50,50,205)
+    homing = True
+    effect = None
+    splash = 0
+    chain = 0
+    RELOAD = 25
+    CAPTION_FONT = ("arialalack", 30)
+    # область подписи для area: с запасом больше любой подписи шрифтом CAPTION_FONT,
+    # чтобы область считалась без шрифтов и растеризации
+    CAPTION_BOX = (90, 45)
+    LEVELS = {}
+
+    def __init__(self, x: int, y: int, sprites: list, y_road: int, flipped_sprites: list = None) -> None:
         
         self.direction = -1
         self.sprites = sprites
-        sprite = self.sprites[0]
         if y < y_road:
-            sprite = pygame.transform.rotate(sprite, 180)
+            if flipped_sprites is None:
+                flipped_sprites = [pygame.transform.rotate(sprite, 180) for sprite in sprites]
+            self.sprites = flipped_sprites
             self.direction = 1
-        StaticObject.__init__(self, x, y, sprite)
+        StaticObject.__init__(self, x, y, self.sprites[0])
         self.level = 1
         self.max_level = len(self.sprites)
         self.wait = 0
-        self.alpha_color = pygame.Color(50,50,205)
-        self.font = pygame.font.SysFont("arialalack", 30)
         self.update_level()
         
 
+    @classmethod
+    def level_table(cls, max_level: int) -> list:
+        '''
+        Returns:
+            list: (дальность, урон, стоимость улучшения, подпись) для каждого уровня,
+            одна таблица на все сооружения с max_level уровнями
+        '''
+        table = cls.LEVELS.get(max_level)
+        if table is None:
+            table = []
+            for level in range(max_level + 1):
+                upgrade_coast = level * 15
+                caption = "MAX" if level >= max_level else f"{upgrade_coast}$"
+                table.append((120 + level * 10, 50 + level * 3, upgrade_coast, caption))
+            cls.LEVELS[max_level] = table
+        return table
+
 
     def update_level(self) -> None:
                 
         self.level += 1
-        self.distance = 120 + self.level * 10
-        self.demage = 50 + self.level * 3
-        self.upgrade_coast = self.level * 15
-        if self.level >= self.max_level:
-            self.caption = self.font.render(f"MAX", True, self.alpha_color)
-        else:
-            self.caption = self.font.render(f"{self.upgrade_coast}$", True, self.alpha_color)
-        self.caption_rect = self.caption.get_rect()
+        self.distance, self.demage, self.upgrade_coast, self.caption = (
+            self.level_table(self.max_level)[self.level])
+
+
+    def get_caption(self) -> tuple:
+        '''
+        Метод берет подпись из общего кэша надписей, так что сооружения
+        одного уровня рисуют одну и ту же поверхность
+        Returns:
+            tuple: (pygame.Surface, pygame.Rect) подпись и ее область
+        '''
+        caption_surface = render_text(self.CAPTION_FONT, self.caption, self.alpha_color)
+        return caption_surface, self.place_caption(caption_surface.get_rect())
+
+
+    def place_caption(self, rect: pygame.Rect) -> pygame.Rect:
+        '''
+        Returns:
+            pygame.Rect: область rect, приставленная к спрайту со стороны от дороги
+        '''
         if self.direction == 1:
-            self.caption_rect.midbottom = self.sprite_rect.midtop
+            rect.midbottom = self.sprite_rect.midtop
         else:
-            self.caption_rect.midtop = self.sprite_rect.midbottom
-        
+            rect.midtop = self.sprite_rect.midbottom
+        return rect
+
 
 
 
@@ -573,8 +1004,6 @@ class Defense(StaticObject):
         if money < self.upgrade_coast or self.level >= self.max_level:
             return
         sprite = self.sprites[self.level]
-        if self.direction == 1:
-            sprite = pygame.transform.rotate(sprite, 180)
         statistic.update_money(money - self.upgrade_coast)
         self.sprite = sprite
         self.update_level()
@@ -588,11 +1017,24 @@ class Defense(StaticObject):
         pygame.draw.circle(screen, self.alpha_color, center, radius, width=1)
 
 
+    def area(self) -> pygame.Rect:
+        '''
+        Returns:
+            pygame.Rect: вся область, которую занимает отрисовка сооружения:
+            спрайт, радиус поражения и подпись
+        '''
+        radius = self.distance - 25
+        circle = pygame.Rect(0, 0, radius * 2 + 2, radius * 2 + 2)
+        circle.center = self.sprite_rect.center
+        sprite = self.sprite.get_rect(topleft=self.sprite_rect.topleft)
+        return circle.union(sprite).union(self.place_caption(pygame.Rect((0, 0), self.CAPTION_BOX)))
+
+
     def drow(self, screen: pygame.Surface) -> None:
         
         StaticObject.drow(self, screen)
         self.show_radius(screen)
-        screen.blit(self.caption, self.caption_rect)
+        screen.blit(*self.get_caption())
 
 
 
@@ -607,7 +1049,7 @@ class Defense(StaticObject):
 
     def reload(self) -> None:
         
-        self.wait = 25 - self.level
+        self.wait = self.RELOAD - self.level
 
 
     def is_ready(self) -> bool:
@@ -619,29 +1061,28 @@ class Defense(StaticObject):
 
 
 
-    def hit(self, enemies: Enemies, bulets: list[Bulet]) -> None:
-        
-        if self.is_ready():
-            nearest = None
-            min_distance = None
-            for i in range(len(enemies.enemies)):
-                unit = enemies.enemies[i]
-                distance = unit.get_distance(self.sprite_rect)
-                if distance <= self.distance:
-                    if nearest is None:
-                        nearest = i
-                        min_distance = distance
-                    else:
-                        if min_distance > distance:
-                            nearest = i
-                            min_distance = distance
-            if nearest is not None:
-                bulets.append(Bulet(
-                    self.get_x_y_for_bulet(),
-                    enemies.enemies[nearest].sprite_rect.center,
-                    self.level))
-                enemies.hit(nearest, self.demage)
-                self.reload()
+class SplashDefense(Defense):
+    '''
+    Сооружение, снаряды которого взрываются и задевают всех врагов
+    в радиусе splash от цели. Стреляет реже обычного
+    '''
+    __slots__ = ()
+    alpha_color = (205,110,40)
+    splash = 60
+    RELOAD = 40
+
+
+
+class ChainDefense(Defense):
+    '''
+    Сооружение, снаряды которого перескакивают с цели на chain
+    ближайших к ней врагов в радиусе splash
+    '''
+    __slots__ = ()
+    alpha_color = (150,60,190)
+    splash = 100
+    chain = 3
+    RELOAD = 35
 
 
 
@@ -654,82 +1095,234 @@ class Defenses:
         road (Road): объект дороги
         screen (pygame.Surface): екран
         enemies (Enemies): вражеские обьекты
+        atlas (SpriteAtlas): кэш спрайтов, по умолчанию создается свой
+        height (int): высота игрового поля
     Attributes:
         defenses (list): список защитных сооружений
-        sprites (list): список спрайтов для врагов
+        sprites (list): список спрайтов для сооружений под дорогой
+        flipped_sprites (list): список спрайтов для сооружений над дорогой
         road (Road): объект дороги
         tower (Tower): объект крепости
         screen (pygame.Surface): екран
         enemies (Enemies): вражеские обьекты
-        bulets (list[Bulet]): список выстрелов
+        projectiles (Projectiles): летящие снаряды
+        changes (list): области, где с прошлой перестройки статического фона
+        появились, улучшились или исчезли сооружения, см. render.StaticLayer
+        track_changes (bool): вести ли changes, включает StaticLayer,
+        без него безголовая игра области не копит
+        grid (OccupancyGrid): занятость поля, номера сооружений в ней это индексы в списке defenses
+        kind (int): индекс в KINDS вида сооружений, которые строит левая кнопка
+        KINDS (tuple): классы сооружений, которые можно строить
     
     '''
+    KINDS = (Defense, SplashDefense, ChainDefense)
+
     def __init__(
                 self,
                 img_path: str,
                 tower: Tower,
                 road: Road,
                 screen: pygame.Surface,
-                enemies: Enemies
+                enemies: Enemies,
+                atlas: SpriteAtlas = None,
+                height: int = 600
                 ) -> None:
         
+        if atlas is None:
+            atlas = SpriteAtlas()
         self.defenses:list[Defense] = []
-        self.sprites = [pygame.image.load(f"{img_path}{i}.png") for i in range(1, 16)]
+        self.sprites = atlas.get_list(img_path, 15)
+        self.flipped_sprites = atlas.get_list(img_path, 15, 180)
         self.road = road
         self.tower = tower
         self.screen = screen
         self.enemies = enemies
-        self.bulets:list[Bulet] = []
+        self.projectiles = Projectiles(enemies)
+        self.changes:list[pygame.Rect] = []
+        self.track_changes = False
+        self.kind = 0
+        self.grid = OccupancyGrid(road.x1, height)
+        for rect in road.get_rects():
+            self.grid.block(rect)
+        self.grid.block(tower.sprite_rect)
+
+
+    def unit_at(self, position: tuple) -> int:
+        '''
+        Returns:
+            int: индекс сооружения в точке position или None
+        '''
+        index = self.grid.at(*position)
+        return index if index >= 0 else None
+
+
+    def changed(self, rect: pygame.Rect) -> None:
+        '''
+        Отметка области статического фона, которую нужно перерисовать.
+        Пока фон никто не ведет, области не запоминаются
+        '''
+        if self.track_changes:
+            self.changes.append(rect)
+
+
+    def add(self, unit: Defense) -> None:
+        '''
+        Добавление сооружения без проверок и оплаты
+        '''
+        self.grid.add(unit.sprite_rect, len(self.defenses))
+        self.defenses.append(unit)
+        self.changed(unit.area())
+
+
+    def remove(self, index: int) -> Defense:
+        '''
+        Удаление сооружения за O(1): на его место в списке переносится
+        последнее, его клетки в карте занятости и область на фоне обновляются
+        Returns:
+            Defense: удаленное сооружение
+        '''
+        unit = self.defenses[index]
+        self.grid.remove(index)
+        self.changed(unit.area())
+        last = self.defenses.pop()
+        if last is not unit:
+            self.defenses[index] = last
+            self.grid.move(len(self.defenses), index)
+            self.changed(last.area())
+        return unit
     
 
     def left_click(self, position: tuple, statistic: PlayStatistic) -> None:
         
-        click_rect = pygame.Rect(*position,1,1)
-        for unit in self.defenses:
-            if unit.check_collision(click_rect):
-                unit.upgrade(statistic)
-                return
+        index = self.unit_at(position)
+        if index is not None:
+            unit = self.defenses[index]
+            area = unit.area()
+            level = unit.level
+            unit.upgrade(statistic)
+            if unit.level != level:
+                self.changed(area.union(unit.area()))
+            return
             
         self.spawn(*position, statistic)
 
 
     def right_click(self, position: tuple, statistic: PlayStatistic) -> None:
         
-        click_rect = pygame.Rect(*position,1,1)
-        for i in range(len(self.defenses)):
-            unit = self.defenses[i]
-            if unit.check_collision(click_rect):
-                coast = unit.upgrade_coast // 2
-                statistic.add_money(coast)
-                self.defenses.pop(i)
-                return
+        index = self.unit_at(position)
+        if index is not None:
+            coast = self.defenses[index].upgrade_coast // 2
+            statistic.add_money(coast)
+            self.remove(index)
 
 
 
 
+    def select(self, step: int) -> None:
+        '''
+        Выбор вида сооружений для постройки, по кругу по KINDS
+        Args:
+            step (int): на сколько видов сдвинуться
+        '''
+        self.kind = (self.kind + step) % len(self.KINDS)
+
+
     def spawn(self, x: int, y: int, statistic: PlayStatistic) -> None:
         
         money = statistic.get_money()
-        unit = Defense(x, y, self.sprites, self.road.y)
+        unit = self.KINDS[self.kind](x, y, self.sprites, self.road.y, self.flipped_sprites)
         coast = unit.upgrade_coast
         if coast > money:
             return
-        if unit.check_collision(self.road.sprite_rect):
+        if not self.grid.is_free(unit.sprite_rect):
             return
-        self.defenses.append(unit)
+        self.add(unit)
         statistic.update_money(money - coast)
 
 
-    def drow(self):
+    def update(self) -> None:
+        '''
+        Один игровой тик защитных сооружений без отрисовки:
+        полет снарядов с попаданиями и фаза боя
+        '''
+        self.projectiles.update()
+        self.fire()
+
+
+    def targets(self, units: list) -> np.ndarray:
+        '''
+        Ближайшие живые цели сооружений: кандидатов в радиусе всех сооружений
+        находит один запрос к сетке врагов, ближайший выбирается только среди них.
+        При равных расстояниях выбирается враг, который появился раньше
+        Args:
+            units (list): сооружения
+
+        Returns:
+            np.ndarray: индекс цели в хранилище врагов для каждого сооружения, -1 если цели нет
+        '''
+        centers = np.array([unit.sprite_rect.center for unit in units], dtype=np.float64)
+        radius = np.array([unit.distance for unit in units], dtype=np.float64)
+        owner, rows, distance2 = self.enemies.in_range(centers[:, 0], centers[:, 1], radius)
+        return nearest_targets(owner, rows, distance2, len(units), self.enemies.enemies.uid)
+
+
+    def fire(self) -> None:
+        '''
+        Фаза боя: все готовые сооружения выбирают ближайшие цели одним
+        запросом к сетке врагов и выпускают по ним снаряды,
+        урон наносится когда снаряды долетят. Снаряды всех видов сооружений
+        запускаются одним вызовом, вид задают только их поля.
+        Результат не зависит от порядка сооружений в списке
+        '''
+        ready = [unit for unit in self.defenses if unit.is_ready()]
+        if not ready or not len(self.enemies):
+            return
+        targets = self.targets(ready)
+        fired = targets >= 0
+        if not fired.any():
+            return
+        shooters = [unit for unit, f in zip(ready, fired) if f]
+        modifiers = self.enemies.modifiers
+        starts = np.array([unit.get_x_y_for_bulet() for unit in shooters], dtype=np.float64)
+        self.projectiles.launch(
+                            starts[:, 0],
+                            starts[:, 1],
+                            targets[fired],
+                            np.array([unit.demage for unit in shooters], dtype=np.float64),
+                            np.array([unit.homing for unit in shooters]),
+                            np.array([modifiers.kind(unit.effect) for unit in shooters]),
+                            np.array([unit.splash for unit in shooters], dtype=np.float32),
+                            np.array([unit.chain for unit in shooters], dtype=np.int8))
+        for unit in shooters:
+            unit.reload()
+
+
+    def drow(self) -> None:
         
+        self.drow_defenses(self.screen)
+        self.drow_bulets(self.screen)
+
+
+    def drow_defenses(self, screen: pygame.Surface, area: pygame.Rect = None) -> None:
+        '''
+        Отрисовка сооружений, их радиусов и подписей
+        Args:
+            screen (pygame.Surface): поверхность для рисования
+            area (pygame.Rect): рисовать только сооружения, задевающие эту область
+        '''
         for unit in self.defenses:
-            unit.hit(self.enemies, self.bulets)
-            unit.drow(self.screen)
-        i = 0
-        while i < len(self.bulets):
-            self.bulets[i].drow(self.screen)
-            if not self.bulets[i].is_alive():
-                self.bulets.pop(i)
-                continue
-            i += 1
+            if area is None or unit.area().colliderect(area):
+                unit.drow(screen)
+
+
+    def drow_bulets(self, screen: pygame.Surface) -> list:
+        '''
+        Отрисовка снарядов
+        Args:
+            screen (pygame.Surface): поверхность для рисования
+
+        Returns:
+            list: области, которые занимает каждый снаряд
+        '''
+        return self.projectiles.drow(screen)
   
\ No newline at end of file
@@ -0,0 +1,43 @@
+import numpy as np
+
+'''
+Векторные функции фазы боя: пары сооружение -> враг в радиусе находит
+сетка врагов SpatialGrid.query_many, а ближайшая цель каждого сооружения
+выбирается без сортировки свертками отрезков пар каждого сооружения
+'''
+
+
+def nearest_targets(
+                    owner: np.ndarray,
+                    rows: np.ndarray,
+                    distance2: np.ndarray,
+                    n: int,
+                    order: np.ndarray = None
+                    ) -> np.ndarray:
+    '''
+    Выбор ближайшей цели для каждого сооружения из пар-кандидатов.
+    Пары одного сооружения должны идти подряд, как их возвращает
+    SpatialGrid.query_many. Сравниваются квадраты расстояний, при равенстве выбирается
+    враг с меньшим значением order (по умолчанию с меньшим индексом)
+    Args:
+        owner (np.ndarray): номер сооружения для каждой пары
+        rows (np.ndarray): индекс врага для каждой пары
+        distance2 (np.ndarray): квадрат расстояния для каждой пары
+        n (int): количество сооружений
+        order (np.ndarray): порядок врагов для равных расстояний
+
+    Returns:
+        np.ndarray: индекс цели для каждого сооружения, -1 если цели нет
+    '''
+    targets = np.full(n, -1, dtype=np.int64)
+    if not len(rows):
+        return targets
+    tie = rows if order is None else order[rows]
+    starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    lengths = np.diff(np.r_[starts, len(owner)])
+    best = np.minimum.reduceat(distance2, starts)
+    # среди самых близких врагов сооружения выбирается меньший tie
+    tie = np.where(distance2 == np.repeat(best, lengths), tie, np.iinfo(np.int64).max)
+    chosen = tie == np.repeat(np.minimum.reduceat(tie, starts), lengths)
+    targets[owner[chosen]] = rows[chosen]
+    return targets
@@ -0,0 +1,172 @@
+import numpy as np
+
+
+
+class EnemyStore:
+    '''
+    Хранилище врагов в виде структуры массивов: каждое поле всех врагов
+    лежит в своем непрерывном массиве NumPy, а i-й враг это i-й элемент
+    каждого массива. Благодаря этому движение, проверка прибытия
+    и проверка гибели выполняются одним векторным проходом.
+    Массивы растут удвоением и не сжимаются, удаленные строки просто
+    переиспользуются следующими врагами, поэтому появление и гибель врагов
+    не выделяют память. Удаление переносит на место удаленных строк врагов
+    с конца хранилища, так что порядок строк не сохраняется:
+    порядок появления врагов хранит поле uid
+
+    Args:
+        capacity (int): начальная вместимость массивов
+
+    Attributes:
+        size (int): количество врагов в хранилище
+        capacity (int): текущая вместимость массивов
+        arrays (dict): имя поля -> массив длиной capacity
+        x (np.ndarray): координаты центров по горизонтали
+        prev_x (np.ndarray): координаты по горизонтали до последнего перемещения,
+            нужны для плавной отрисовки между тиками
+        y (np.ndarray): координаты центров по вертикали
+        prev_y (np.ndarray): координаты по вертикали до последнего перемещения
+        health (np.ndarray): текущее здоровье
+        total_health (np.ndarray): максимальное здоровье
+        speed (np.ndarray): базовая скорость передвижения, итоговую дает Modifiers.speed
+        damage (np.ndarray): урон крепости при прибытии
+        money (np.ndarray): деньги за уничтожение
+        sprite (np.ndarray): индекс спрайта
+        uid (np.ndarray): порядковый номер врага, по нему разрешаются равные расстояния
+        slow, poison, shred (np.ndarray): сила временных эффектов, см. modifiers.EFFECTS
+        slow_ticks, poison_ticks, shred_ticks (np.ndarray): сколько тиков эффекты еще действуют
+    '''
+    FIELDS = (
+        ("x", np.float64),
+        ("prev_x", np.float64),
+        ("y", np.float64),
+        ("prev_y", np.float64),
+        ("health", np.float64),
+        ("total_health", np.float64),
+        ("speed", np.float64),
+        ("damage", np.int64),
+        ("money", np.int64),
+        ("sprite", np.int16),
+        ("uid", np.int64),
+        ("slow", np.float32),
+        ("slow_ticks", np.int16),
+        ("poison", np.float32),
+        ("poison_ticks", np.int16),
+        ("shred", np.float32),
+        ("shred_ticks", np.int16),
+        )
+
+    def __init__(self, capacity: int = 256) -> None:
+
+        self.size = 0
+        self.capacity = capacity
+        self.arrays = {name: np.zeros(capacity, dtype) for name, dtype in self.FIELDS}
+
+
+    def __len__(self) -> int:
+
+        return self.size
+
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        '''
+        Returns:
+            np.ndarray: представление поля name только для существующих врагов
+        '''
+        arrays = self.__dict__.get("arrays")
+        if arrays is None or name not in arrays:
+            raise AttributeError(name)
+        return arrays[name][:self.size]
+
+
+    def reserve(self, capacity: int) -> None:
+        '''
+        Увеличивает вместимость массивов минимум до capacity
+        (вдвое, чтобы добавление в среднем стоило O(1))
+        Args:
+            capacity (int): необходимая вместимость
+        '''
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        for name, array in self.arrays.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[name] = grown
+        self.capacity = capacity
+
+
+    def append(self, **values) -> int:
+        '''
+        Добавляет врага в конец хранилища, незаданные поля равны нулю
+        Args:
+            **values: значения полей врага по именам из FIELDS
+
+        Returns:
+            int: индекс нового врага
+        '''
+        self.reserve(self.size + 1)
+        index = self.size
+        for name, array in self.arrays.items():
+            array[index] = values.get(name, 0)
+        self.size += 1
+        return index
+
+
+    def extend(self, count: int, **values) -> None:
+        '''
+        Добавляет count врагов в конец хранилища одним векторным копированием.
+        Строки после удаленных врагов переиспользуются, поэтому незаданные поля обнуляются
+        Args:
+            count (int): количество новых врагов
+            **values: массивы длиной count или скаляры по именам из FIELDS
+        '''
+        self.reserve(self.size + count)
+        for name, array in self.arrays.items():
+            array[self.size:self.size + count] = values.get(name, 0)
+        self.size += count
+
+
+    def find(self, uids: np.ndarray) -> np.ndarray:
+        '''
+        Поиск строк по значениям поля uid
+        Args:
+            uids (np.ndarray): искомые uid
+
+        Returns:
+            np.ndarray: индекс строки для каждого uid, -1 если такой строки нет
+        '''
+        uids = np.asarray(uids, dtype=np.int64)
+        rows = np.full(len(uids), -1, dtype=np.int64)
+        if not self.size or not len(uids):
+            return rows
+        order = np.argsort(self.uid, kind="stable")
+        sorted_uids = self.uid[order]
+        position = np.minimum(np.searchsorted(sorted_uids, uids), self.size - 1)
+        found = sorted_uids[position] == uids
+        rows[found] = order[position[found]]
+        return rows
+
+
+    def remove(self, mask: np.ndarray) -> None:
+        '''
+        Удаляет всех врагов отмеченных в маске.
+        Дыры перед новой границей хранилища заполняются выжившими врагами
+        из хвоста, поэтому перемещается только O(k) строк для k удаленных
+        Args:
+            mask (np.ndarray): булева маска длиной size, истина для удаляемых
+        '''
+        removed = np.flatnonzero(mask)
+        if not len(removed):
+            return
+        size = self.size - len(removed)
+        holes = removed[removed < size]
+        movers = size + np.flatnonzero(~mask[size:self.size])
+        for array in self.arrays.values():
+            array[holes] = array[movers]
+        self.size = size
+
+
+    def clear(self) -> None:
+
+        self.size = 0
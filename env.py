@@ -0,0 +1,224 @@
+import argparse
+import time
+import numpy as np
+from flowfield import GameMap
+from simulation import Simulation
+from balance import SLOTS
+
+'''
+Среда для обучения и оценки ботов, которые строят сооружения.
+VectorEnv ведет N независимых безголовых игр в ногу: за один step каждая
+игра получает свое действие и продвигается на одинаковое число тиков,
+после чего наблюдения, награды и признаки конца всех игр записываются
+в одни и те же заранее выделенные массивы NumPy
+
+Пример:
+    env = VectorEnv(256, seed=0, frame_skip=5)
+    observations = env.reset()
+    while True:
+        actions = policy(observations)
+        observations, rewards, dones = env.step(actions)
+'''
+
+
+class VectorEnv:
+    '''
+    N игр, которые продвигаются одновременно.
+    Действие каждой игры это целое число:
+        0                   ничего не делать
+        1 .. S              построить или улучшить сооружение на месте slots[a-1]
+        S+1 .. 2S           продать сооружение на месте slots[a-S-1]
+    Наблюдение каждой игры это строка observations:
+        здоровье крепости (доля), деньги, уровень, количество врагов,
+        скорость новых врагов, уровни сооружений на местах (0 если пусто),
+        сумма здоровья врагов по lanes полосам поля слева направо.
+    Награда за шаг это набранные очки минус потерянное здоровье крепости.
+    Закончившаяся игра (крепость разрушена или прошло max_ticks тиков)
+    сразу заменяется новой со следующим seed, так что после step
+    наблюдение такой игры уже относится к новой игре
+
+    Args:
+        n (int): количество игр
+        seed (int): seed первой игры, игры получают seed, seed+1, ...
+        frame_skip (int): сколько тиков продвигается каждая игра за step
+        max_ticks (int): наибольшая длина игры в тиках
+        slots (list): места (х,у), на которых боты могут строить
+        lanes (int): количество полос поля в наблюдении
+        map_path (str): файл карты, None для прямой дороги
+
+    Attributes:
+        games (list): текущие игры
+        slots (np.ndarray): места для сооружений
+        observations (np.ndarray): наблюдения n x (SCALARS + места + полосы), переиспользуется каждый step
+        scalars (np.ndarray): представление первых SCALARS столбцов observations
+        slot_levels (np.ndarray): представление столбцов уровней сооружений
+        lane_health (np.ndarray): представление столбцов здоровья врагов по полосам
+        rewards (np.ndarray): награды последнего step
+        dones (np.ndarray): истина для игр, закончившихся на последнем step
+        episode_scores (np.ndarray): очки последней закончившейся игры в каждой среде
+        next_seed (int): seed для следующей новой игры
+    '''
+    SCALARS = ("health", "money", "level", "enemies", "speed")
+
+    def __init__(
+                self,
+                n: int,
+                seed: int = 0,
+                frame_skip: int = 1,
+                max_ticks: int = 15000,
+                slots: list = SLOTS,
+                lanes: int = 10,
+                map_path: str = None
+                ) -> None:
+
+        self.n = n
+        self.frame_skip = frame_skip
+        self.max_ticks = max_ticks
+        self.slots = np.array(slots, dtype=np.int64)
+        self.lanes = lanes
+        self.map_text = None
+        if map_path is not None:
+            self.map_text = GameMap.load(map_path).dumps()
+        self.seed = seed
+        self.next_seed = seed
+        scalars = len(self.SCALARS)
+        self.observations = np.zeros((n, scalars + len(self.slots) + lanes), np.float32)
+        self.scalars = self.observations[:, :scalars]
+        self.slot_levels = self.observations[:, scalars:scalars + len(self.slots)]
+        self.lane_health = self.observations[:, scalars + len(self.slots):]
+        self.rewards = np.zeros(n, np.float32)
+        self.dones = np.zeros(n, bool)
+        self.episode_scores = np.zeros(n, np.int64)
+        self.games = [None] * n
+
+
+    @property
+    def n_actions(self) -> int:
+
+        return 1 + 2 * len(self.slots)
+
+
+    def new_game(self, i: int) -> Simulation:
+        '''
+        Новая игра в среде i со следующим seed
+        '''
+        game_map = None if self.map_text is None else GameMap.parse(self.map_text)
+        game = Simulation(seed=self.next_seed, game_map=game_map)
+        self.next_seed += 1
+        self.games[i] = game
+        self.slot_levels[i] = 0
+        return game
+
+
+    def reset(self) -> np.ndarray:
+        '''
+        Новые игры во всех средах, seed снова начинаются с seed
+        Returns:
+            np.ndarray: наблюдения, тот же массив что и observations
+        '''
+        self.next_seed = self.seed
+        for i in range(self.n):
+            self.observe(i, self.new_game(i))
+        self.rewards[:] = 0
+        self.dones[:] = False
+        return self.observations
+
+
+    def act(self, i: int, game: Simulation, action: int) -> None:
+        '''
+        Выполнение действия в игре i. Уровень на месте обновляется сразу,
+        так как сооружения меняются только действиями
+        '''
+        if action <= 0:
+            return
+        slots = len(self.slots)
+        slot = (action - 1) % slots
+        position = tuple(self.slots[slot].tolist())
+        button = Simulation.LEFT if action <= slots else Simulation.RIGHT
+        game.click(button, position)
+        index = game.defenses.unit_at(position)
+        self.slot_levels[i, slot] = 0 if index is None else game.defenses.defenses[index].level
+
+
+    def observe(self, i: int, game: Simulation) -> None:
+        '''
+        Запись наблюдения игры i в строку observations
+        '''
+        tower = game.tower
+        statistic = game.statistic
+        store = game.enemies.enemies
+        row = self.scalars[i]
+        row[0] = tower.health / tower.total_health
+        row[1] = statistic.money
+        row[2] = statistic.level
+        row[3] = len(store)
+        row[4] = game.enemies.speed
+        if len(store):
+            # враги появляются правее края поля, их относим к последней полосе
+            lane = (store.x * (self.lanes / game.road.x1)).astype(np.int64)
+            np.minimum(lane, self.lanes - 1, out=lane)
+            self.lane_health[i] = np.bincount(lane, weights=store.health, minlength=self.lanes)
+        else:
+            self.lane_health[i] = 0
+
+
+    def step(self, actions: np.ndarray) -> tuple:
+        '''
+        Один шаг всех игр: действие, frame_skip тиков, наблюдение
+        Args:
+            actions (np.ndarray): действие для каждой игры
+
+        Returns:
+            tuple: (observations, rewards, dones), всегда одни и те же массивы
+        '''
+        for i, (game, action) in enumerate(zip(self.games, np.asarray(actions).tolist())):
+            score = game.statistic.score
+            health = game.tower.health
+            self.act(i, game, action)
+            game.step(self.frame_skip)
+            self.rewards[i] = (game.statistic.score - score) - (health - game.tower.health)
+            done = game.is_over() or game.ticks >= self.max_ticks
+            self.dones[i] = done
+            if done:
+                self.episode_scores[i] = game.statistic.score
+                game = self.new_game(i)
+            self.observe(i, game)
+        return self.observations, self.rewards, self.dones
+
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Скорость VectorEnv со случайными действиями")
+    parser.add_argument("--envs", type=int, default=256, help="количество игр")
+    parser.add_argument("--steps", type=int, default=200, help="количество шагов")
+    parser.add_argument("--frame-skip", type=int, default=1, help="тиков за шаг")
+    parser.add_argument("--map", default=None, help="файл карты")
+    parser.add_argument("--seed", type=int, default=0, help="seed первой игры")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> None:
+
+    args = parse_args(argv)
+    env = VectorEnv(args.envs, args.seed, args.frame_skip, map_path=args.map)
+    env.reset()
+    rnd = np.random.default_rng(args.seed)
+    # редкие действия, как у бота, который решает раз в секунду
+    actions = np.zeros(args.envs, np.int64)
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        actions[:] = np.where(
+                            rnd.random(args.envs) < 0.04,
+                            rnd.integers(1, env.n_actions, args.envs),
+                            0)
+        env.step(actions)
+    elapsed = time.perf_counter() - start
+    ticks = args.steps * args.envs * args.frame_skip
+    print(
+        f"{args.envs} games x {args.steps} steps in {elapsed:.2f}s: "
+        f"{args.steps / elapsed:.0f} steps/s, {ticks / elapsed:.0f} game ticks/s")
+
+
+if __name__ == "__main__":
+    main()
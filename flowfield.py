@@ -0,0 +1,382 @@
+import heapq
+from collections import deque
+import numpy as np
+import pygame
+
+'''
+Карты с произвольной дорогой и поле направлений для движения врагов.
+Карта это текстовый файл: необязательная первая строка "cell N" задает
+размер клетки в пикселях, дальше по строке символов на ряд клеток:
+    .   трава, на ней строятся сооружения
+    #   дорога
+    S   вход, клетка дороги где появляются враги
+    T   крепость, клетка дороги куда идут враги
+Для каждой клетки дороги хранится расстояние до крепости в клетках
+и следующая клетка пути, так что все враги за тик находят направление
+одним векторным обращением к массивам, сколько бы их ни было
+
+Пример:
+    game_map = GameMap.load("src/maps/fork.txt")
+    game = Simulation(screen=screen, game_map=game_map)
+'''
+
+# порядок соседей задает выбор следующей клетки при равных расстояниях
+NEIGHBOURS = ((0, -1), (-1, 0), (0, 1), (1, 0))
+
+
+class FlowField:
+    '''
+    Поле расстояний до цели по клеткам сетки и следующих клеток пути.
+    Расстояния считаются поиском в ширину от клеток цели по проходимым
+    клеткам с четырьмя соседями. При изменении одной клетки пересчитываются
+    только клетки, чьи расстояния от нее зависят, а результат совпадает
+    с полным пересчетом
+
+    Args:
+        passable (np.ndarray): массив rows x cols, истина для проходимых клеток
+        goals (list): клетки цели (ряд, столбец)
+
+    Attributes:
+        passable (np.ndarray): проходимость клеток
+        goals (set): клетки цели
+        distance (np.ndarray): расстояние до цели в клетках, UNREACHABLE если пути нет
+        next (np.ndarray): номер следующей клетки пути (ряд*cols+столбец),
+            для цели и недостижимых клеток сама клетка
+    '''
+    UNREACHABLE = np.iinfo(np.int32).max
+
+    def __init__(self, passable: np.ndarray, goals: list) -> None:
+
+        self.passable = np.array(passable, dtype=bool)
+        self.goals = set(goals)
+        rows, cols = self.passable.shape
+        self.distance = np.full((rows, cols), self.UNREACHABLE, np.int32)
+        self.next = np.arange(rows * cols, dtype=np.int64).reshape(rows, cols)
+        self.recompute()
+
+
+    def neighbours(self, cell: tuple):
+        '''
+        Проходимые соседи клетки в порядке NEIGHBOURS
+        '''
+        rows, cols = self.passable.shape
+        r, c = cell
+        for dr, dc in NEIGHBOURS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < rows and 0 <= nc < cols and self.passable[nr, nc]:
+                yield nr, nc
+
+
+    def recompute(self) -> None:
+        '''
+        Полный пересчет поля поиском в ширину от клеток цели
+        '''
+        distance = self.distance
+        distance[:] = self.UNREACHABLE
+        queue = deque()
+        for cell in sorted(self.goals):
+            if self.passable[cell]:
+                distance[cell] = 0
+                queue.append(cell)
+        while queue:
+            cell = queue.popleft()
+            d = distance[cell] + 1
+            for n in self.neighbours(cell):
+                if distance[n] > d:
+                    distance[n] = d
+                    queue.append(n)
+        rows, cols = self.passable.shape
+        self.update_next((r, c) for r in range(rows) for c in range(cols))
+
+
+    def update_next(self, cells) -> None:
+        '''
+        Выбор следующей клетки пути: сосед с наименьшим расстоянием
+        Args:
+            cells: клетки (ряд, столбец), у которых пересчитывается следующая клетка
+        '''
+        distance = self.distance
+        cols = self.passable.shape[1]
+        for cell in cells:
+            best = cell
+            d = distance[cell]
+            if d != self.UNREACHABLE and d > 0:
+                for n in self.neighbours(cell):
+                    if distance[n] < d:
+                        best, d = n, distance[n]
+            self.next[cell] = best[0] * cols + best[1]
+
+
+    def set_passable(self, cell: tuple, value: bool) -> set:
+        '''
+        Изменение проходимости одной клетки с пересчетом только затронутой части поля.
+        Новая клетка дороги уменьшает расстояния распространением от нее.
+        Убранная клетка лишает опоры клетки, путь которых шел через нее:
+        они сбрасываются и получают новые расстояния от своих соседей
+        Args:
+            cell (tuple): клетка (ряд, столбец)
+            value (bool): проходима ли клетка теперь
+
+        Returns:
+            set: клетки, у которых изменилось расстояние
+        '''
+        cell = tuple(cell)
+        if bool(self.passable[cell]) == value:
+            return set()
+        self.passable[cell] = value
+        changed = self.open_cell(cell) if value else self.close_cell(cell)
+        touched = set(changed)
+        for c in changed:
+            touched.update(self.neighbours(c))
+        self.update_next(touched)
+        return changed
+
+
+    def open_cell(self, cell: tuple) -> set:
+
+        distance = self.distance
+        if cell in self.goals:
+            distance[cell] = 0
+        else:
+            around = [distance[n] for n in self.neighbours(cell)]
+            if not around or min(around) == self.UNREACHABLE:
+                return {cell}
+            distance[cell] = min(around) + 1
+        changed = {cell}
+        queue = deque([cell])
+        while queue:
+            current = queue.popleft()
+            d = distance[current] + 1
+            for n in self.neighbours(current):
+                if distance[n] > d:
+                    distance[n] = d
+                    changed.add(n)
+                    queue.append(n)
+        return changed
+
+
+    def close_cell(self, cell: tuple) -> set:
+
+        distance = self.distance
+        removed = distance[cell]
+        distance[cell] = self.UNREACHABLE
+        changed = {cell}
+        if removed == self.UNREACHABLE:
+            return changed
+        # клетки, опиравшиеся на убранную, идут слоями по возрастанию расстояния,
+        # поэтому опора каждой проверяется после возможного сброса ее самой
+        queue = deque(n for n in self.neighbours(cell) if distance[n] == removed + 1)
+        lost = []
+        while queue:
+            current = queue.popleft()
+            d = distance[current]
+            if d == self.UNREACHABLE:
+                continue
+            if any(distance[n] == d - 1 for n in self.neighbours(current)):
+                continue
+            distance[current] = self.UNREACHABLE
+            lost.append(current)
+            queue.extend(n for n in self.neighbours(current) if distance[n] == d + 1)
+
+        heap = []
+        for current in lost:
+            for n in self.neighbours(current):
+                if distance[n] != self.UNREACHABLE:
+                    heapq.heappush(heap, (int(distance[n]), n))
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > distance[current]:
+                continue
+            for n in self.neighbours(current):
+                if distance[n] > d + 1:
+                    distance[n] = d + 1
+                    heapq.heappush(heap, (d + 1, n))
+        changed.update(lost)
+        return changed
+
+
+
+class GameMap:
+    '''
+    Карта игрового поля из клеток: дорога, входы и крепость,
+    вместе с полем направлений FlowField по дороге к крепости
+
+    Args:
+        road (np.ndarray): массив rows x cols, истина для клеток дороги
+        entrances (list): клетки входов (ряд, столбец)
+        goals (list): клетки крепости (ряд, столбец)
+        cell (int): размер клетки в пикселях
+
+    Attributes:
+        road (np.ndarray): клетки дороги
+        entrances (list): клетки входов
+        goals (list): клетки крепости
+        cell (int): размер клетки в пикселях
+        rows (int): количество рядов
+        cols (int): количество столбцов
+        width (int): ширина поля в пикселях
+        height (int): высота поля в пикселях
+        field (FlowField): расстояния и следующие клетки пути
+        target_x (np.ndarray): центр следующей клетки пути по горизонтали для каждой клетки
+        target_y (np.ndarray): центр следующей клетки пути по вертикали для каждой клетки
+    '''
+    GRASS = "."
+    ROAD = "#"
+    ENTRANCE = "S"
+    GOAL = "T"
+
+    def __init__(self, road: np.ndarray, entrances: list, goals: list, cell: int = 50) -> None:
+
+        if not entrances or not goals:
+            raise ValueError("map needs at least one entrance and one tower cell")
+        self.road = np.array(road, dtype=bool)
+        self.entrances = [tuple(e) for e in entrances]
+        self.goals = [tuple(g) for g in goals]
+        self.cell = cell
+        self.rows, self.cols = self.road.shape
+        self.width = self.cols * cell
+        self.height = self.rows * cell
+        self.field = FlowField(self.road, self.goals)
+        self.update_targets()
+
+
+    @classmethod
+    def parse(cls, text: str):
+        '''
+        Args:
+            text (str): карта в текстовом виде, см. описание модуля
+
+        Returns:
+            GameMap: карта
+        '''
+        lines = [line.rstrip() for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        cell = 50
+        if lines and lines[0].startswith("cell"):
+            cell = int(lines.pop(0).split()[1])
+        if not lines:
+            raise ValueError("empty map")
+        cols = max(len(line) for line in lines)
+        road = np.zeros((len(lines), cols), bool)
+        entrances, goals = [], []
+        for r, line in enumerate(lines):
+            for c, char in enumerate(line):
+                if char == cls.GRASS:
+                    continue
+                if char not in (cls.ROAD, cls.ENTRANCE, cls.GOAL):
+                    raise ValueError(f"unknown map cell {char!r} at row {r}, column {c}")
+                road[r, c] = True
+                if char == cls.ENTRANCE:
+                    entrances.append((r, c))
+                elif char == cls.GOAL:
+                    goals.append((r, c))
+        return cls(road, entrances, goals, cell)
+
+
+    @classmethod
+    def load(cls, path: str):
+        '''
+        Чтение карты из текстового файла, см. parse
+        '''
+        with open(path, encoding="utf-8") as file:
+            return cls.parse(file.read())
+
+
+    def dumps(self) -> str:
+        '''
+        Returns:
+            str: карта в текстовом виде для parse
+        '''
+        chars = np.where(self.road, self.ROAD, self.GRASS)
+        for r, c in self.entrances:
+            chars[r, c] = self.ENTRANCE
+        for r, c in self.goals:
+            chars[r, c] = self.GOAL
+        return "\n".join([f"cell {self.cell}"] + ["".join(row) for row in chars]) + "\n"
+
+
+    def update_targets(self) -> None:
+        '''
+        Пересчет центров следующих клеток пути по номерам из поля
+        '''
+        nxt = self.field.next
+        self.target_x = (nxt % self.cols + 0.5) * self.cell
+        self.target_y = (nxt // self.cols + 0.5) * self.cell
+
+
+    def cell_rect(self, cell: tuple) -> pygame.Rect:
+        '''
+        Returns:
+            pygame.Rect: область клетки (ряд, столбец) на поле
+        '''
+        r, c = cell
+        return pygame.Rect(c * self.cell, r * self.cell, self.cell, self.cell)
+
+
+    def road_rects(self) -> list:
+        '''
+        Returns:
+            list: области дороги, соседние клетки одного ряда объединены в полосы
+        '''
+        rects = []
+        for r in range(self.rows):
+            row = np.concatenate(([False], self.road[r], [False]))
+            edges = np.flatnonzero(row[1:] != row[:-1])
+            for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                rects.append(pygame.Rect(start * self.cell, r * self.cell, (stop - start) * self.cell, self.cell))
+        return rects
+
+
+    @property
+    def goal_center(self) -> tuple:
+        '''
+        Returns:
+            tuple: центр области, занятой клетками крепости
+        '''
+        rect = self.cell_rect(self.goals[0]).unionall([self.cell_rect(g) for g in self.goals])
+        return rect.center
+
+
+    def cells(self, x: np.ndarray, y: np.ndarray) -> tuple:
+        '''
+        Returns:
+            tuple: ряды и столбцы клеток под точками (x,y), обрезанные по границам карты
+        '''
+        c = np.clip(np.floor_divide(x, self.cell), 0, self.cols - 1).astype(np.int64)
+        r = np.clip(np.floor_divide(y, self.cell), 0, self.rows - 1).astype(np.int64)
+        return r, c
+
+
+    def steer(self, x: np.ndarray, y: np.ndarray) -> tuple:
+        '''
+        Одно векторное обращение к полю для всех точек
+        Args:
+            x (np.ndarray): координаты по горизонтали
+            y (np.ndarray): координаты по вертикали
+
+        Returns:
+            tuple: (центры следующих клеток по х, по у, истина для точек в клетках крепости)
+        '''
+        r, c = self.cells(x, y)
+        return self.target_x[r, c], self.target_y[r, c], self.field.distance[r, c] == 0
+
+
+    def set_road(self, cell: tuple, value: bool) -> set:
+        '''
+        Прокладка или разбор клетки дороги с частичным пересчетом поля.
+        Входы и крепость остаются дорогой всегда
+        Args:
+            cell (tuple): клетка (ряд, столбец)
+            value (bool): дорога ли клетка теперь
+
+        Returns:
+            set: клетки, у которых изменилось расстояние до крепости
+        '''
+        cell = tuple(cell)
+        if not value and (cell in self.entrances or cell in self.goals):
+            raise ValueError(f"cell {cell} is an entrance or the tower")
+        self.road[cell] = value
+        changed = self.field.set_passable(cell, value)
+        if changed:
+            self.update_targets()
+        return changed
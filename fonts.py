@@ -0,0 +1,108 @@
+import pygame
+from collections import OrderedDict
+
+
+
+class FontRegistry:
+    '''
+    Общий на весь процесс реестр шрифтов.
+    Системный шрифт ищется один раз для каждой пары (имя, размер)
+
+    Attributes:
+        fonts (dict): (имя, размер) -> pygame.font.Font
+    '''
+    def __init__(self) -> None:
+
+        self.fonts:dict[tuple, pygame.font.Font] = {}
+
+
+    def get(self, name: str, size: int) -> pygame.font.Font:
+        '''
+        Returns:
+            pygame.font.Font: общий шрифт с указанным именем и размером
+        '''
+        font = self.fonts.get((name, size))
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.SysFont(name, size)
+            self.fonts[(name, size)] = font
+        return font
+
+
+
+class TextCache:
+    '''
+    LRU кэш отрисованных надписей с ключом (шрифт, текст, цвет, сглаживание).
+    Повторная надпись берется из кэша без растеризации глифов,
+    а давно не использованные надписи вытесняются
+
+    Args:
+        registry (FontRegistry): реестр шрифтов
+        max_size (int): наибольшее количество надписей в кэше
+
+    Attributes:
+        registry (FontRegistry): реестр шрифтов
+        max_size (int): наибольшее количество надписей в кэше
+        surfaces (OrderedDict): ключ -> надпись, в порядке последнего использования
+    '''
+    def __init__(self, registry: FontRegistry, max_size: int = 512) -> None:
+
+        self.registry = registry
+        self.max_size = max_size
+        self.surfaces:OrderedDict[tuple, pygame.Surface] = OrderedDict()
+
+
+    def __len__(self) -> int:
+
+        return len(self.surfaces)
+
+
+    def render(
+                self,
+                font: tuple,
+                text: str,
+                color: tuple,
+                antialias: bool = True
+                ) -> pygame.Surface:
+        '''
+        Args:
+            font (tuple): (имя, размер) шрифта
+            text (str): текст надписи
+            color (tuple): цвет надписи
+            antialias (bool): сглаживание
+
+        Returns:
+            pygame.Surface: общая отрисованная надпись, ее нельзя изменять
+        '''
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.registry.get(*font).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+
+FONTS = FontRegistry()
+TEXTS = TextCache(FONTS)
+
+
+def get_font(name: str, size: int) -> pygame.font.Font:
+    '''
+    Returns:
+        pygame.font.Font: шрифт из общего реестра процесса
+    '''
+    return FONTS.get(name, size)
+
+
+def render_text(font: tuple, text: str, color: tuple, antialias: bool = True) -> pygame.Surface:
+    '''
+    Returns:
+        pygame.Surface: надпись из общего кэша процесса
+    '''
+    return TEXTS.render(font, text, color, antialias)
@@ -0,0 +1,282 @@
+import os
+import argparse
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+import pygame
+from flowfield import GameMap
+from render import StaticLayer
+from replay import Replay
+from simulation import Simulation
+
+'''
+Запись кадров игры в сжатый файл без внешних программ захвата экрана.
+Главный цикл только копирует екран в байты и кладет копию в ограниченную
+очередь, кодирует и пишет кадры фоновый поток. Если поток не успевает
+и очередь заполнена, кадр пропускается, а не ждет, поэтому запись
+не меняет время кадров игры.
+Формат: заголовок (метка, версия, ширина, высота), затем кадры:
+заголовок кадра (номер, тик игры, время захвата, ключевой ли кадр, длина)
+и пиксели RGB, сжатые zlib. Неключевой кадр хранит XOR с предыдущим
+записанным кадром, так что неизменившиеся области сжимаются почти в ноль.
+Номера кадров считают и пропущенные кадры, пропуски видны по разрывам
+
+Пример:
+    python game.py --footage session.tdv
+    python footage.py headless.tdv --ticks 5000 --seed 3
+'''
+
+MAGIC = b"TDFV"
+VERSION = 1
+HEADER = struct.Struct("<4sBHH")
+FRAME = struct.Struct("<IId?I")
+# каждый KEY_EVERY записанный кадр хранится целиком
+KEY_EVERY = 50
+# в pygame до 2.1.3 есть только tostring и fromstring
+TO_BYTES = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+FROM_BYTES = getattr(pygame.image, "frombytes", None) or pygame.image.fromstring
+
+
+class FrameRecorder:
+    '''
+    Запись кадров в файл фоновым потоком
+    Args:
+        path (str): путь к файлу записи
+        size (tuple): размер кадров (ширина, высота)
+        max_queue (int): сколько кадров может ждать кодирования
+        level (int): уровень сжатия zlib
+
+    Attributes:
+        path (str): путь к файлу записи
+        size (tuple): размер кадров
+        level (int): уровень сжатия zlib
+        queue (queue.Queue): кадры, ожидающие кодирования
+        thread (threading.Thread): поток кодирования
+        captured (int): количество кадров, переданных в capture
+        dropped (int): количество пропущенных из-за полной очереди кадров
+        written (int): количество записанных кадров
+        error (BaseException): ошибка потока кодирования, None если ее не было
+        start (float): время начала записи по time.perf_counter
+    '''
+    def __init__(self, path: str, size: tuple, max_queue: int = 8, level: int = 1) -> None:
+
+        self.path = path
+        self.size = tuple(size)
+        self.level = level
+        self.queue = queue.Queue(max_queue)
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self.start = time.perf_counter()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, *self.size))
+        self.thread = threading.Thread(target=self.run, name="footage", daemon=True)
+        self.thread.start()
+
+
+    def capture(self, surface: pygame.Surface, tick: int = 0, block: bool = False) -> bool:
+        '''
+        Копия поверхности в очередь кодирования. Полнота очереди проверяется
+        до копирования, так что пропущенный кадр почти ничего не стоит
+        Args:
+            surface (pygame.Surface): екран или поверхность размера size
+            tick (int): тик игры этого кадра
+            block (bool): ждать места в очереди вместо пропуска кадра
+
+        Returns:
+            bool: ложь если кадр пропущен
+        '''
+        number = self.captured
+        self.captured += 1
+        if not block and self.queue.full():
+            self.dropped += 1
+            return False
+        frame = (number, tick, time.perf_counter() - self.start, TO_BYTES(surface, "RGB"))
+        # очередь пополняет только этот поток, так что после проверки место в ней есть
+        self.queue.put(frame, block)
+        return True
+
+
+    def run(self) -> None:
+        '''
+        Цикл потока кодирования до кадра None
+        '''
+        previous = None
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                number, tick, moment, pixels = frame
+                pixels = np.frombuffer(pixels, np.uint8)
+                key = previous is None or self.written % KEY_EVERY == 0
+                data = pixels if key else np.bitwise_xor(pixels, previous)
+                data = zlib.compress(data, self.level)
+                self.file.write(FRAME.pack(number, tick, moment, key, len(data)))
+                self.file.write(data)
+                previous = pixels
+                self.written += 1
+            except BaseException as error:
+                # дальше кадры только вынимаются, чтобы capture не ждал
+                self.error = error
+
+
+    def close(self) -> None:
+        '''
+        Дописывает кадры из очереди и закрывает файл.
+        Ошибка потока кодирования, если она была, поднимается здесь
+        '''
+        if self.file is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        self.file = None
+        if self.error is not None:
+            raise self.error
+
+
+
+class FrameReader:
+    '''
+    Чтение файла записи кадров
+    Args:
+        path (str): путь к файлу записи
+
+    Attributes:
+        size (tuple): размер кадров (ширина, высота)
+        data (bytes): содержимое файла
+    '''
+    def __init__(self, path: str) -> None:
+
+        with open(path, "rb") as file:
+            self.data = file.read()
+        magic, version, width, height = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a footage file of version {VERSION}")
+        self.size = (width, height)
+
+
+    def __iter__(self):
+        '''
+        Yields:
+            tuple: (номер кадра, тик игры, время захвата, пиксели RGB в bytes)
+        '''
+        data = self.data
+        position = HEADER.size
+        previous = None
+        while position + FRAME.size <= len(data):
+            number, tick, moment, key, length = FRAME.unpack_from(data, position)
+            position += FRAME.size
+            pixels = np.frombuffer(zlib.decompress(data[position:position + length]), np.uint8)
+            position += length
+            if not key:
+                pixels = np.bitwise_xor(pixels, previous)
+            previous = pixels
+            yield number, tick, moment, pixels.tobytes()
+
+
+    def surface(self, pixels: bytes) -> pygame.Surface:
+        '''
+        Returns:
+            pygame.Surface: кадр в виде поверхности
+        '''
+        return FROM_BYTES(pixels, self.size, "RGB")
+
+
+
+def render_headless(
+                    path: str,
+                    ticks: int,
+                    seed: int = 0,
+                    frame_skip: int = 1,
+                    replay: Replay = None,
+                    game_map: GameMap = None,
+                    level: int = None
+                    ) -> FrameRecorder:
+    '''
+    Игра без дисплея с записью каждого кадра так быстро, как позволяет процессор.
+    Кадры не пропускаются: когда очередь полна, игра ждет поток кодирования.
+    Кадр пишется на каждом frame_skip тике, а игра между кадрами
+    останавливается на тиках нажатий записи, так что нажатия попадают
+    в те же тики, что и в записанной игре
+    Args:
+        path (str): путь к файлу записи
+        ticks (int): длина игры в тиках
+        seed (int): seed игры, если не задана запись ввода
+        frame_skip (int): тиков между кадрами
+        replay (Replay): запись ввода для воспроизведения, None для игры без нажатий
+        game_map (GameMap): карта, None для прямой дороги или карты записи ввода
+        level (int): начальный уровень игры, None оставить обычный
+
+    Returns:
+        FrameRecorder: закрытая запись со счетчиками кадров
+    '''
+    if replay is not None:
+        seed = replay.seed
+        if game_map is None:
+            game_map = replay.game_map()
+    size = (1000, 600) if game_map is None else (game_map.width, game_map.height)
+    screen = pygame.Surface(size)
+    game = Simulation(size[0], screen, seed=seed, height=size[1], game_map=game_map)
+    if level is not None:
+        game.statistic.level = level
+    layer = StaticLayer(size, (50,205,50))
+    events = [] if replay is None else replay.events
+    next_event = 0
+    recorder = FrameRecorder(path, size)
+    try:
+        while game.ticks < ticks and not game.is_over():
+            while next_event < len(events) and events[next_event][0] <= game.ticks:
+                _, button, position = events[next_event]
+                game.click(button, position)
+                next_event += 1
+            n_ticks = min(frame_skip - game.ticks % frame_skip, ticks - game.ticks)
+            if next_event < len(events):
+                n_ticks = min(n_ticks, events[next_event][0] - game.ticks)
+            game.step(n_ticks)
+            if game.ticks % frame_skip and game.ticks < ticks and not game.is_over():
+                continue
+            layer.drow(game)
+            game.drow_dynamic()
+            recorder.capture(screen, game.ticks, block=True)
+    finally:
+        recorder.close()
+    return recorder
+
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Запись кадров безголовой игры в файл")
+    parser.add_argument("path", help="файл записи кадров")
+    parser.add_argument("--ticks", type=int, default=3000, help="длина игры в тиках")
+    parser.add_argument("--seed", type=int, default=0, help="seed игры")
+    parser.add_argument("--frame-skip", type=int, default=1, help="тиков между кадрами")
+    parser.add_argument("--replay", default=None, help="воспроизвести запись ввода из replay.py")
+    parser.add_argument("--map", default=None, help="файл карты")
+    parser.add_argument("--level", type=int, default=None, help="начальный уровень игры")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> None:
+
+    args = parse_args(argv)
+    replay = None if args.replay is None else Replay.load(args.replay)
+    game_map = None if args.map is None else GameMap.load(args.map)
+    start = time.perf_counter()
+    recorder = render_headless(args.path, args.ticks, args.seed, args.frame_skip, replay, game_map, args.level)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{recorder.written} frames in {elapsed:.2f}s: {recorder.written / elapsed:.0f} frames/s, "
+        f"{os.path.getsize(args.path) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,18 @@
+import os
+import struct
+import warnings
 import pygame
+import argparse
 from characters import *
+from simulation import Simulation
+from flowfield import GameMap
+from fonts import render_text
+from render import DirtyRenderer, StaticLayer
+from replay import ReplayRecorder
+from footage import FrameRecorder
+from profiler import FrameProfiler
+from assets import ATLAS, BUNDLE
+from snapshot import save, load
 
 
 
@@ -12,18 +25,18 @@ def show_game_over(screen: pygame.Surface, score: int) -> None:
     '''
     texts = ["GAME OVER", f"YOUR SCORE {score}", "press any key to start new game"]
     screen.fill((0,0,0))
-    font = pygame.font.SysFont("arialalack", 60)
+    font = ("arialalack", 60)
     color = (220,220,220)
     scren_rec = screen.get_rect()
     x = scren_rec.centerx
     y = 250
     for row in texts:
-        text = font.render(row, False, color)
+        text = render_text(font, row, color, False)
         text_rect = text.get_rect()
         text_rect.center = (x,y)
         y += text_rect.height + 20
         screen.blit(text, text_rect)
-        font = pygame.font.SysFont("arialalack", 35)
+        font = ("arialalack", 35)
 
 
 
@@ -40,16 +53,17 @@ def show_menu(screen: pygame.Surface) -> None:
                 "Для того, чтобы модернизировать сооружение нажмите на него ЛКМ и ПКМ, чтобы разрушить",
                 "Стоимость улучшений отображается под или над сооружением",
                 "За разрушенное сооружение Вы получаете обратно половину его стоимости",
-                "Нажмите Space/Esc, чтобы поставить игру на паузу/продолжить игру"
+                "Нажмите Space/Esc, чтобы поставить игру на паузу/продолжить игру",
+                "Клавиши 1-4 переключают скорость игры: 1x, 2x, 4x, 16x"
                 ]
     screen.fill((0,0,0))
-    font = pygame.font.SysFont("arialalack", 30)
+    font = ("arialalack", 30)
     color = (220,220,220)
     scren_rec = screen.get_rect()
     x = scren_rec.centerx
     y = 150
     for row in instructions:
-        text = font.render(row, False, color)
+        text = render_text(font, row, color, False)
         text_rect = text.get_rect()
         text_rect.center = (x,y)
         y += text_rect.height + 10
@@ -61,7 +75,9 @@ def generate_game_objects(
                             screen: pygame.Surface,
                             tower_img: str,
                             enemy_src: str,
-                            defense_src: str) -> tuple:
+                            defense_src: str,
+                            seed: int = None,
+                            map_path: str = None) -> Simulation:
     '''
     функция генераци игровых обьектов
     Args:
@@ -70,32 +86,132 @@ def generate_game_objects(
         tower_img (str): путь к изображению крепости
         enemy_src: (str): путь к директории со спрайтами врагов
         defense_src (str): путь к директории со спрайтами защитных
+        seed (int): seed игры, None для случайного
+        map_path (str): файл карты, None для прямой дороги
     Returns:
-            tower (Tower): объект крепости
-            road (Road): объект дороги
-            statistic (PlayStatistic): объект статистики игры
-            enemies (Enemies): объект списка врагов
-            defenses (Defenses): объект списка защитных сооружений
+            Simulation: игра, которая хранит крепость, дорогу, статистику,
+            врагов и защитные сооружения
     '''
 
-    tower = Tower(tower_img)
-    road = Road(tower, w)
-    statistic = PlayStatistic(w)
-    enemies = Enemies(enemy_src, tower, road, screen, statistic)
-    defenses = Defenses(defense_src, tower, road, screen, enemies)
-    
-    return (tower, road, statistic, enemies, defenses)
+    game_map = None if map_path is None else GameMap.load(map_path)
+    return Simulation(w, screen, tower_img, enemy_src, defense_src, seed, game_map=game_map)
 
 
 
-def main():
+def parse_args(argv: list = None) -> argparse.Namespace:
+    '''
+    функция разбора параметров командной строки
+    Args:
+        argv (list): параметры, по умолчанию берутся из sys.argv
+    '''
+    parser = argparse.ArgumentParser(description="Tower Defence")
+    parser.add_argument(
+                        "--dirty-rects",
+                        action="store_true",
+                        help="обновлять на дисплее только изменившиеся области")
+    parser.add_argument(
+                        "--seed",
+                        type=int,
+                        default=None,
+                        help="seed для всех игр сессии, по умолчанию случайный")
+    parser.add_argument(
+                        "--record",
+                        default=None,
+                        metavar="PATH",
+                        help="записывать нажатия в файл для replay.py, "
+                        "следующие игры сессии пишутся в PATH-2, PATH-3 ...")
+    parser.add_argument(
+                        "--profile",
+                        action="store_true",
+                        help="замерять время фаз кадра с самого начала, "
+                        "F3 включает и выключает замер и панель в игре")
+    parser.add_argument(
+                        "--profile-csv",
+                        default=None,
+                        metavar="PATH",
+                        help="при выходе записать время фаз каждого кадра в CSV")
+    parser.add_argument(
+                        "--bundle",
+                        default=BUNDLE,
+                        metavar="PATH",
+                        help="пакет спрайтов от python assets.py, используется если существует")
+    parser.add_argument(
+                        "--map",
+                        default=None,
+                        metavar="PATH",
+                        help="играть на карте из файла, например src/maps/fork.txt")
+    parser.add_argument(
+                        "--autosave",
+                        default=None,
+                        metavar="PATH",
+                        help="сохранять снимок игры в PATH каждые 10 секунд, "
+                        "при запуске продолжить игру из него, если он есть")
+    parser.add_argument(
+                        "--footage",
+                        default=None,
+                        metavar="PATH",
+                        help="записывать кадры в сжатый файл фоновым потоком, "
+                        "безголовая запись без дисплея: python footage.py")
+    return parser.parse_args(argv)
+
+
+
+def load_autosave(path: str, screen: pygame.Surface) -> Simulation:
+    '''
+    Загрузка автосохранения. Снимок старой версии или испорченный файл
+    не мешают запуску: выводится предупреждение и начинается новая игра
+    Args:
+        path (str): путь к снимку
+        screen (pygame.Surface): екран игры
+
+    Returns:
+        Simulation: продолженная игра или None, если продолжать нечего
+    '''
+    if not os.path.exists(path):
+        return None
+    try:
+        game = load(path, screen)
+    except (ValueError, struct.error, OSError) as error:
+        warnings.warn(f"autosave {path} is not loaded, starting a new game: {error}")
+        return None
+    if game.is_over():
+        return None
+    return game
+
+
+
+def record_path(path: str, number: int) -> str:
+    '''
+    Returns:
+        str: путь к файлу записи для игры с номером number в сессии
+    '''
+    if number == 1:
+        return path
+    stem, dot, ext = path.rpartition(".")
+    if not stem:
+        return f"{path}-{number}"
+    return f"{stem}-{number}.{ext}"
+
+
+
+def main(args: argparse.Namespace = None):
     '''
     Главная функция в которой происходит инициализация всех объектов и 
     запуск цикла игры
     обработка пользовательского ввода
+    Args:
+        args (argparse.Namespace): параметры запуска, см. parse_args
     '''
+    if args is None:
+        args = parse_args([])
     w, h = 1000, 600
-    FPS = 25
+    if args.map:
+        game_map = GameMap.load(args.map)
+        w, h = game_map.width, game_map.height
+    # частота кадров отрисовки, игра идет с частотой Simulation.TICK_RATE
+    # независимо от нее, а враги между тиками рисуются с интерполяцией
+    FPS = 60
+    SPEEDS = {pygame.K_1: 1, pygame.K_2: 2, pygame.K_3: 4, pygame.K_4: 16}
     # спрайты юнитов взяты с сайта:
     # http://freegameassets.blogspot.com/2015/02/free-tower-defence-sets-this-free-tower.html
     tower_img = "src/tower.png"
@@ -103,24 +219,42 @@ def main():
     defense_src = "src/defenses/"
     screen_size = (w, h)
     pygame.init()
+    if args.bundle and os.path.exists(args.bundle):
+        ATLAS.load_bundle(args.bundle)
     screen = pygame.display.set_mode(screen_size)
     pygame.display.set_caption('Tower Defence') 
     bg_color = (50,205,50)
     timer = pygame.time.Clock()
-    tower, road, statistic, enemies, defenses = generate_game_objects(
+    renderer = DirtyRenderer(screen, bg_color) if args.dirty_rects else None
+    layer = StaticLayer(screen_size, bg_color)
+    profiler = FrameProfiler(enabled=args.profile, keep_samples=args.profile_csv is not None)
+    footage = None if args.footage is None else FrameRecorder(args.footage, screen_size)
+    games_started = 0
+    autosave_every = 10 * Simulation.TICK_RATE
+    saved_at = 0
+    speed = 1
+    frame_time = 1 / FPS
+    game = generate_game_objects(
             w,
             screen,
             tower_img,
             enemy_src,
-            defense_src
+            defense_src,
+            args.seed,
+            args.map
             )
+    game.profiler = profiler
     running = True
     new_game = True
     menu = True
     game_over = False
     while running:
+        dirty = None
         if menu:
             show_menu(screen)
+            profiler.mark("drow")
+            if renderer is not None:
+                renderer.invalidate()
             for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         running = False
@@ -132,17 +266,37 @@ def main():
         else:
             
             if new_game:
-                tower, road, statistic, enemies, defenses = generate_game_objects(
-                    w,
-                    screen,
-                    tower_img,
-                    enemy_src,
-                    defense_src)
+                if game.recorder is not None:
+                    game.recorder.close(game.ticks)
+                resumed = None
+                if games_started == 0 and args.autosave:
+                    resumed = load_autosave(args.autosave, screen)
+                if resumed is not None:
+                    game = resumed
+                else:
+                    game = generate_game_objects(
+                        w,
+                        screen,
+                        tower_img,
+                        enemy_src,
+                        defense_src,
+                        args.seed,
+                        args.map)
+                game.profiler = profiler
+                saved_at = game.ticks
+                games_started += 1
+                # запись ввода воспроизводится с начала игры, продолженную игру не записываем
+                if args.record and resumed is None:
+                    path = record_path(args.record, games_started)
+                    game.recorder = ReplayRecorder(path, game.seed, game.road.map)
                 new_game = False
                 game_over = False
             elif game_over:
-                score = statistic.score
+                score = game.statistic.score
                 show_game_over(screen, score)
+                profiler.mark("drow")
+                if renderer is not None:
+                    renderer.invalidate()
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         running = False
@@ -156,24 +310,60 @@ def main():
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         mouse_presses = pygame.mouse.get_pressed()
                         if mouse_presses[0]:
-                            defenses.left_click(event.pos, statistic)
+                            game.click(Simulation.LEFT, event.pos)
                         if mouse_presses[2]:
-                            defenses.right_click(event.pos, statistic)
+                            game.click(Simulation.RIGHT, event.pos)
+                        if event.button in (Simulation.WHEEL_UP, Simulation.WHEEL_DOWN):
+                            game.click(event.button, event.pos)
+                            kind = game.defenses.KINDS[game.defenses.kind].__name__
+                            pygame.display.set_caption(f"Tower Defence {speed}x {kind}")
                     if event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_ESCAPE or event.key == pygame.K_SPACE:
                             menu = True
-                screen.fill(bg_color)
-                road.drow(screen)
-                defenses.drow()
-                tower.drow(screen)
-                enemies.drow()
-                statistic.drow(screen)
-                enemies.move()
-                if tower.destroyed():
+                        if event.key in SPEEDS:
+                            speed = SPEEDS[event.key]
+                            pygame.display.set_caption(f"Tower Defence {speed}x")
+                        if event.key == pygame.K_F3:
+                            profiler.toggle()
+                            if renderer is not None:
+                                renderer.invalidate()
+                profiler.mark("events")
+                # промежуточные тики ускоренной игры не рисуются,
+                # а после долгого кадра догоняется не больше четверти секунды
+                game.advance(frame_time * speed, speed * Simulation.TICK_RATE // 4)
+                if args.autosave and game.ticks >= saved_at + autosave_every:
+                    save(game, args.autosave)
+                    saved_at = game.ticks
+                alpha = game.interpolation()
+                if renderer is not None:
+                    dirty = renderer.drow(game, alpha)
+                else:
+                    layer.drow(game)
+                    game.drow_dynamic(alpha)
+                rect = profiler.drow(screen)
+                if dirty is not None and rect is not None:
+                    dirty.append(rect)
+                profiler.mark("overlay")
+                if game.is_over():
                     game_over = True
-        pygame.display.update()
-        timer.tick(FPS)
+        if dirty is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty)
+        if footage is not None:
+            # только копия екрана в очередь, кодирование идет в фоновом потоке
+            footage.capture(screen, game.ticks)
+        profiler.mark("display")
+        frame_time = timer.tick(FPS) / 1000
+        profiler.mark("wait")
+        profiler.end_frame()
+    if game.recorder is not None:
+        game.recorder.close(game.ticks)
+    if args.profile_csv is not None:
+        profiler.write_csv(args.profile_csv)
+    if footage is not None:
+        footage.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(parse_args())
\ No newline at end of file
@@ -0,0 +1,151 @@
+import argparse
+import sys
+import tracemalloc
+import numpy as np
+from characters import Defense, Enemy
+from enemy_store import EnemyStore
+from projectiles import ProjectileStore
+from simulation import Simulation
+from balance import policy_line
+
+'''
+Отчет о памяти игровых объектов: сколько байт занимает один враг,
+одно сооружение и один снаряд, и как меняется занятая память
+за долгую безголовую игру с большими волнами
+
+Пример:
+    python memory.py --ticks 20000 --level 60
+'''
+
+
+def row_bytes(store: type) -> int:
+    '''
+    Returns:
+        int: байт на одну строку хранилища со структурой массивов
+    '''
+    return sum(np.dtype(dtype).itemsize for _, dtype in store.FIELDS)
+
+
+def slot_names(obj) -> list:
+    '''
+    Returns:
+        list: имена всех слотов объекта по цепочке классов
+    '''
+    names = []
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return names
+
+
+def own_bytes(obj, twin) -> int:
+    '''
+    Размер объекта вместе со значениями, которые принадлежат только ему.
+    Значения, которые тот же слот другого объекта разделяет с ним
+    (общие спрайты, подписи из таблицы уровней, кэшированные числа), не считаются
+    Args:
+        obj: объект
+        twin: другой объект того же класса и состояния
+
+    Returns:
+        int: байт
+    '''
+    total = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        total += sys.getsizeof(obj.__dict__)
+        names = list(vars(obj))
+    else:
+        names = slot_names(obj)
+    for name in names:
+        value = getattr(obj, name)
+        if value is not getattr(twin, name):
+            total += sys.getsizeof(value)
+    return total
+
+
+def entity_sizes(game: Simulation = None) -> dict:
+    '''
+    Returns:
+        dict: байт на врага, сооружение и снаряд
+    '''
+    if game is None:
+        game = Simulation(seed=0)
+    defenses = game.defenses
+    units = [Defense(500, 230, defenses.sprites, game.road.y, defenses.flipped_sprites) for _ in range(2)]
+    return {
+        "enemy": row_bytes(EnemyStore),
+        "enemy view": own_bytes(Enemy(game.enemies, 0), Enemy(game.enemies, 0)),
+        "tower": own_bytes(*units),
+        "bullet": row_bytes(ProjectileStore),
+        }
+
+
+def session_memory(ticks: int = 20000, level: int = 60, sample_every: int = 1000, seed: int = 0) -> list:
+    '''
+    Долгая безголовая игра: сооружения на всех местах вдоль дороги,
+    уровень волн level, крепость чинится, чтобы игра не кончалась.
+    Память меряется через tracemalloc
+    Args:
+        ticks (int): длина игры в тиках
+        level (int): уровень игры
+        sample_every (int): период замера в тиках
+        seed (int): seed игры
+
+    Returns:
+        list: (тик, занятые байты, количество врагов, количество снарядов) для каждого замера
+    '''
+    tracemalloc.start()
+    try:
+        game = Simulation(seed=seed)
+        game.statistic.update_money(10**9)
+        while True:
+            count = len(game.defenses.defenses)
+            policy_line(game)
+            if len(game.defenses.defenses) == count:
+                break
+        game.statistic.level = level
+        samples = []
+        for tick in range(0, ticks, sample_every):
+            game.step(sample_every)
+            game.tower.health = game.tower.total_health
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append((tick + sample_every, current, len(game.enemies), len(game.defenses.projectiles)))
+        return samples
+    finally:
+        tracemalloc.stop()
+
+
+def format_report(sizes: dict, samples: list) -> str:
+    '''
+    Returns:
+        str: отчет в виде текстовой таблицы
+    '''
+    rows = [f"{'entity':<14}{'bytes':>8}"]
+    for name, size in sizes.items():
+        rows.append(f"{name:<14}{size:>8}")
+    rows.append("")
+    rows.append(f"{'tick':>8}{'traced KiB':>12}{'enemies':>9}{'bullets':>9}")
+    for tick, current, enemies, bullets in samples:
+        rows.append(f"{tick:>8}{current / 1024:>12.1f}{enemies:>9}{bullets:>9}")
+    return "\n".join(rows)
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Отчет о памяти игровых объектов")
+    parser.add_argument("--ticks", type=int, default=20000, help="длина игры в тиках")
+    parser.add_argument("--level", type=int, default=60, help="уровень волн")
+    parser.add_argument("--sample-every", type=int, default=1000, help="период замера в тиках")
+    parser.add_argument("--seed", type=int, default=0, help="seed игры")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> None:
+
+    args = parse_args(argv)
+    samples = session_memory(args.ticks, args.level, args.sample_every, args.seed)
+    print(format_report(entity_sizes(), samples))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+
+'''
+Глобальные модификаторы и временные эффекты врагов.
+Глобальный модификатор это пара (прибавка, множитель) к базовому значению,
+одна на всю игру: изменить его стоит O(1), а итоговое значение
+считается лениво в момент использования. Временные эффекты лежат
+в полях EnemyStore (сила и оставшиеся тики), накладываются
+и отсчитываются векторно для всех врагов сразу
+'''
+
+# эффект -> (поле силы, поле оставшихся тиков) в EnemyStore.
+# slow: доля скорости, которую теряет враг, poison: урон за тик,
+# shred: доля дополнительного урона по врагу
+EFFECTS = {
+    "slow": ("slow", "slow_ticks"),
+    "poison": ("poison", "poison_ticks"),
+    "shred": ("shred", "shred_ticks"),
+    }
+
+
+class Modifiers:
+    '''
+    Модификаторы врагов одной игры
+
+    Args:
+        enemies (Enemies): враги
+
+    Attributes:
+        enemies (Enemies): враги
+        add (dict): имя величины -> глобальная прибавка к базовому значению
+        scale (dict): имя величины -> глобальный множитель
+        kinds (list): номер вида эффекта -> (эффект, сила, тики), номер 0 это отсутствие эффекта
+        kind_ids (dict): (эффект, сила, тики) -> номер вида
+        timed (bool): есть ли у кого-то из врагов временный эффект,
+            пока их нет, тик эффектов ничего не делает
+    '''
+    def __init__(self, enemies) -> None:
+
+        self.enemies = enemies
+        self.timed = False
+        self.add = {"speed": 0.0}
+        self.scale = {"speed": 1.0, "damage": 1.0}
+        self.kinds = [None]
+        self.kind_ids = {None: 0}
+
+
+    def value(self, name: str, base):
+        '''
+        Args:
+            name (str): имя величины
+            base: базовое значение, число или массив
+
+        Returns:
+            значение с глобальными модификаторами: (base + прибавка) * множитель
+        '''
+        return (base + self.add.get(name, 0.0)) * self.scale.get(name, 1.0)
+
+
+    def kind(self, effect: tuple) -> int:
+        '''
+        Номер вида эффекта для снарядов, один на все сооружения с этим эффектом
+        Args:
+            effect (tuple): (эффект из EFFECTS, сила, тики) или None
+
+        Returns:
+            int: номер вида
+        '''
+        kind = self.kind_ids.get(effect)
+        if kind is None:
+            if effect[0] not in EFFECTS:
+                raise ValueError(f"unknown effect {effect[0]!r}")
+            kind = len(self.kinds)
+            self.kinds.append(effect)
+            self.kind_ids[effect] = kind
+        return kind
+
+
+    def speed(self, rows=slice(None)) -> np.ndarray:
+        '''
+        Returns:
+            np.ndarray: текущие скорости врагов rows с глобальными модификаторами и замедлением
+        '''
+        store = self.enemies.enemies
+        return self.value("speed", store.speed[rows]) * (1.0 - store.slow[rows])
+
+
+    def damage(self, rows: np.ndarray, damage: np.ndarray) -> np.ndarray:
+        '''
+        Returns:
+            np.ndarray: урон по врагам rows с глобальным множителем и ослаблением брони
+        '''
+        return damage * self.scale["damage"] * (1.0 + self.enemies.enemies.shred[rows])
+
+
+    def apply(self, rows: np.ndarray, kinds: np.ndarray) -> None:
+        '''
+        Наложение эффектов на врагов: остается более сильный эффект
+        и более долгий срок. Один векторный проход на каждый вид эффекта
+        Args:
+            rows (np.ndarray): индексы врагов, могут повторяться
+            kinds (np.ndarray): номер вида эффекта для каждого врага, 0 без эффекта
+        '''
+        store = self.enemies.enemies
+        kinds = np.asarray(kinds)
+        for kind in np.unique(kinds[kinds > 0]).tolist():
+            effect, strength, ticks = self.kinds[kind]
+            strength_field, ticks_field = EFFECTS[effect]
+            target = rows[kinds == kind]
+            np.maximum.at(getattr(store, strength_field), target, strength)
+            np.maximum.at(getattr(store, ticks_field), target, ticks)
+            self.timed = True
+
+
+    def tick(self) -> tuple:
+        '''
+        Один тик временных эффектов всех врагов: счетчики уменьшаются,
+        истекшие эффекты снимаются
+        Returns:
+            tuple: (индексы, урон) ядом в этом тике для Enemies.hit_many
+        '''
+        store = self.enemies.enemies
+        if not self.timed:
+            return np.empty(0, np.int64), np.empty(0)
+        poisoned = np.flatnonzero(store.poison_ticks > 0)
+        damage = store.poison[poisoned].astype(np.float64)
+        timed = False
+        for strength_field, ticks_field in EFFECTS.values():
+            ticks = getattr(store, ticks_field)
+            active = ticks > 0
+            ticks[active] -= 1
+            getattr(store, strength_field)[ticks <= 0] = 0
+            timed = timed or bool((ticks > 0).any())
+        self.timed = timed
+        return poisoned, damage
@@ -0,0 +1,199 @@
+import numpy as np
+import pygame
+
+
+
+class OccupancyGrid:
+    '''
+    Карта занятости игрового поля с точностью до пикселя.
+    Дорога и крепость хранятся битовой маской, по биту на пиксель.
+    Сооружения хранятся сеткой клеток CELL x CELL пикселей: в клетке номер
+    единственного сооружения, которое ее задевает, FREE если таких нет
+    или SHARED если их несколько, тогда номера лежат в shared.
+    Точная проверка идет по прямоугольникам только этих сооружений,
+    поэтому "какое сооружение в этой точке" отвечается за O(1),
+    а "свободно ли место" одной векторной проверкой области,
+    независимо от количества сооружений. Для поля 1000 x 600 это около 94 КБ
+    вместо 2.4 МБ для номера в каждом пикселе
+
+    Args:
+        width (int): ширина поля
+        height (int): высота поля
+
+    Attributes:
+        width (int): ширина поля
+        height (int): высота поля
+        blocked (np.ndarray): упакованная np.packbits маска дороги и крепости, height x ceil(width/8)
+        owner (np.ndarray): клетки сооружений, номер сооружения, FREE или SHARED
+        shared (dict): клетка (ряд, столбец) -> множество номеров сооружений для клеток SHARED
+        rects (dict): номер сооружения -> его прямоугольник
+    '''
+    FREE = -1
+    BLOCKED = -2
+    SHARED = -3
+    CELL = 8
+
+    def __init__(self, width: int, height: int) -> None:
+
+        self.width = width
+        self.height = height
+        self.blocked = np.zeros((height, (width + 7) // 8), dtype=np.uint8)
+        cell = self.CELL
+        self.owner = np.full(((height + cell - 1) // cell, (width + cell - 1) // cell), self.FREE, dtype=np.int16)
+        self.shared = {}
+        self.rects = {}
+
+
+    def clip(self, rect: pygame.Rect) -> tuple:
+        '''
+        Returns:
+            tuple: (left, top, right, bottom) части rect внутри поля, пустая если right <= left или bottom <= top
+        '''
+        return (
+            max(rect.left, 0), max(rect.top, 0),
+            min(rect.right, self.width), min(rect.bottom, self.height))
+
+
+    def cells(self, rect: pygame.Rect) -> tuple:
+        '''
+        Returns:
+            tuple: срезы (ряды, столбцы) клеток owner, которые задевает rect
+        '''
+        left, top, right, bottom = self.clip(rect)
+        cell = self.CELL
+        if right <= left or bottom <= top:
+            return slice(0, 0), slice(0, 0)
+        return slice(top // cell, (bottom - 1) // cell + 1), slice(left // cell, (right - 1) // cell + 1)
+
+
+    def set_blocked(self, rect: pygame.Rect, value: bool) -> None:
+        '''
+        Запись value в биты маски дороги и крепости под rect.
+        Распаковываются только байты, которые задевает rect
+        '''
+        left, top, right, bottom = self.clip(rect)
+        if right <= left or bottom <= top:
+            return
+        first, last = left // 8, (right + 7) // 8
+        bits = np.unpackbits(self.blocked[top:bottom, first:last], axis=1)
+        bits[:, left - first * 8:right - first * 8] = value
+        self.blocked[top:bottom, first:last] = np.packbits(bits, axis=1)
+
+
+    def block(self, rect: pygame.Rect) -> None:
+
+        self.set_blocked(rect, True)
+
+
+    def unblock(self, rect: pygame.Rect) -> None:
+
+        self.set_blocked(rect, False)
+
+
+    def is_blocked(self, rect: pygame.Rect) -> bool:
+        '''
+        Returns:
+            bool: истина если под rect есть дорога или крепость
+        '''
+        left, top, right, bottom = self.clip(rect)
+        if right <= left or bottom <= top:
+            return False
+        first, last = left // 8, (right + 7) // 8
+        bits = np.unpackbits(self.blocked[top:bottom, first:last], axis=1)
+        return bool(bits[:, left - first * 8:right - first * 8].any())
+
+
+    def candidates(self, rows: slice, cols: slice) -> set:
+        '''
+        Returns:
+            set: номера сооружений, задевающих клетки rows x cols
+        '''
+        area = self.owner[rows, cols]
+        found = set(np.unique(area[area >= 0]).tolist())
+        if (area == self.SHARED).any():
+            for r, c in zip(*np.nonzero(area == self.SHARED)):
+                found |= self.shared[(rows.start + int(r), cols.start + int(c))]
+        return found
+
+
+    def units_in(self, rect: pygame.Rect) -> list:
+        '''
+        Returns:
+            list: номера сооружений, которые пересекаются с rect
+        '''
+        return sorted(index for index in self.candidates(*self.cells(rect)) if self.rects[index].colliderect(rect))
+
+
+    def is_free(self, rect: pygame.Rect) -> bool:
+        '''
+        Returns:
+            bool: истина если под rect нет ни дороги, ни крепости, ни сооружений
+        '''
+        return not self.is_blocked(rect) and not self.units_in(rect)
+
+
+    def at(self, x: int, y: int) -> int:
+        '''
+        Returns:
+            int: номер сооружения в точке (х,у), BLOCKED для дороги и крепости,
+            FREE для свободной точки и за границами поля
+        '''
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return self.FREE
+        if (self.blocked[y, x >> 3] >> (7 - (x & 7))) & 1:
+            return self.BLOCKED
+        cell = (y // self.CELL, x // self.CELL)
+        index = int(self.owner[cell])
+        if index == self.FREE:
+            return self.FREE
+        indexes = self.shared[cell] if index == self.SHARED else (index,)
+        for index in indexes:
+            if self.rects[index].collidepoint(x, y):
+                return index
+        return self.FREE
+
+
+    def add(self, rect: pygame.Rect, index: int) -> None:
+        '''
+        Добавление сооружения с номером index, занимающего rect
+        '''
+        self.rects[index] = pygame.Rect(rect)
+        rows, cols = self.cells(rect)
+        area = self.owner[rows, cols]
+        for r, c in zip(*np.nonzero(area != self.FREE)):
+            cell = (rows.start + int(r), cols.start + int(c))
+            other = int(area[r, c])
+            self.shared.setdefault(cell, set() if other == self.SHARED else {other}).add(index)
+        area[area >= 0] = self.SHARED
+        area[area == self.FREE] = index
+
+
+    def remove(self, index: int) -> None:
+        '''
+        Удаление сооружения с номером index
+        '''
+        rows, cols = self.cells(self.rects.pop(index))
+        area = self.owner[rows, cols]
+        area[area == index] = self.FREE
+        for r, c in zip(*np.nonzero(area == self.SHARED)):
+            cell = (rows.start + int(r), cols.start + int(c))
+            owners = self.shared[cell]
+            owners.discard(index)
+            if len(owners) == 1:
+                area[r, c] = owners.pop()
+                del self.shared[cell]
+
+
+    def move(self, old: int, new: int) -> None:
+        '''
+        Смена номера сооружения old на свободный номер new
+        '''
+        rect = self.rects.pop(old)
+        self.rects[new] = rect
+        rows, cols = self.cells(rect)
+        area = self.owner[rows, cols]
+        area[area == old] = new
+        for r, c in zip(*np.nonzero(area == self.SHARED)):
+            owners = self.shared[(rows.start + int(r), cols.start + int(c))]
+            owners.discard(old)
+            owners.add(new)
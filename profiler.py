@@ -0,0 +1,166 @@
+import csv
+import time
+import numpy as np
+import pygame
+from fonts import get_font
+
+'''
+Замер времени фаз главного цикла игры.
+Каждая фаза кадра заканчивается вызовом mark, время от предыдущей отметки
+прибавляется к этой фазе. Последние window кадров хранятся в кольцевом
+буфере для процентилей, все кадры сессии можно выгрузить в CSV
+'''
+
+PHASES = ("events", "combat", "enemies", "drow", "hud", "overlay", "display", "wait")
+
+
+class FrameProfiler:
+    '''
+    Профилировщик кадров по фазам на основе time.perf_counter_ns.
+    Пока профилировщик выключен, mark и end_frame сразу возвращаются,
+    так что в обычной игре он почти ничего не стоит
+
+    Args:
+        phases (tuple): имена фаз кадра
+        window (int): количество последних кадров для процентилей
+        enabled (bool): включен ли профилировщик
+        keep_samples (bool): сохранять ли все кадры для выгрузки в CSV
+
+    Attributes:
+        phases (tuple): имена фаз кадра
+        index (dict): имя фазы -> номер столбца
+        enabled (bool): включен ли профилировщик, переключается через toggle
+        frame (np.ndarray): время фаз текущего кадра в нс
+        history (np.ndarray): кольцевой буфер window x фазы, время в нс
+        count (int): количество кадров записанных в history
+        samples (list): время фаз всех кадров сессии, None если не сохраняются
+        last (int): время последней отметки в нс
+        overlay_surface (pygame.Surface): отрисованная панель, обновляется раз в refresh кадров
+        refresh (int): через сколько кадров перерисовывать панель
+        panel_size (tuple): размер панели, только растет
+    '''
+    def __init__(
+                self,
+                phases: tuple = PHASES,
+                window: int = 250,
+                enabled: bool = False,
+                keep_samples: bool = False
+                ) -> None:
+
+        self.phases = phases
+        self.index = {phase: i for i, phase in enumerate(phases)}
+        self.enabled = enabled
+        self.frame = np.zeros(len(phases), np.int64)
+        self.history = np.zeros((window, len(phases)), np.int64)
+        self.count = 0
+        self.samples = [] if keep_samples else None
+        self.last = time.perf_counter_ns()
+        self.overlay_surface = None
+        self.refresh = 10
+        self.panel_size = (0, 0)
+
+
+    def toggle(self) -> None:
+
+        self.enabled = not self.enabled
+        self.overlay_surface = None
+        self.last = time.perf_counter_ns()
+
+
+    def mark(self, phase: str) -> None:
+        '''
+        Завершение фазы: время с прошлой отметки прибавляется к phase
+        Args:
+            phase (str): имя фазы
+        '''
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.frame[self.index[phase]] += now - self.last
+        self.last = now
+
+
+    def end_frame(self) -> None:
+        '''
+        Завершение кадра: время фаз переносится в историю
+        '''
+        if not self.enabled:
+            return
+        self.history[self.count % len(self.history)] = self.frame
+        self.count += 1
+        if self.samples is not None:
+            self.samples.append(self.frame.tolist())
+        self.frame[:] = 0
+        self.last = time.perf_counter_ns()
+
+
+    def percentiles(self, q: tuple = (50, 95, 99)) -> dict:
+        '''
+        Args:
+            q (tuple): процентили
+
+        Returns:
+            dict: имя фазы (и "frame" для всего кадра) -> процентили в мс
+        '''
+        rows = self.history[:min(self.count, len(self.history))]
+        if not len(rows):
+            return {}
+        rows = np.column_stack((rows, rows.sum(axis=1))) / 1e6
+        values = np.percentile(rows, q, axis=0)
+        names = self.phases + ("frame",)
+        return {name: tuple(values[:, i]) for i, name in enumerate(names)}
+
+
+    def drow(self, screen: pygame.Surface) -> pygame.Rect:
+        '''
+        Отрисовка панели p50/p95/p99 по фазам в левом нижнем углу екрана.
+        Цифры меняются каждый кадр, поэтому надписи рисуются шрифтом напрямую,
+        мимо кэша надписей. Панель непрозрачна и не уменьшается,
+        поэтому полностью закрывает свой прошлый кадр
+        Args:
+            screen (pygame.Surface): екран
+
+        Returns:
+            pygame.Rect: область панели, None если профилировщик выключен
+        '''
+        if not self.enabled:
+            return None
+        if self.overlay_surface is None or self.count % self.refresh == 0:
+            self.overlay_surface = self.render_overlay()
+        rect = self.overlay_surface.get_rect(bottomleft=screen.get_rect().bottomleft)
+        return screen.blit(self.overlay_surface, rect)
+
+
+    def render_overlay(self) -> pygame.Surface:
+
+        font = get_font("consolas", 16)
+        color = (230, 230, 230)
+        stats = self.percentiles()
+        rows = [f"{'ms':<8}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for name in self.phases + ("frame",):
+            p50, p95, p99 = stats.get(name, (0, 0, 0))
+            rows.append(f"{name:<8}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+        texts = [font.render(row, False, color) for row in rows]
+        line = max(text.get_height() for text in texts)
+        width = max(text.get_width() for text in texts)
+        self.panel_size = (
+                        max(self.panel_size[0], width + 8),
+                        max(self.panel_size[1], line * len(texts) + 8))
+        surface = pygame.Surface(self.panel_size)
+        surface.fill((0, 0, 0))
+        for i, text in enumerate(texts):
+            surface.blit(text, (4, 4 + i * line))
+        return surface
+
+
+    def write_csv(self, path: str) -> None:
+        '''
+        Выгрузка времени фаз каждого кадра сессии в нс
+        Args:
+            path (str): путь к файлу CSV
+        '''
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("frame",) + tuple(f"{phase}_ns" for phase in self.phases))
+            for i, row in enumerate(self.samples or ()):
+                writer.writerow([i] + row)
@@ -0,0 +1,248 @@
+import numpy as np
+import pygame
+from enemy_store import EnemyStore
+
+
+
+class ProjectileStore(EnemyStore):
+    '''
+    Хранилище летящих снарядов, устроенное так же, как EnemyStore:
+    каждое поле всех снарядов лежит в своем массиве NumPy.
+    Координаты и урон хранятся в float32, а скорость у всех снарядов
+    одна, так что снаряд занимает 37 байт
+
+    Attributes:
+        x (np.ndarray): координаты снарядов по горизонтали
+        y (np.ndarray): координаты снарядов по вертикали
+        target_x (np.ndarray): точка назначения по горизонтали
+        target_y (np.ndarray): точка назначения по вертикали
+        damage (np.ndarray): урон при попадании
+        target (np.ndarray): uid врага-цели
+        homing (np.ndarray): истина если снаряд наводится на цель в полете
+        ttl (np.ndarray): сколько тиков снаряд еще может лететь
+        effect (np.ndarray): номер вида временного эффекта из Modifiers.kinds, 0 без эффекта
+        splash (np.ndarray): радиус поражения вокруг точки попадания, 0 только по цели
+        chain (np.ndarray): сколько ближайших к цели врагов в радиусе splash задевает снаряд,
+            0 все враги в радиусе
+    '''
+    FIELDS = (
+        ("x", np.float32),
+        ("y", np.float32),
+        ("target_x", np.float32),
+        ("target_y", np.float32),
+        ("damage", np.float32),
+        ("target", np.int64),
+        ("homing", np.bool_),
+        ("ttl", np.int16),
+        ("effect", np.int8),
+        ("splash", np.float32),
+        ("chain", np.int8),
+        )
+
+
+
+class Projectiles:
+    '''
+    Снаряды сооружений со скоростью и временем полета.
+    Самонаводящийся снаряд каждый тик поворачивает к текущему положению цели,
+    снаряд с упреждением летит в точку, где цель окажется к его прибытию,
+    и попадает, только если цель действительно там. Урон и временный эффект
+    снаряда наносятся по прибытии. Снаряд с радиусом splash задевает и врагов
+    вокруг точки попадания: всех (взрыв) или chain ближайших (цепь).
+    Полет, поиск целей и попадания считаются одним векторным проходом за тик,
+    а отрисовка идет одним вызовом Surface.blits
+
+    Args:
+        enemies (Enemies): враги, по которым стреляют сооружения
+
+    Attributes:
+        enemies (Enemies): враги
+        store (ProjectileStore): летящие снаряды
+        sprite (pygame.Surface): изображение снаряда
+        speed (float): скорость всех снарядов за тик
+        ttl (int): наибольшее время полета в тиках
+    '''
+    RADIUS = 3
+
+    def __init__(self, enemies) -> None:
+
+        self.enemies = enemies
+        self.store = ProjectileStore()
+        self.sprite = pygame.Surface((self.RADIUS * 2, self.RADIUS * 2), pygame.SRCALPHA)
+        pygame.draw.circle(self.sprite, (255,0,0), (self.RADIUS, self.RADIUS), self.RADIUS)
+        self.speed = 14.0
+        self.ttl = 60
+
+
+    def __len__(self) -> int:
+
+        return len(self.store)
+
+
+    def launch(
+                self,
+                x: np.ndarray,
+                y: np.ndarray,
+                rows: np.ndarray,
+                damage: np.ndarray,
+                homing: np.ndarray,
+                effects: np.ndarray = None,
+                splash: np.ndarray = None,
+                chain: np.ndarray = None
+                ) -> None:
+        '''
+        Запуск снарядов по врагам
+        Args:
+            x (np.ndarray): точки запуска по горизонтали
+            y (np.ndarray): точки запуска по вертикали
+            rows (np.ndarray): индексы врагов-целей в хранилище врагов
+            damage (np.ndarray): урон каждого снаряда
+            homing (np.ndarray): самонаведение или упреждение для каждого снаряда
+            effects (np.ndarray): номер вида эффекта каждого снаряда, None без эффектов
+            splash (np.ndarray): радиус поражения каждого снаряда, None только по цели
+            chain (np.ndarray): количество врагов цепи для каждого снаряда, None все в радиусе
+        '''
+        enemies = self.enemies.enemies
+        target_x = enemies.x[rows]
+        target_y = enemies.y[rows]
+        # упреждение на путь врага за время полета
+        flight = np.hypot(target_x - x, target_y - y) / self.speed
+        leading = ~np.asarray(homing, dtype=bool)
+        vx, vy = self.enemies.velocity(rows)
+        target_x = np.where(leading, target_x + vx * flight, target_x)
+        target_y = np.where(leading, target_y + vy * flight, target_y)
+        self.store.extend(
+                        len(rows),
+                        x=x,
+                        y=y,
+                        target_x=target_x,
+                        target_y=target_y,
+                        damage=damage,
+                        target=enemies.uid[rows],
+                        homing=homing,
+                        ttl=self.ttl,
+                        effect=0 if effects is None else effects,
+                        splash=0 if splash is None else splash,
+                        chain=0 if chain is None else chain)
+
+
+    def update(self) -> None:
+        '''
+        Один тик полета всех снарядов.
+        Враги вокруг точек попадания всех снарядов с радиусом находятся
+        одним запросом Enemies.in_range. Все попадания, и по целям, и по задетым
+        врагам, накладывают эффекты одним вызовом Modifiers.apply
+        и наносят урон одним вызовом Enemies.hit_many,
+        снаряды, цель которых погибла раньше, долетают до последней
+        известной точки и исчезают
+        '''
+        store = self.store
+        if not len(store):
+            return
+        enemies = self.enemies
+        targets = enemies.enemies
+        rows = targets.find(store.target)
+        alive = rows >= 0
+        alive[alive] = targets.health[rows[alive]] > 0
+        follow = alive & store.homing
+        store.target_x[follow] = targets.x[rows[follow]]
+        store.target_y[follow] = targets.y[rows[follow]]
+
+        dx = store.target_x - store.x
+        dy = store.target_y - store.y
+        distance = np.hypot(dx, dy)
+        arrived = distance <= self.speed
+        step = np.divide(self.speed, distance, out=np.zeros_like(distance), where=~arrived)
+        store.x[:] = np.where(arrived, store.target_x, store.x + dx * step)
+        store.y[:] = np.where(arrived, store.target_y, store.y + dy * step)
+        store.ttl[:] -= 1
+
+        hit = arrived & alive
+        if hit.any():
+            hit[hit] = store.homing[hit] | self.covers(rows[hit], store.x[hit], store.y[hit])
+        hit_rows = rows[hit]
+        damage = store.damage[hit]
+        effects = store.effect[hit]
+        splash = store.splash[hit]
+        if (splash > 0).any():
+            area = np.flatnonzero(splash > 0)
+            impacts, victims = self.splash(
+                                        hit_rows[area],
+                                        store.x[hit][area],
+                                        store.y[hit][area],
+                                        splash[area],
+                                        store.chain[hit][area])
+            impacts = area[impacts]
+            hit_rows = np.concatenate([hit_rows, victims])
+            damage = np.concatenate([damage, damage[impacts]])
+            effects = np.concatenate([effects, effects[impacts]])
+        store.remove(arrived | (store.ttl <= 0))
+        if len(hit_rows):
+            enemies.modifiers.apply(hit_rows, effects)
+            enemies.hit_many(hit_rows, damage)
+
+
+    def splash(
+                self,
+                rows: np.ndarray,
+                x: np.ndarray,
+                y: np.ndarray,
+                radius: np.ndarray,
+                chain: np.ndarray
+                ) -> tuple:
+        '''
+        Враги, которых задевают попадания с радиусом, кроме самих целей.
+        Для цепи остаются chain ближайших к точке попадания,
+        при равных расстояниях раньше появившиеся
+        Args:
+            rows (np.ndarray): индексы врагов-целей
+            x (np.ndarray): точки попадания по горизонтали
+            y (np.ndarray): точки попадания по вертикали
+            radius (np.ndarray): радиус каждого попадания
+            chain (np.ndarray): длина цепи каждого попадания, 0 все враги в радиусе
+
+        Returns:
+            tuple: (номера попаданий, индексы задетых врагов)
+        '''
+        impacts, victims, distance2 = self.enemies.in_range(x, y, radius)
+        other = victims != rows[impacts]
+        impacts, victims, distance2 = impacts[other], victims[other], distance2[other]
+        limit = chain[impacts]
+        if (limit > 0).any():
+            order = np.lexsort((self.enemies.enemies.uid[victims], distance2, impacts))
+            impacts, victims, limit = impacts[order], victims[order], limit[order]
+            # место врага среди задетых тем же попаданием по возрастанию расстояния
+            rank = np.arange(len(impacts)) - np.searchsorted(impacts, impacts)
+            keep = (limit == 0) | (rank < limit)
+            impacts, victims = impacts[keep], victims[keep]
+        return impacts, victims
+
+
+    def covers(self, rows: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        '''
+        Returns:
+            np.ndarray: истина если точка (x,y) попадает в спрайт врага rows
+        '''
+        targets = self.enemies.enemies
+        sizes = self.enemies.sprite_sizes[targets.sprite[rows]]
+        return (
+            (np.abs(targets.x[rows] - x) * 2 <= sizes[:, 0]) &
+            (np.abs(targets.y[rows] - y) * 2 <= sizes[:, 1]))
+
+
+    def drow(self, screen: pygame.Surface) -> list:
+        '''
+        Отрисовка всех снарядов одним вызовом Surface.blits
+        Args:
+            screen (pygame.Surface): поверхность для рисования
+
+        Returns:
+            list: области, которые занимает каждый снаряд
+        '''
+        store = self.store
+        if not len(store):
+            return []
+        sprite = self.sprite
+        xs = (store.x - self.RADIUS).astype(np.int64).tolist()
+        ys = (store.y - self.RADIUS).astype(np.int64).tolist()
+        return screen.blits([(sprite, position) for position in zip(xs, ys)])
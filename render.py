@@ -0,0 +1,208 @@
+import pygame
+from simulation import Simulation
+
+
+
+class StaticLayer:
+    '''
+    Кэш статического фона: цвет фона, дорога и все сооружения с радиусами
+    и подписями в одной поверхности, так что в кадре статическое
+    содержимое стоит одного blit при любом количестве сооружений.
+    Фон перестраивается только в областях из Defenses.changes,
+    которые отмечают постройка, улучшение и продажа сооружений
+
+    Args:
+        size (tuple): размер фона
+        bg_color (tuple): цвет фона
+
+    Attributes:
+        size (tuple): размер фона
+        bg_color (tuple): цвет фона
+        game (Simulation): игра для которой построен фон
+        surface (pygame.Surface): фон, None пока не построен
+    '''
+    def __init__(self, size: tuple, bg_color: tuple) -> None:
+
+        self.size = size
+        self.bg_color = bg_color
+        self.game = None
+        self.surface = None
+
+
+    def invalidate(self) -> None:
+        '''
+        Помечает фон устаревшим целиком, например после изменения
+        сооружений в обход Defenses.changes
+        '''
+        self.surface = None
+
+
+    def update(self, game: Simulation) -> list:
+        '''
+        Перестройка фона в измененных областях
+        Args:
+            game (Simulation): игра
+
+        Returns:
+            list: перестроенные области фона, пустой список если фон не менялся
+        '''
+        changes = game.defenses.changes
+        if self.surface is None or game is not self.game:
+            self.game = game
+            game.defenses.track_changes = True
+            self.surface = pygame.Surface(self.size)
+            if pygame.display.get_surface() is not None:
+                self.surface = self.surface.convert()
+            changes.clear()
+            self.redraw(self.surface.get_rect())
+            return [self.surface.get_rect()]
+        rects = [rect.clip(self.surface.get_rect()) for rect in changes]
+        changes.clear()
+        for rect in rects:
+            self.redraw(rect)
+        return rects
+
+
+    def redraw(self, rect: pygame.Rect) -> None:
+        '''
+        Перерисовка фона внутри области rect
+        '''
+        self.surface.set_clip(rect)
+        self.surface.fill(self.bg_color)
+        self.game.drow_static(self.surface, rect)
+        self.surface.set_clip(None)
+
+
+    def drow(self, game: Simulation) -> pygame.Rect:
+        '''
+        Вывод фона на екран игры
+        Returns:
+            pygame.Rect: область екрана
+        '''
+        self.update(game)
+        return game.screen.blit(self.surface, (0, 0))
+
+
+
+class DirtyRenderer:
+    '''
+    Отрисовка игры методом грязных прямоугольников.
+    Все, что меняется редко (фон, дорога, сооружения, крепость, статистика),
+    хранится в отдельной поверхности background. Каждый кадр из нее
+    восстанавливаются только области, где в прошлом кадре были враги
+    и выстрелы, затем враги и выстрелы рисуются заново, а на дисплей
+    отправляется только список измененных областей.
+    Постройка, улучшение и продажа сооружений перерисовывают только
+    свои области через StaticLayer
+
+    Args:
+        screen (pygame.Surface): екран
+        bg_color (tuple): цвет фона
+
+    Attributes:
+        screen (pygame.Surface): екран
+        bg_color (tuple): цвет фона
+        game (Simulation): игра для которой построен фон
+        layer (StaticLayer): фон, дорога и сооружения
+        base (pygame.Surface): поверхность layer
+        background (pygame.Surface): base + крепость + статистика
+        tower_health (int): здоровье крепости нарисованное на background
+        tower_rect (pygame.Rect): область крепости на background
+        dirty (list): области врагов и выстрелов из прошлого кадра
+    '''
+    def __init__(self, screen: pygame.Surface, bg_color: tuple) -> None:
+
+        self.screen = screen
+        self.bg_color = bg_color
+        self.game = None
+        self.layer = StaticLayer(screen.get_size(), bg_color)
+        self.base = None
+        self.background = None
+        self.tower_health = None
+        self.tower_rect = None
+        self.dirty:list[pygame.Rect] = []
+
+
+    def invalidate(self) -> None:
+        '''
+        Следующий кадр будет нарисован полностью. Нужно вызывать после того,
+        как на екране было нарисовано что-то кроме игры
+        '''
+        self.base = None
+
+
+    def build(self, game: Simulation) -> None:
+        '''
+        Построение фона для игры
+        '''
+        self.game = game
+        self.layer.update(game)
+        self.base = self.layer.surface
+        self.background = self.base.copy()
+        self.tower_health = game.tower.health
+        self.tower_rect = game.tower.drow(self.background)
+        game.statistic.drow(self.background)
+
+
+    def drow(self, game: Simulation, alpha: float = 1.0) -> list:
+        '''
+        Отрисовка кадра игры
+        Args:
+            game (Simulation): игра
+            alpha (float): доля тика для плавной отрисовки врагов, см. Simulation.interpolation
+
+        Returns:
+            list: измененные области екрана для pygame.display.update
+        '''
+        if self.base is None or game is not self.game:
+            self.build(game)
+            self.screen.blit(self.background, (0, 0))
+            self.dirty = self.drow_dynamic(game, alpha)
+            if game.profiler is not None:
+                game.profiler.mark("drow")
+            return [self.screen.get_rect()]
+
+        dirty = self.dirty
+        for rect in dirty:
+            self.screen.blit(self.background, rect, rect)
+
+        if game.tower.health != self.tower_health:
+            self.tower_health = game.tower.health
+            self.background.blit(self.base, self.tower_rect, self.tower_rect)
+            rect = self.tower_rect.union(game.tower.drow(self.background))
+            self.tower_rect = rect
+            self.screen.blit(self.background, rect, rect)
+            dirty.append(rect)
+
+        for rect in game.statistic.drow(self.background, self.base):
+            self.screen.blit(self.background, rect, rect)
+            dirty.append(rect)
+
+        changed = self.layer.update(game)
+        self.base = self.layer.surface
+        for rect in changed:
+            self.background.blit(self.base, rect, rect)
+            self.background.set_clip(rect)
+            game.tower.drow(self.background)
+            statistic = game.statistic
+            for surface, text_rect in zip(statistic.surfaces, statistic.rects):
+                self.background.blit(surface, text_rect)
+            self.background.set_clip(None)
+            self.screen.blit(self.background, rect, rect)
+            dirty.append(rect)
+        if game.profiler is not None:
+            game.profiler.mark("hud")
+
+        self.dirty = self.drow_dynamic(game, alpha)
+        if game.profiler is not None:
+            game.profiler.mark("drow")
+        return dirty + self.dirty
+
+
+    def drow_dynamic(self, game: Simulation, alpha: float = 1.0) -> list:
+        '''
+        Отрисовка выстрелов и врагов прямо на екране
+        Returns:
+            list: занятые ими области
+        '''
+        return game.defenses.drow_bulets(self.screen) + game.enemies.drow(self.screen, alpha)
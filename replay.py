@@ -0,0 +1,183 @@
+import argparse
+import struct
+import time
+from flowfield import GameMap
+from simulation import Simulation
+
+'''
+Запись и воспроизведение ввода игрока.
+Игра полностью определяется своим seed, картой и нажатиями мыши, поэтому в файл
+пишутся только они: заголовок (метка, версия, seed, длина текста карты),
+текст карты (пустой для прямой дороги) и записи по 9 байт
+(тик, кнопка, x, y). Последняя запись с кнопкой 0 хранит длину игры.
+Воспроизведение идет без экрана так быстро, как позволяет процессор
+
+Пример:
+    python replay.py session.tdr
+'''
+
+MAGIC = b"TDRP"
+VERSION = 2
+HEADER = struct.Struct("<4sBQI")
+EVENT = struct.Struct("<IBhh")
+END = 0
+
+
+class ReplayRecorder:
+    '''
+    Запись нажатий мыши в двоичный файл
+    Args:
+        path (str): путь к файлу записи
+        seed (int): seed записываемой игры
+        game_map (GameMap): карта игры, None для прямой дороги
+
+    Attributes:
+        path (str): путь к файлу записи
+        file: открытый файл записи, None после закрытия
+        events (int): количество записанных нажатий
+    '''
+    def __init__(self, path: str, seed: int, game_map: GameMap = None) -> None:
+
+        self.path = path
+        map_text = b"" if game_map is None else game_map.dumps().encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, len(map_text)))
+        self.file.write(map_text)
+        self.events = 0
+
+
+    def record(self, tick: int, button: int, position: tuple) -> None:
+        '''
+        Args:
+            tick (int): тик игры в который было нажатие
+            button (int): кнопка мыши
+            position (tuple): координаты нажатия (х,у)
+        '''
+        self.file.write(EVENT.pack(tick, button, *position))
+        self.file.flush()
+        self.events += 1
+
+
+    def close(self, end_tick: int) -> None:
+        '''
+        Завершает запись
+        Args:
+            end_tick (int): количество тиков, которые длилась игра
+        '''
+        if self.file is None:
+            return
+        self.file.write(EVENT.pack(end_tick, END, 0, 0))
+        self.file.close()
+        self.file = None
+
+
+
+class Replay:
+    '''
+    Загруженная запись игры
+    Args:
+        seed (int): seed игры
+        events (list): список нажатий (тик, кнопка, (х,у)) по возрастанию тиков
+        end_tick (int): длина игры в тиках, None если запись не была закрыта
+        map_text (str): карта игры в текстовом виде, None для прямой дороги
+
+    Attributes:
+        seed (int): seed игры
+        events (list): список нажатий (тик, кнопка, (х,у))
+        end_tick (int): длина игры в тиках
+        map_text (str): карта игры, None для прямой дороги
+    '''
+    def __init__(self, seed: int, events: list, end_tick: int, map_text: str = None) -> None:
+
+        self.seed = seed
+        self.events = events
+        self.end_tick = end_tick
+        self.map_text = map_text
+
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        '''
+        Чтение записи из файла
+        Args:
+            path (str): путь к файлу записи
+
+        Returns:
+            Replay: загруженная запись
+        '''
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, seed, map_size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a replay file of version {VERSION}")
+        start = HEADER.size + map_size
+        map_text = data[HEADER.size:start].decode("utf-8") or None
+        events = []
+        end_tick = None
+        size = len(data) - (len(data) - start) % EVENT.size
+        for tick, button, x, y in EVENT.iter_unpack(data[start:size]):
+            if button == END:
+                end_tick = tick
+                break
+            events.append((tick, button, (x, y)))
+        return cls(seed, events, end_tick, map_text)
+
+
+    def game_map(self) -> GameMap:
+        '''
+        Returns:
+            GameMap: новая карта записанной игры, None для прямой дороги
+        '''
+        return None if self.map_text is None else GameMap.parse(self.map_text)
+
+
+    def play(self, game: Simulation = None, max_ticks: int = None) -> Simulation:
+        '''
+        Воспроизведение записи без экрана.
+        Между нажатиями игра продвигается одним вызовом step
+        Args:
+            game (Simulation): игра для воспроизведения, по умолчанию
+            создается новая безголовая игра с seed и картой записи
+            max_ticks (int): остановиться после этого тика
+
+        Returns:
+            Simulation: игра в состоянии на конец записи
+            (если запись не была закрыта, то на последнее нажатие)
+        '''
+        if game is None:
+            game = Simulation(seed=self.seed, game_map=self.game_map())
+        end_tick = self.end_tick
+        if end_tick is None:
+            end_tick = self.events[-1][0] if self.events else 0
+        if max_ticks is not None:
+            end_tick = min(end_tick, max_ticks)
+        for tick, button, position in self.events:
+            if tick > end_tick:
+                break
+            game.step(tick - game.ticks)
+            game.click(button, position)
+        game.step(end_tick - game.ticks)
+        return game
+
+
+
+def main(argv: list = None) -> None:
+
+    parser = argparse.ArgumentParser(description="Воспроизведение записи игры без экрана")
+    parser.add_argument("path", help="файл записи")
+    parser.add_argument("--max-ticks", type=int, default=None, help="остановиться после этого тика")
+    args = parser.parse_args(argv)
+    replay = Replay.load(args.path)
+    start = time.perf_counter()
+    game = replay.play(max_ticks=args.max_ticks)
+    elapsed = time.perf_counter() - start
+    print(f"seed {replay.seed}, {len(replay.events)} clicks")
+    print(
+        f"ticks {game.ticks} ({game.ticks / Simulation.TICK_RATE:.0f}s of game time), "
+        f"score {game.statistic.score}, money {game.statistic.money}, "
+        f"level {game.statistic.level}, tower health {game.tower.health}")
+    print(f"replayed in {elapsed:.2f}s ({game.ticks / elapsed:.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import pygame
+import random
+from characters import *
+from assets import SpriteAtlas, ATLAS
+from flowfield import GameMap
+
+
+
+class Simulation:
+    '''
+    Игровое ядро, которое продвигает игру по тикам без экрана, шрифтов и дисплея:
+    появление и движение врагов, стрельба, урон и экономика.
+    Объекты Tower, Road, PlayStatistic, Enemies и Defenses хранят состояние игры,
+    а их методы drow только отображают это состояние, поэтому игру можно
+    симулировать с любой скоростью, а рисовать лишь когда есть экран
+
+    Args:
+        width (int): ширина игрового поля
+        screen (pygame.Surface): екран для отрисовки, None для безголового режима
+        tower_img (str): путь к изображению крепости
+        enemy_src (str): путь к директории со спрайтами врагов
+        defense_src (str): путь к директории со спрайтами защитных сооружений
+        seed (int): seed генератора случайных чисел игры, None для случайного
+        atlas (SpriteAtlas): кэш спрайтов, по умолчанию общий на процесс ATLAS,
+            так что новая игра не загружает изображения заново
+        height (int): высота игрового поля
+        game_map (GameMap): карта с дорогой из клеток, None для прямой дороги.
+            Размер поля тогда берется из карты, а крепость ставится на ее клетки крепости
+
+    Attributes:
+        tower (Tower): объект крепости
+        road (Road): объект дороги, MapRoad если игра идет по карте
+        statistic (PlayStatistic): объект статистики игры
+        enemies (Enemies): объект списка врагов
+        defenses (Defenses): объект списка защитных сооружений
+        screen (pygame.Surface): екран, None для безголового режима
+        atlas (SpriteAtlas): кэш спрайтов всех объектов игры
+        seed (int): seed игры, одинаковый seed и ввод дают одинаковую игру
+        rng (random.Random): собственный генератор случайных чисел игры
+        recorder (ReplayRecorder): запись ввода игрока, None если не ведется
+        profiler (FrameProfiler): замер времени фаз тика и отрисовки, None если не ведется
+        ticks (int): количество выполненных игровых тиков
+        time_left (float): накопленное время (сек.) которого пока не хватило на целый тик
+    '''
+    TICK_RATE = 25
+    LEFT = 1
+    RIGHT = 3
+    WHEEL_UP = 4
+    WHEEL_DOWN = 5
+
+    def __init__(
+                self,
+                width: int = 1000,
+                screen: pygame.Surface = None,
+                tower_img: str = "src/tower.png",
+                enemy_src: str = "src/enemies/",
+                defense_src: str = "src/defenses/",
+                seed: int = None,
+                atlas: SpriteAtlas = None,
+                height: int = 600,
+                game_map: GameMap = None
+                ) -> None:
+
+        if seed is None:
+            seed = random.randrange(2**63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.recorder = None
+        self.profiler = None
+        self.screen = screen
+        if atlas is None:
+            atlas = ATLAS
+        atlas.convert()
+        self.atlas = atlas
+        self.tower = Tower(tower_img, self.atlas)
+        if game_map is None:
+            self.road = Road(self.tower, width)
+        else:
+            width, height = game_map.width, game_map.height
+            self.tower.sprite_rect.center = game_map.goal_center
+            self.tower.sprite_rect.clamp_ip(pygame.Rect(0, 0, width, height))
+            self.road = MapRoad(self.tower, game_map)
+        self.statistic = PlayStatistic(width)
+        self.enemies = Enemies(
+                            enemy_src,
+                            self.tower,
+                            self.road,
+                            screen,
+                            self.statistic,
+                            self.atlas,
+                            self.rng)
+        self.defenses = Defenses(
+                            defense_src,
+                            self.tower,
+                            self.road,
+                            screen,
+                            self.enemies,
+                            self.atlas,
+                            height)
+        self.ticks = 0
+        self.time_left = 0.0
+
+
+    def is_over(self) -> bool:
+        '''
+        Returns:
+            bool: истина если крепость разрушена и игра окончена
+        '''
+        return self.tower.destroyed()
+
+
+    def click(self, button: int, position: tuple) -> None:
+        '''
+        Обработка нажатия мыши в текущем тике: LEFT строит или улучшает
+        сооружение, RIGHT разрушает, колесо выбирает вид новых сооружений.
+        Если ведется запись, нажатие записывается
+        Args:
+            button (int): кнопка мыши, LEFT, RIGHT, WHEEL_UP или WHEEL_DOWN
+            position (tuple): координаты нажатия (х,у)
+        '''
+        if self.recorder is not None:
+            self.recorder.record(self.ticks, button, position)
+        if button == self.LEFT:
+            self.defenses.left_click(position, self.statistic)
+        elif button == self.RIGHT:
+            self.defenses.right_click(position, self.statistic)
+        elif button == self.WHEEL_UP:
+            self.defenses.select(-1)
+        elif button == self.WHEEL_DOWN:
+            self.defenses.select(1)
+
+
+    def edit_map(self, cell: tuple, value: bool) -> bool:
+        '''
+        Прокладка или разбор клетки дороги посреди игры. Поле направлений
+        пересчитывается только вокруг клетки, карта занятости и статический
+        фон обновляются в области клетки. Разбор, после которого от какого-то
+        входа или от какого-то врага нет пути до крепости, отменяется
+        Args:
+            cell (tuple): клетка карты (ряд, столбец)
+            value (bool): дорога ли клетка теперь
+
+        Returns:
+            bool: ложь если на месте новой дороги стоит сооружение
+            или разбор клетки отрезал бы вход или врага от крепости
+        '''
+        road = self.road
+        if road.map is None:
+            raise ValueError("game has no map")
+        rect = road.map.cell_rect(cell)
+        grid = self.defenses.grid
+        if value and grid.units_in(rect):
+            return False
+        road.set_cell(cell, value)
+        if not value and self.stranded():
+            road.set_cell(cell, True)
+            return False
+        if value:
+            grid.block(rect)
+        else:
+            grid.unblock(rect)
+            grid.block(rect.clip(self.tower.sprite_rect))
+        self.defenses.changed(rect)
+        return True
+
+
+    def stranded(self) -> bool:
+        '''
+        Returns:
+            bool: истина если от какого-то входа карты или от клетки
+            какого-то врага нет пути до крепости
+        '''
+        game_map = self.road.map
+        distance = game_map.field.distance
+        unreachable = game_map.field.UNREACHABLE
+        if any(distance[entrance] == unreachable for entrance in game_map.entrances):
+            return True
+        store = self.enemies.enemies
+        rows, cols = game_map.cells(store.x, store.y)
+        return bool((distance[rows, cols] == unreachable).any())
+
+
+    def step(self, n_ticks: int = 1) -> int:
+        '''
+        Продвигает симуляцию на указанное количество тиков.
+        Порядок фаз тика: стрельба сооружений, появление врагов, движение врагов
+        Args:
+            n_ticks (int): количество тиков
+
+        Returns:
+            int: количество фактически выполненных тиков,
+            меньше n_ticks если крепость была разрушена
+        '''
+        done = 0
+        profiler = self.profiler
+        while done < n_ticks and not self.is_over():
+            self.defenses.update()
+            if profiler is not None:
+                profiler.mark("combat")
+            self.enemies.update()
+            if profiler is not None:
+                profiler.mark("enemies")
+            self.ticks += 1
+            done += 1
+        return done
+
+
+    def advance(self, dt: float, max_ticks: int = None) -> int:
+        '''
+        Продвигает симуляцию на dt секунд игрового времени при частоте TICK_RATE.
+        Остаток времени меньше одного тика сохраняется до следующего вызова,
+        так что скорость игры не зависит от частоты кадров: после медленного
+        кадра выполняется несколько тиков подряд
+        Args:
+            dt (float): прошедшее время в секундах
+            max_ticks (int): наибольшее количество тиков за вызов, лишнее
+            время отбрасывается, чтобы после долгой паузы игра не пыталась
+            догнать ее все более медленными кадрами
+
+        Returns:
+            int: количество выполненных тиков
+        '''
+        self.time_left += dt
+        n_ticks = int(self.time_left * self.TICK_RATE)
+        self.time_left -= n_ticks / self.TICK_RATE
+        if max_ticks is not None and n_ticks > max_ticks:
+            n_ticks = max_ticks
+        return self.step(n_ticks)
+
+
+    def interpolation(self) -> float:
+        '''
+        Returns:
+            float: доля следующего тика, накопленная в time_left (от 0 до 1),
+            для отрисовки врагов между прошлым и текущим тиком
+        '''
+        return min(1.0, self.time_left * self.TICK_RATE)
+
+
+    def drow(self, alpha: float = 1.0) -> None:
+        '''
+        Отрисовка текущего состояния игры на екране, сама игра при этом не продвигается
+        Args:
+            alpha (float): доля тика для плавной отрисовки врагов, см. interpolation
+        '''
+        self.drow_static(self.screen)
+        self.drow_dynamic(alpha)
+
+
+    def drow_static(self, surface: pygame.Surface, area: pygame.Rect = None) -> None:
+        '''
+        Отрисовка того, что меняется только при постройке, улучшении
+        и продаже сооружений: дороги и сооружений с радиусами и подписями
+        Args:
+            surface (pygame.Surface): поверхность для рисования
+            area (pygame.Rect): рисовать только сооружения, задевающие эту область
+        '''
+        self.road.drow(surface)
+        self.defenses.drow_defenses(surface, area)
+
+
+    def drow_dynamic(self, alpha: float = 1.0) -> None:
+        '''
+        Отрисовка крепости, снарядов, врагов и статистики поверх статического фона
+        Args:
+            alpha (float): доля тика для плавной отрисовки врагов, см. interpolation
+        '''
+        self.tower.drow(self.screen)
+        self.defenses.drow_bulets(self.screen)
+        self.enemies.drow(alpha=alpha)
+        if self.profiler is not None:
+            self.profiler.mark("drow")
+        self.statistic.drow(self.screen)
+        if self.profiler is not None:
+            self.profiler.mark("hud")
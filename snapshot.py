@@ -0,0 +1,234 @@
+import os
+import struct
+import numpy as np
+from characters import Defenses
+from enemy_store import EnemyStore
+from flowfield import GameMap
+from modifiers import EFFECTS
+from simulation import Simulation
+
+'''
+Сохранение и загрузка полного состояния игры в двоичном виде.
+Формат: заголовок (метка, версия), общее состояние игры, состояние генератора
+случайных чисел, карта в текстовом виде (пустая для прямой дороги), расписание
+волн, модификаторы врагов, поля врагов массивами подряд в порядке EnemyStore.FIELDS,
+записи сооружений и поля снарядов в порядке ProjectileStore.FIELDS. Спрайты хранятся индексами в списках
+спрайтов, поэтому снимок не зависит от изображений и читается за миллисекунды.
+Загруженная игра продолжается точно так же, как продолжилась бы исходная
+
+Пример:
+    save(game, "kiosk.tds")
+    game = load("kiosk.tds", screen)
+'''
+
+MAGIC = b"TDSS"
+VERSION = 8
+HEADER = struct.Struct("<4sB")
+# seed, тики, остаток времени, ширина поля, здоровье крепости, очки, деньги, уровень,
+# очки следующего уровня, следующий uid, количества врагов,
+# сооружений и снарядов, есть ли сохраненное значение gauss и оно само,
+# выбранный вид новых сооружений
+GAME = struct.Struct("<QQdqqqqqqqIII?dB")
+# версия состояния random.Random и 625 слов Mersenne Twister
+RNG_WORDS = 625
+RNG = struct.Struct(f"<I{RNG_WORDS}I")
+# длина текста карты в байтах
+MAP = struct.Struct("<I")
+# тик и время расписания волн, есть ли выданное событие и оно само (тик, уровень, слот),
+# за ними тики освобождения слотов по int64 на слот
+WAVES = struct.Struct("<qd?qhh")
+# прибавка и множитель скорости, множитель урона, количество видов эффектов снарядов
+MODIFIERS = struct.Struct("<dddH")
+# вид эффекта: индекс эффекта в EFFECTS, сила, тики. Номера видов это порядок записей
+KIND = struct.Struct("<BdI")
+# центр, уровень, перезарядка, индекс спрайта, вид (индекс в Defenses.KINDS).
+# Направление сооружения определяется положением центра относительно дороги
+DEFENSE = struct.Struct("<hhBhBB")
+
+
+def dump_store(store: EnemyStore) -> list:
+    '''
+    Returns:
+        list: поля хранилища массивами подряд в порядке FIELDS
+    '''
+    return [getattr(store, name).astype(dtype, copy=False).tobytes() for name, dtype in store.FIELDS]
+
+
+def load_store(data: bytes, position: int, store: EnemyStore, size: int) -> int:
+    '''
+    Заполнение хранилища полями из снимка
+    Args:
+        data (bytes): снимок
+        position (int): смещение первого поля
+        store (EnemyStore): пустое хранилище
+        size (int): количество строк
+
+    Returns:
+        int: смещение после последнего поля
+    '''
+    store.reserve(size)
+    for name, dtype in store.FIELDS:
+        store.arrays[name][:size] = np.frombuffer(data, dtype, size, position)
+        position += size * np.dtype(dtype).itemsize
+    store.size = size
+    return position
+
+
+def dumps(game: Simulation) -> bytes:
+    '''
+    Args:
+        game (Simulation): игра
+
+    Returns:
+        bytes: снимок состояния игры
+    '''
+    statistic = game.statistic
+    enemies = game.enemies
+    store = enemies.enemies
+    waves = enemies.waves
+    modifiers = enemies.modifiers
+    # вид 0 это отсутствие эффекта, он есть всегда
+    kinds = modifiers.kinds[1:]
+    effects = list(EFFECTS)
+    defenses = game.defenses.defenses
+    projectiles = game.defenses.projectiles.store
+    version, words, gauss = game.rng.getstate()
+    game_map = game.road.map
+    map_text = b"" if game_map is None else game_map.dumps().encode("utf-8")
+    parts = [
+        HEADER.pack(MAGIC, VERSION),
+        GAME.pack(
+            game.seed,
+            game.ticks,
+            game.time_left,
+            game.road.x1,
+            int(game.tower.health),
+            int(statistic.score),
+            int(statistic.money),
+            statistic.level,
+            statistic.next_level_points,
+            enemies.next_uid,
+            len(store),
+            len(defenses),
+            len(projectiles),
+            gauss is not None,
+            gauss or 0.0,
+            game.defenses.kind),
+        RNG.pack(version, *words),
+        MAP.pack(len(map_text)),
+        map_text,
+        WAVES.pack(waves.tick, waves.time, waves.pending is not None, *(waves.pending or (0, 0, 0))),
+        np.array(waves.slot_free, np.int64).tobytes(),
+        MODIFIERS.pack(modifiers.add["speed"], modifiers.scale["speed"], modifiers.scale["damage"], len(kinds)),
+        ]
+    parts.extend(KIND.pack(effects.index(effect), strength, ticks) for effect, strength, ticks in kinds)
+    parts.extend(dump_store(store))
+    for unit in defenses:
+        x, y = unit.sprite_rect.center
+        sprite = next(i for i, sprite in enumerate(unit.sprites) if sprite is unit.sprite)
+        parts.append(DEFENSE.pack(x, y, unit.level, unit.wait, sprite, Defenses.KINDS.index(type(unit))))
+    parts.extend(dump_store(projectiles))
+    return b"".join(parts)
+
+
+def loads(data: bytes, screen=None, atlas=None) -> Simulation:
+    '''
+    Args:
+        data (bytes): снимок из dumps
+        screen (pygame.Surface): екран для отрисовки, None для безголового режима
+        atlas (SpriteAtlas): кэш спрайтов, по умолчанию общий ATLAS
+
+    Returns:
+        Simulation: игра в состоянии снимка
+    '''
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a game snapshot of version {VERSION}")
+    position = HEADER.size
+    (seed, ticks, time_left, width, health, score, money, level, next_level_points,
+        next_uid, n_enemies, n_defenses, n_projectiles, has_gauss, gauss, kind) = GAME.unpack_from(data, position)
+    position += GAME.size
+    rng_state = RNG.unpack_from(data, position)
+    position += RNG.size
+    (map_size,) = MAP.unpack_from(data, position)
+    position += MAP.size
+    game_map = None
+    if map_size:
+        game_map = GameMap.parse(data[position:position + map_size].decode("utf-8"))
+    position += map_size
+
+    game = Simulation(width, screen, seed=seed, atlas=atlas, game_map=game_map)
+    game.ticks = ticks
+    game.time_left = time_left
+    game.rng.setstate((rng_state[0], rng_state[1:], gauss if has_gauss else None))
+    game.tower.health = health
+    statistic = game.statistic
+    statistic.score = score
+    statistic.money = money
+    statistic.level = level
+    statistic.next_level_points = next_level_points
+
+    enemies = game.enemies
+    waves = enemies.waves
+    tick, time, has_pending, *pending = WAVES.unpack_from(data, position)
+    position += WAVES.size
+    waves.tick = tick
+    waves.time = time
+    waves.pending = tuple(pending) if has_pending else None
+    n_slots = len(waves.slot_free)
+    # генератор расписания держит ссылку на этот список, поэтому он заполняется на месте
+    waves.slot_free[:] = np.frombuffer(data, np.int64, n_slots, position).tolist()
+    position += n_slots * 8
+    modifiers = enemies.modifiers
+    speed_add, speed_scale, damage_scale, n_kinds = MODIFIERS.unpack_from(data, position)
+    position += MODIFIERS.size
+    modifiers.add["speed"] = speed_add
+    modifiers.scale["speed"] = speed_scale
+    modifiers.scale["damage"] = damage_scale
+    effects = list(EFFECTS)
+    for effect, strength, kind_ticks in KIND.iter_unpack(data[position:position + n_kinds * KIND.size]):
+        modifiers.kind((effects[effect], strength, kind_ticks))
+    position += n_kinds * KIND.size
+    enemies.next_uid = next_uid
+    position = load_store(data, position, enemies.enemies, n_enemies)
+    store = enemies.enemies
+    modifiers.timed = any(bool((getattr(store, ticks) > 0).any()) for _, ticks in EFFECTS.values())
+    enemies.grid_dirty = True
+
+    defenses = game.defenses
+    defenses.kind = kind
+    y_road = game.road.y
+    for x, y, unit_level, wait, sprite, unit_kind in DEFENSE.iter_unpack(
+                                                        data[position:position + n_defenses * DEFENSE.size]):
+        unit = Defenses.KINDS[unit_kind](x, y, defenses.sprites, y_road, defenses.flipped_sprites)
+        unit.level = unit_level - 1
+        unit.update_level()
+        unit.sprite = unit.sprites[sprite]
+        unit.wait = wait
+        defenses.add(unit)
+    position += n_defenses * DEFENSE.size
+    load_store(data, position, defenses.projectiles.store, n_projectiles)
+    return game
+
+
+def save(game: Simulation, path: str) -> None:
+    '''
+    Запись снимка в файл. Снимок сначала пишется во временный файл,
+    который затем атомарно заменяет старый, так что сбой во время записи
+    не портит предыдущий снимок
+    Args:
+        game (Simulation): игра
+        path (str): путь к файлу снимка
+    '''
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as file:
+        file.write(dumps(game))
+    os.replace(temp, path)
+
+
+def load(path: str, screen=None, atlas=None) -> Simulation:
+    '''
+    Чтение снимка из файла, см. loads
+    '''
+    with open(path, "rb") as file:
+        return loads(file.read(), screen, atlas)
@@ -0,0 +1,160 @@
+import numpy as np
+
+
+
+class SpatialGrid:
+    '''
+    Равномерная сетка для быстрого поиска объектов рядом с точкой.
+    Объекты раскладываются по ячейкам размером cell_size одной векторной
+    сортировкой по номеру ячейки, поэтому запрос по радиусу проверяет только
+    ячейки, которые пересекает квадрат вокруг круга поиска,
+    а не все объекты на поле
+
+    Args:
+        cell_size (int): размер стороны ячейки в пикселях
+
+    Attributes:
+        cell_size (int): размер стороны ячейки в пикселях
+        xs (np.ndarray): координаты объектов по горизонтали на момент раскладки
+        ys (np.ndarray): координаты объектов по вертикали на момент раскладки
+        order (np.ndarray): номера объектов отсортированные по ячейкам
+        keys (np.ndarray): отсортированные ключи ячеек для order
+    '''
+    SHIFT = 1 << 20
+
+    def __init__(self, cell_size: int = 64) -> None:
+
+        self.cell_size = cell_size
+        self.rebuild(np.empty(0), np.empty(0))
+
+
+    def __len__(self) -> int:
+
+        return len(self.order)
+
+
+    def cell_key(self, i, j):
+        '''
+        Returns:
+            ключ ячейки (i, j), ячейки одного столбца i идут подряд
+        '''
+        return (i + self.SHIFT) * (2 * self.SHIFT) + (j + self.SHIFT)
+
+
+    def rebuild(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        '''
+        Раскладывает объекты по ячейкам. Номер объекта это его индекс в xs и ys
+        Args:
+            xs (np.ndarray): координаты объектов по горизонтали
+            ys (np.ndarray): координаты объектов по вертикали
+        '''
+        self.xs = xs
+        self.ys = ys
+        i = np.floor_divide(xs, self.cell_size).astype(np.int64)
+        j = np.floor_divide(ys, self.cell_size).astype(np.int64)
+        keys = self.cell_key(i, j)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+
+    def candidates(self, x: float, y: float, radius: float) -> np.ndarray:
+        '''
+        Returns:
+            np.ndarray: номера объектов из ячеек, которые пересекает
+            квадрат со стороной 2*radius вокруг точки (x, y)
+        '''
+        i1, i2 = int(np.floor((x - radius) / self.cell_size)), int(np.floor((x + radius) / self.cell_size))
+        j1, j2 = int(np.floor((y - radius) / self.cell_size)), int(np.floor((y + radius) / self.cell_size))
+        columns = np.arange(i1, i2 + 1)
+        starts = np.searchsorted(self.keys, self.cell_key(columns, j1), "left")
+        ends = np.searchsorted(self.keys, self.cell_key(columns, j2), "right")
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends) if s < e] or [self.order[:0]])
+
+
+    def query(self, x: float, y: float, radius: float, valid: np.ndarray = None) -> tuple:
+        '''
+        Поиск всех объектов в радиусе от точки (граница включается)
+        Args:
+            x (float): координата центра поиска по горизонтали
+            y (float): координата центра поиска по вертикали
+            radius (float): радиус поиска
+            valid (np.ndarray): маска объектов, которые участвуют в поиске
+
+        Returns:
+            tuple: (номера объектов, квадраты расстояний до них)
+        '''
+        rows = self.candidates(x, y, radius)
+        if valid is not None:
+            rows = rows[valid[rows]]
+        distance2 = (self.xs[rows] - x) ** 2 + (self.ys[rows] - y) ** 2
+        inside = distance2 <= radius * radius
+        return rows[inside], distance2[inside]
+
+
+    def query_many(self, x: np.ndarray, y: np.ndarray, radius: np.ndarray, valid: np.ndarray = None) -> tuple:
+        '''
+        Поиск объектов в радиусе сразу от многих точек одним векторным проходом:
+        диапазоны столбцов ячеек всех точек находятся одним searchsorted,
+        а найденные отрезки order разворачиваются в пары без цикла по точкам
+        Args:
+            x (np.ndarray): координаты центров поиска по горизонтали
+            y (np.ndarray): координаты центров поиска по вертикали
+            radius (np.ndarray): радиус поиска для каждого центра
+            valid (np.ndarray): маска объектов, которые участвуют в поиске
+
+        Returns:
+            tuple: (номера центров, номера объектов, квадраты расстояний) для каждой найденной пары
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), x.shape)
+        i1 = np.floor_divide(x - radius, self.cell_size).astype(np.int64)
+        i2 = np.floor_divide(x + radius, self.cell_size).astype(np.int64)
+        j1 = np.floor_divide(y - radius, self.cell_size).astype(np.int64)
+        j2 = np.floor_divide(y + radius, self.cell_size).astype(np.int64)
+        # по одной записи на каждый столбец ячеек каждого центра
+        n_columns = i2 - i1 + 1
+        owner = np.repeat(np.arange(len(x)), n_columns)
+        columns = i1[owner] + np.arange(len(owner)) - np.repeat(np.cumsum(n_columns) - n_columns, n_columns)
+        starts = np.searchsorted(self.keys, self.cell_key(columns, j1[owner]), "left")
+        ends = np.searchsorted(self.keys, self.cell_key(columns, j2[owner]), "right")
+        # отрезки order[start:end] разворачиваются в позиции подряд
+        counts = ends - starts
+        owner = np.repeat(owner, counts)
+        positions = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        rows = self.order[positions]
+        if valid is not None:
+            keep = valid[rows]
+            owner, rows = owner[keep], rows[keep]
+        distance2 = (self.xs[rows] - x[owner]) ** 2 + (self.ys[rows] - y[owner]) ** 2
+        inside = distance2 <= radius[owner] ** 2
+        return owner[inside], rows[inside], distance2[inside]
+
+
+    def nearest(
+                self,
+                x: float,
+                y: float,
+                radius: float,
+                valid: np.ndarray = None,
+                order: np.ndarray = None
+                ) -> int:
+        '''
+        Поиск ближайшего объекта в радиусе от точки.
+        Сравниваются квадраты расстояний, при равенстве выбирается
+        объект с меньшим значением order (по умолчанию с меньшим номером)
+        Args:
+            x (float): координата центра поиска по горизонтали
+            y (float): координата центра поиска по вертикали
+            radius (float): радиус поиска
+            valid (np.ndarray): маска объектов, которые участвуют в поиске
+            order (np.ndarray): порядок объектов для равных расстояний
+
+        Returns:
+            int: номер ближайшего объекта или None
+        '''
+        rows, distance2 = self.query(x, y, radius, valid)
+        if not len(rows):
+            return None
+        tie = rows if order is None else order[rows]
+        return int(rows[np.lexsort((tie, distance2))[0]])
@@ -0,0 +1,30 @@
+import pytest
+from balance import run_game, run_batch, summarize, format_table
+
+'''
+Тестируем пакетный прогон игр для оценки баланса
+'''
+
+def test_run_game_reproducible():
+    first = run_game((7, "line", 600, 100))
+    second = run_game((7, "line", 600, 100))
+    assert first == second
+    assert first["ticks"] == 600
+    assert len(first["money_curve"]) == 6
+    assert first["towers"] > 0
+
+
+def test_run_batch_process_pool():
+    inline = run_batch(2, ["none", "upgrade"], seed=3, max_ticks=300, workers=1)
+    pooled = run_batch(2, ["none", "upgrade"], seed=3, max_ticks=300, workers=2)
+    assert inline == pooled
+    assert [result["policy"] for result in inline] == ["none", "none", "upgrade", "upgrade"]
+
+
+def test_summarize():
+    results = run_batch(3, ["line"], max_ticks=500, sample_every=250, workers=1)
+    summary = summarize(results)
+    assert summary["line"]["games"] == 3
+    assert summary["line"]["seconds_p50"] == 20.0
+    assert len(summary["line"]["money_curve"]) == 2
+    assert "line" in format_table(summary)
@@ -0,0 +1,40 @@
+import json
+import pytest
+import pygame
+from benchmark import benchmarks, measure, compare, main
+
+'''
+Тестируем набор замеров скорости
+каждый замер должен подготавливаться и выполняться, а сравнение
+с опорными результатами должно находить замедления
+'''
+
+def test_benchmarks_run_once():
+    for name, setup in benchmarks(quick=True):
+        run = setup()
+        run()
+    pygame.display.quit()
+
+
+def test_measure():
+    assert measure(lambda: None, min_time=0.001, repeat=1) > 0
+
+
+def test_compare():
+    baseline = {"a": 1.0, "b": 1.0}
+    results = {"a": 1.1, "b": 1.5, "c": 9.0}
+    assert compare(results, baseline, 20) == [("b", 1.0, 1.5, pytest.approx(50))]
+    assert compare(results, baseline, 60) == []
+
+
+def test_main_baseline(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    args = ["--baseline", path, "--filter", "PlayStatistic", "--min-time", "0.001", "--quick"]
+    assert main(args + ["--save"]) == 0
+    with open(path) as file:
+        data = json.load(file)
+    assert set(data["results"]) == {"PlayStatistic.drow[unchanged]", "PlayStatistic.drow[changing]"}
+    data["results"] = {name: seconds / 100 for name, seconds in data["results"].items()}
+    with open(path, "w") as file:
+        json.dump(data, file)
+    assert main(args) == 1
@@ -0,0 +1,191 @@
+import pytest
+import numpy as np
+import pygame
+from simulation import Simulation
+from characters import SplashDefense, ChainDefense
+from combat import nearest_targets
+
+'''
+Тестируем фазу боя класса Defenses
+'''
+
+def build_game(seed):
+    game = Simulation(seed=seed)
+    game.statistic.update_money(100000)
+    for x in range(200, 1000, 100):
+        game.defenses.spawn(x, 230, game.statistic)
+        game.defenses.spawn(x, 480, game.statistic)
+    game.statistic.level = 50
+    return game
+
+
+def test_Defenses_fire_matches_single_tower_targeting():
+    game = build_game(1)
+    game.step(200)
+    defenses = game.defenses.defenses
+    expected = [game.enemies.nearest(unit.sprite_rect, unit.distance) for unit in defenses]
+    targets = game.defenses.targets(defenses)
+    assert [-1 if row is None else row for row in expected] == targets.tolist()
+    assert (targets >= 0).any()
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_Defenses_fire_order_independent(seed):
+    game = build_game(seed)
+    game.step(300)
+    other = build_game(seed)
+    other.step(300)
+    other.defenses.defenses.reverse()
+    game.step(100)
+    other.step(100)
+    assert game.statistic.score == other.statistic.score
+    assert game.statistic.money == other.statistic.money
+    assert np.array_equal(game.enemies.enemies.uid, other.enemies.enemies.uid)
+    assert np.array_equal(game.enemies.enemies.health, other.enemies.enemies.health)
+
+
+def test_nearest_targets_tie_by_order():
+    # сооружение 0 видит трех врагов на одном расстоянии, сооружение 1 никого,
+    # сооружение 2 ближе всего к врагу 2
+    owner = np.array([0, 0, 0, 2, 2])
+    rows = np.array([0, 1, 2, 1, 2])
+    distance2 = np.array([100.0, 100.0, 100.0, 50.0, 20.0])
+    assert nearest_targets(owner, rows, distance2, 3).tolist() == [0, -1, 2]
+    order = np.array([7, 5, 6])
+    assert nearest_targets(owner, rows, distance2, 3, order).tolist() == [1, -1, 2]
+    assert nearest_targets(owner[:0], rows[:0], distance2[:0], 2).tolist() == [-1, -1]
+
+
+def test_Defenses_damage_on_arrival():
+    game = build_game(2)
+    game.step(300)
+    projectiles = game.defenses.projectiles
+    assert len(projectiles) > 0
+    score = game.statistic.score
+    game.defenses.fire()
+    assert game.statistic.score == score
+
+
+def test_Defenses_hit_many_sums_damage():
+    game = Simulation()
+    enemies = game.enemies
+    enemies.spawn()
+    health = enemies.get(0).health
+    money = game.statistic.money
+    enemies.hit_many(np.array([0, 0]), np.array([10.0, 15.0]))
+    assert enemies.get(0).health == health - 25
+    enemies.hit_many(np.array([0]), np.array([health]))
+    assert len(enemies) == 0
+    assert game.statistic.score == health + 25
+
+
+def test_Defenses_occupancy():
+    game = Simulation()
+    statistic = game.statistic
+    defenses = game.defenses
+    statistic.update_money(100000)
+    defenses.spawn(500, 230, statistic)
+    defenses.spawn(540, 230, statistic)
+    defenses.spawn(500, 352, statistic)
+    defenses.spawn(100, 230, statistic)
+    assert len(defenses.defenses) == 1
+    defenses.spawn(570, 230, statistic)
+    defenses.spawn(640, 230, statistic)
+    assert len(defenses.defenses) == 3
+    assert defenses.unit_at((500, 230)) == 0
+    assert defenses.unit_at((600, 200)) == 1
+    assert defenses.unit_at((500, 352)) is None
+    assert defenses.unit_at((5000, 352)) is None
+    last = defenses.defenses[2]
+    game.click(Simulation.RIGHT, (500, 230))
+    assert defenses.defenses == [last, defenses.defenses[1]]
+    assert defenses.unit_at((500, 230)) is None
+    assert defenses.unit_at((640, 230)) == 0
+    defenses.spawn(500, 230, statistic)
+    assert defenses.unit_at((500, 230)) == 2
+    game.click(Simulation.LEFT, (640, 230))
+    assert last.level == 3
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_Defenses_occupancy_exact(seed):
+    game = Simulation(seed=seed)
+    statistic = game.statistic
+    defenses = game.defenses
+    grid = defenses.grid
+    statistic.update_money(10 ** 7)
+    random = np.random.default_rng(seed)
+    for _ in range(600):
+        if defenses.defenses and random.random() < 0.1:
+            defenses.remove(int(random.integers(len(defenses.defenses))))
+        else:
+            defenses.spawn(int(random.integers(0, 1000)), int(random.integers(0, 600)), statistic)
+    # те же сооружения попиксельно без сетки
+    expected = np.full((600, 1000), grid.FREE)
+    field = pygame.Rect(0, 0, 1000, 600)
+    for rect in game.road.get_rects() + [game.tower.sprite_rect]:
+        rect = rect.clip(field)
+        expected[rect.top:rect.bottom, rect.left:rect.right] = grid.BLOCKED
+    for index, unit in enumerate(defenses.defenses):
+        rect = unit.sprite_rect.clip(field)
+        assert (expected[rect.top:rect.bottom, rect.left:rect.right] == grid.FREE).all()
+        expected[rect.top:rect.bottom, rect.left:rect.right] = index
+    assert len(defenses.defenses) > 10
+    assert [[grid.at(x, y) for x in range(1000)] for y in range(0, 600, 3)] == expected[::3].tolist()
+    assert grid.blocked.nbytes + grid.owner.nbytes < 100 * 1024
+
+
+def cluster(n):
+    game = Simulation(seed=1)
+    enemies = game.enemies
+    # враг 0 в центре, остальные на расстоянии 10*i от него
+    xs = 600.0 + 10.0 * np.arange(n)
+    enemies.enemies.extend(
+        n, x=xs, prev_x=xs, y=352.0, prev_y=352.0, health=1000.0, total_health=1000.0,
+        speed=0.0, damage=10, money=5, sprite=0, uid=np.arange(n))
+    enemies.next_uid = n
+    return game
+
+
+@pytest.mark.parametrize('chain, hit', [(0, 7), (2, 3)])
+def test_Defenses_splash_and_chain(chain, hit):
+    game = cluster(20)
+    enemies = game.enemies
+    projectiles = game.defenses.projectiles
+    calls = []
+    hit_many = enemies.hit_many
+    enemies.hit_many = lambda rows, damage: (calls.append(len(rows)), hit_many(rows, damage))
+    projectiles.launch(
+        np.array([600.0]), np.array([200.0]), np.array([0]), np.array([100.0]),
+        np.array([True]), None, np.array([60.0]), np.array([chain]))
+    while len(projectiles):
+        projectiles.update()
+    assert calls == [hit]
+    assert enemies.enemies.health.tolist() == [900.0] * hit + [1000.0] * (20 - hit)
+
+
+def test_Defenses_build_kind():
+    game = Simulation(seed=1)
+    defenses = game.defenses
+    game.statistic.update_money(1000)
+    game.click(Simulation.WHEEL_DOWN, (0, 0))
+    game.click(Simulation.LEFT, (500, 230))
+    game.click(Simulation.WHEEL_DOWN, (0, 0))
+    game.click(Simulation.LEFT, (700, 230))
+    game.click(Simulation.WHEEL_DOWN, (0, 0))
+    game.click(Simulation.WHEEL_UP, (0, 0))
+    game.click(Simulation.WHEEL_UP, (0, 0))
+    assert [type(unit) for unit in defenses.defenses] == [SplashDefense, ChainDefense]
+    assert defenses.KINDS[defenses.kind] is SplashDefense
+
+
+def test_Defenses_splash_kills_pay():
+    game = cluster(5)
+    money = game.statistic.money
+    defenses = game.defenses
+    defenses.add(SplashDefense(600, 230, defenses.sprites, game.road.y, defenses.flipped_sprites))
+    game.enemies.enemies.health[:] = 10.0
+    for _ in range(30):
+        defenses.update()
+    assert len(game.enemies) == 0
+    assert game.statistic.money == money + 25
@@ -0,0 +1,95 @@
+import pygame
+from simulation import Simulation
+from render import DirtyRenderer, StaticLayer
+
+'''
+Тестируем класс DirtyRenderer
+кадр нарисованный по грязным прямоугольникам должен совпадать с полной отрисовкой
+'''
+
+BG_COLOR = (50,205,50)
+
+
+def build_game(screen):
+    game = Simulation(1000, screen, seed=5)
+    game.statistic.update_money(100000)
+    for x in range(300, 1000, 150):
+        game.defenses.spawn(x, 230, game.statistic)
+        game.defenses.spawn(x, 480, game.statistic)
+    game.statistic.level = 40
+    game.enemies.speed = 8.0
+    return game
+
+
+def test_DirtyRenderer_matches_full_redraw():
+    pygame.init()
+    full_screen = pygame.Surface((1000, 600))
+    dirty_screen = pygame.Surface((1000, 600))
+    full = build_game(full_screen)
+    dirty = build_game(dirty_screen)
+    renderer = DirtyRenderer(dirty_screen, BG_COLOR)
+    for frame in range(150):
+        full.step()
+        dirty.step()
+        full_screen.fill(BG_COLOR)
+        full.drow()
+        rects = renderer.drow(dirty)
+        if frame:
+            assert len(rects) < 200
+        assert pygame.image.tobytes(full_screen, "RGB") == pygame.image.tobytes(dirty_screen, "RGB")
+    assert full.tower.health < full.tower.total_health
+
+
+def test_DirtyRenderer_invalidate():
+    pygame.init()
+    screen = pygame.Surface((1000, 600))
+    game = build_game(screen)
+    renderer = DirtyRenderer(screen, BG_COLOR)
+    renderer.drow(game)
+    assert renderer.drow(game) != [screen.get_rect()]
+    renderer.invalidate()
+    assert renderer.drow(game) == [screen.get_rect()]
+
+
+def edit_layout(game, frame):
+    if frame == 10:
+        game.click(Simulation.LEFT, (375, 480))
+    if frame == 20:
+        game.click(Simulation.LEFT, (300, 230))
+    if frame == 30:
+        game.click(Simulation.RIGHT, (600, 480))
+
+
+def test_DirtyRenderer_layout_changes_without_invalidate():
+    pygame.init()
+    full_screen = pygame.Surface((1000, 600))
+    dirty_screen = pygame.Surface((1000, 600))
+    full = build_game(full_screen)
+    dirty = build_game(dirty_screen)
+    renderer = DirtyRenderer(dirty_screen, BG_COLOR)
+    for frame in range(40):
+        edit_layout(full, frame)
+        edit_layout(dirty, frame)
+        full.step()
+        dirty.step()
+        full_screen.fill(BG_COLOR)
+        full.drow()
+        renderer.drow(dirty)
+        assert pygame.image.tobytes(full_screen, "RGB") == pygame.image.tobytes(dirty_screen, "RGB")
+    assert len(dirty.defenses.defenses) == 10
+
+
+def test_StaticLayer_partial_rebuild():
+    pygame.init()
+    game = build_game(pygame.Surface((1000, 600)))
+    layer = StaticLayer((1000, 600), BG_COLOR)
+    assert layer.update(game) == [pygame.Rect(0, 0, 1000, 600)]
+    assert layer.update(game) == []
+    for frame in range(40):
+        edit_layout(game, frame)
+    changed = layer.update(game)
+    assert len(changed) >= 3
+    assert all(rect.width < 1000 for rect in changed)
+    fresh = StaticLayer((1000, 600), BG_COLOR)
+    fresh.update(game)
+    assert pygame.image.tobytes(layer.surface, "RGB") == pygame.image.tobytes(fresh.surface, "RGB")
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+from enemy_store import EnemyStore
+from simulation import Simulation
+
+'''
+Тестируем класс EnemyStore и векторное перемещение врагов
+'''
+
+def test_EnemyStore_append_and_grow():
+    store = EnemyStore(capacity=2)
+    for i in range(10):
+        assert store.append(x=i, uid=i) == i
+    assert len(store) == 10
+    assert store.capacity >= 10
+    assert store.x.tolist() == list(range(10))
+
+
+def test_EnemyStore_remove_fills_holes_from_tail():
+    store = EnemyStore()
+    for i in range(6):
+        store.append(x=i, uid=i)
+    store.remove(store.uid % 2 == 0)
+    assert store.uid.tolist() == [3, 1, 5]
+    assert store.x.tolist() == [3, 1, 5]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_EnemyStore_remove_random(seed):
+    rnd = np.random.default_rng(seed)
+    store = EnemyStore(capacity=4)
+    for i in range(100):
+        store.append(x=i * 2, uid=i)
+    mask = rnd.random(100) < 0.3
+    survivors = set(store.uid[~mask].tolist())
+    capacity = store.capacity
+    store.remove(mask)
+    assert set(store.uid.tolist()) == survivors
+    assert (store.x == store.uid * 2).all()
+    assert store.capacity == capacity
+
+
+def test_EnemyStore_unknown_field():
+    store = EnemyStore()
+    with pytest.raises(AttributeError):
+        store.position
+
+
+def test_Enemies_move_and_arrive():
+    game = Simulation()
+    enemies = game.enemies
+    enemies.spawn()
+    assert len(enemies) == 1
+    unit = enemies.get(0)
+    x, speed, damage = unit.x, unit.speed, unit.damage
+    enemies.move()
+    assert unit.x == x - speed
+    while len(enemies):
+        enemies.move()
+    assert game.tower.health == game.tower.total_health - damage
+
+
+def test_Enemies_dead_removed_on_move():
+    game = Simulation()
+    enemies = game.enemies
+    enemies.spawn()
+    money = game.statistic.money
+    reward = enemies.get(0).money
+    enemies.hit(0, 10000)
+    enemies.hit(0, 10000)
+    assert game.statistic.money == money + reward
+    assert enemies.nearest(game.road.sprite_rect, 10000) is None
+    enemies.move()
+    assert len(enemies) == 0
+
+
+def test_EnemyStore_extend_and_find():
+    store = EnemyStore(capacity=2)
+    store.extend(3, x=np.array([1.0, 2.0, 3.0]), uid=np.array([10, 11, 12]), speed=2.0)
+    assert store.x.tolist() == [1.0, 2.0, 3.0]
+    assert store.speed.tolist() == [2.0, 2.0, 2.0]
+    store.remove(np.array([True, False, False]))
+    assert store.find(np.array([12, 10, 11, 99])).tolist() == [0, -1, 1, -1]
+    assert EnemyStore().find(np.array([1])).tolist() == [-1]
@@ -0,0 +1,132 @@
+import pytest
+import numpy as np
+from flowfield import FlowField, GameMap
+from simulation import Simulation
+from snapshot import dumps, loads
+
+'''
+Тестируем классы FlowField и GameMap
+частичный пересчет поля должен совпадать с полным,
+а враги на карте должны идти только по дороге
+'''
+
+MAPS = ["src/maps/fork.txt", "src/maps/bends.txt"]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_FlowField_incremental_matches_recompute(seed):
+    rnd = np.random.default_rng(seed)
+    passable = rnd.random((12, 20)) < 0.6
+    goals = [(6, 0), (7, 0)]
+    field = FlowField(passable, goals)
+    for _ in range(300):
+        cell = (int(rnd.integers(12)), int(rnd.integers(20)))
+        if cell in goals:
+            continue
+        field.set_passable(cell, not field.passable[cell])
+        full = FlowField(field.passable, goals)
+        assert (field.distance == full.distance).all()
+        assert (field.next == full.next).all()
+
+
+def test_GameMap_parse_dumps():
+    game_map = GameMap.load(MAPS[0])
+    assert (game_map.rows, game_map.cols, game_map.cell) == (12, 20, 50)
+    assert game_map.entrances == [(1, 19), (9, 19)]
+    assert GameMap.parse(game_map.dumps()).dumps() == game_map.dumps()
+    with pytest.raises(ValueError):
+        GameMap.parse("cell 50\n#S?T\n")
+
+
+def test_GameMap_steer_follows_fork():
+    game_map = GameMap.load(MAPS[0])
+    # на развилке путь вниз по нижней дороге короче
+    x, y, goal = game_map.steer(np.array([525.0]), np.array([475.0]))
+    assert (x[0], y[0], goal[0]) == (475.0, 475.0, False)
+    assert game_map.steer(np.array([25.0]), np.array([275.0]))[2][0]
+
+
+@pytest.mark.parametrize('path', MAPS)
+def test_Enemies_follow_map(path):
+    game = Simulation(seed=5, game_map=GameMap.load(path))
+    game_map = game.road.map
+    game.statistic.level = 30
+    game.enemies.speed = 5.0
+    for _ in range(600):
+        game.step()
+        store = game.enemies.enemies
+        r, c = game_map.cells(store.x, store.y)
+        assert game_map.road[r, c].all()
+    assert game.tower.health < game.tower.total_health
+
+
+def test_Simulation_edit_map():
+    game = Simulation(seed=1, game_map=GameMap.load(MAPS[0]))
+    game_map = game.road.map
+    grid = game.defenses.grid
+    # обрываем верхний путь, враги с верхнего входа идут через нижний
+    assert game.edit_map((5, 6), False)
+    assert grid.at(325, 275) == grid.FREE
+    assert game_map.field.distance[1, 10] == 4 + 12 + 4
+    assert game.edit_map((5, 6), True)
+    assert grid.at(325, 275) == grid.BLOCKED
+    assert game_map.field.distance[1, 10] == 13
+    game.statistic.update_money(100)
+    game.click(Simulation.LEFT, (625, 175))
+    assert len(game.defenses.defenses) == 1
+    assert not game.edit_map((3, 12), True)
+    assert not game_map.road[3, 12]
+    with pytest.raises(ValueError):
+        game.edit_map((1, 19), False)
+
+
+def test_snapshot_keeps_map():
+    game = Simulation(seed=2, game_map=GameMap.load(MAPS[1]))
+    game.edit_map((5, 2), False)
+    game.statistic.level = 30
+    game.step(300)
+    copy = loads(dumps(game))
+    assert copy.road.map.dumps() == game.road.map.dumps()
+    game.step(300)
+    copy.step(300)
+    assert copy.tower.health == game.tower.health
+    assert copy.enemies.enemies.x.tolist() == game.enemies.enemies.x.tolist()
+    assert copy.enemies.enemies.y.tolist() == game.enemies.enemies.y.tolist()
+
+
+def test_Simulation_edit_map_keeps_path():
+    game = Simulation(seed=1, game_map=GameMap.load(MAPS[0]))
+    game_map = game.road.map
+    grid = game.defenses.grid
+    assert game.edit_map((5, 6), False)
+    # второй путь последний, его разбор отрезал бы оба входа
+    assert not game.edit_map((9, 5), False)
+    assert game_map.road[9, 5]
+    assert grid.at(275, 475) == grid.BLOCKED
+    assert game_map.field.distance[9, 19] != game_map.field.UNREACHABLE
+    # клетку под врагом разобрать нельзя
+    assert game.edit_map((5, 6), True)
+    game.enemies.enemies.append(x=325.0, prev_x=325.0, y=275.0, prev_y=275.0, health=100.0, speed=1.0)
+    assert not game.edit_map((5, 6), False)
+    assert game_map.road[5, 6]
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_Simulation_edit_map_fuzz(seed):
+    game = Simulation(seed=seed, game_map=GameMap.load(MAPS[0]))
+    game_map = game.road.map
+    field = game_map.field
+    game.statistic.level = 30
+    rnd = np.random.default_rng(seed)
+    for _ in range(40):
+        game.step(20)
+        cell = (int(rnd.integers(game_map.rows)), int(rnd.integers(game_map.cols)))
+        if cell in game_map.entrances or cell in game_map.goals:
+            continue
+        game.edit_map(cell, not game_map.road[cell])
+        assert all(field.distance[entrance] != field.UNREACHABLE for entrance in game_map.entrances)
+        store = game.enemies.enemies
+        r, c = game_map.cells(store.x, store.y)
+        assert (field.distance[r, c] != field.UNREACHABLE).all()
+    game.step(1500)
+    assert game.tower.health < game.tower.total_health
@@ -0,0 +1,55 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import csv
+import pygame
+from profiler import FrameProfiler
+from simulation import Simulation
+
+'''
+Тестируем класс FrameProfiler
+выключенный профилировщик ничего не записывает, включенный
+раскладывает время кадра по фазам
+'''
+
+def test_FrameProfiler_disabled():
+    profiler = FrameProfiler(keep_samples=True)
+    profiler.mark("events")
+    profiler.end_frame()
+    assert profiler.count == 0
+    assert profiler.samples == []
+    assert profiler.percentiles() == {}
+    assert profiler.drow(pygame.Surface((100, 100))) is None
+
+
+def test_FrameProfiler_phases(tmp_path):
+    profiler = FrameProfiler(window=4, enabled=True, keep_samples=True)
+    game = Simulation(seed=1)
+    game.profiler = profiler
+    for _ in range(6):
+        profiler.mark("events")
+        game.step(5)
+        profiler.end_frame()
+    assert profiler.count == 6
+    assert (profiler.history[:, profiler.index["combat"]] > 0).all()
+    assert (profiler.history[:, profiler.index["enemies"]] > 0).all()
+    assert (profiler.history[:, profiler.index["drow"]] == 0).all()
+    stats = profiler.percentiles()
+    p50, p95, p99 = stats["frame"]
+    assert 0 < p50 <= p95 <= p99
+    path = str(tmp_path / "frames.csv")
+    profiler.write_csv(path)
+    with open(path) as file:
+        rows = list(csv.reader(file))
+    assert rows[0][0] == "frame" and rows[0][1] == "events_ns"
+    assert len(rows) == 7
+
+
+def test_FrameProfiler_overlay():
+    profiler = FrameProfiler(enabled=True)
+    profiler.mark("events")
+    profiler.end_frame()
+    screen = pygame.Surface((1000, 600))
+    rect = profiler.drow(screen)
+    assert rect.bottomleft == (0, 600)
+    assert rect.size == profiler.panel_size
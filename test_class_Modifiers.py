@@ -0,0 +1,124 @@
+import pytest
+import numpy as np
+from characters import Defense
+from simulation import Simulation
+from snapshot import dumps, loads
+
+'''
+Тестируем класс Modifiers
+глобальный модификатор меняется за O(1) без записи в строки врагов,
+а временные эффекты накладываются, действуют и снимаются векторно
+'''
+
+def targets(n, health=1000.0):
+    game = Simulation(seed=1)
+    enemies = game.enemies
+    enemies.enemies.extend(
+        n, x=600.0 + 40 * np.arange(n), prev_x=600.0, y=352.0, prev_y=352.0, health=health,
+        total_health=health, speed=enemies.BASE_SPEED, damage=10, money=5, sprite=0, uid=np.arange(n))
+    enemies.next_uid = n
+    return game
+
+
+def test_Modifiers_level_up_is_global():
+    game = targets(3)
+    enemies = game.enemies
+    store = enemies.enemies
+    enemies.next_score()
+    enemies.next_score()
+    assert store.speed.tolist() == [1.0, 1.0, 1.0]
+    assert enemies.speed == 2.0
+    assert enemies.get(0).speed == 2.0
+    x = store.x.copy()
+    enemies.move()
+    assert (x - store.x).tolist() == [2.0, 2.0, 2.0]
+
+
+def test_Modifiers_slow_expires():
+    game = targets(2)
+    enemies = game.enemies
+    store = enemies.enemies
+    modifiers = enemies.modifiers
+    modifiers.apply(np.array([0, 0]), np.array([modifiers.kind(("slow", 0.5, 3))] * 2))
+    assert modifiers.timed
+    x = store.x.copy()
+    enemies.move()
+    assert (x - store.x).tolist() == [0.5, 1.0]
+    enemies.move()
+    enemies.move()
+    assert not modifiers.timed
+    assert store.slow[0] == 0
+    x = store.x.copy()
+    enemies.move()
+    assert (x - store.x).tolist() == [1.0, 1.0]
+
+
+def test_Modifiers_poison_kills_and_pays():
+    game = targets(2, health=250.0)
+    enemies = game.enemies
+    modifiers = enemies.modifiers
+    money = game.statistic.money
+    modifiers.apply(np.array([1]), np.array([modifiers.kind(("poison", 100.0, 10))]))
+    enemies.move()
+    enemies.move()
+    assert enemies.get(1).health == 50.0
+    enemies.move()
+    assert len(enemies) == 1
+    assert game.statistic.money == money + 5
+    assert game.statistic.score == 300
+
+
+def test_Modifiers_shred_and_damage_scale():
+    game = targets(2)
+    enemies = game.enemies
+    modifiers = enemies.modifiers
+    modifiers.apply(np.array([0]), np.array([modifiers.kind(("shred", 0.5, 10))]))
+    enemies.hit_many(np.array([0, 1]), np.array([100.0, 100.0]))
+    assert enemies.enemies.health.tolist() == [850.0, 900.0]
+    modifiers.scale["damage"] = 2.0
+    enemies.hit(1, 100)
+    assert enemies.get(1).health == 700.0
+    with pytest.raises(ValueError):
+        modifiers.kind(("freeze", 1.0, 10))
+
+
+class Frost(Defense):
+
+    __slots__ = ()
+    effect = ("slow", 0.5, 30)
+
+
+def test_Defense_effect_applied_by_projectiles():
+    game = targets(1)
+    defenses = game.defenses
+    defenses.add(Frost(600, 230, defenses.sprites, game.road.y, defenses.flipped_sprites))
+    store = game.enemies.enemies
+    for _ in range(40):
+        defenses.fire()
+        defenses.projectiles.update()
+        if store.slow[0]:
+            break
+    assert store.slow[0] == 0.5
+    assert store.slow_ticks[0] == 30
+    assert store.health[0] < 1000.0
+
+
+def test_snapshot_keeps_modifiers():
+    game = Simulation(seed=4)
+    game.statistic.level = 30
+    game.enemies.next_score()
+    game.step(200)
+    enemies = game.enemies
+    modifiers = enemies.modifiers
+    rows = np.arange(len(enemies))
+    kinds = [modifiers.kind(("slow", 0.25, 150)), modifiers.kind(("poison", 2.0, 100))]
+    modifiers.apply(rows, np.array(kinds)[rows % 2])
+    copy = loads(dumps(game))
+    assert copy.enemies.modifiers.kinds == modifiers.kinds
+    assert copy.enemies.modifiers.timed
+    assert copy.enemies.speed == enemies.speed
+    game.step(300)
+    copy.step(300)
+    assert copy.enemies.enemies.x.tolist() == enemies.enemies.x.tolist()
+    assert copy.enemies.enemies.health.tolist() == enemies.enemies.health.tolist()
+    assert copy.statistic.score == game.statistic.score
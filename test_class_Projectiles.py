@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from simulation import Simulation
+
+'''
+Тестируем класс Projectiles
+урон наносится только когда снаряд долетает до цели
+'''
+
+def one_target(speed):
+    game = Simulation(seed=1)
+    enemies = game.enemies
+    enemies.enemies.append(
+        x=600.0, prev_x=600.0, y=352.0, prev_y=352.0, health=1000.0, total_health=1000.0,
+        speed=speed, damage=10, money=5, sprite=0, uid=0)
+    enemies.next_uid = 1
+    return game
+
+
+@pytest.mark.parametrize('homing', [True, False])
+def test_Projectiles_hit_on_arrival(homing):
+    game = one_target(3.0)
+    projectiles = game.defenses.projectiles
+    projectiles.launch(
+        np.array([600.0]), np.array([150.0]), np.array([0]), np.array([100.0]), np.array([homing]))
+    flight = 0
+    while len(projectiles):
+        assert game.enemies.get(0).health == 1000
+        game.step()
+        flight += 1
+    assert flight > 5
+    assert game.enemies.get(0).health == 900
+    assert game.statistic.score == 100
+
+
+def test_Projectiles_miss_when_target_died():
+    game = one_target(0.0)
+    projectiles = game.defenses.projectiles
+    projectiles.launch(
+        np.array([600.0]), np.array([150.0]), np.array([0]), np.array([100.0]), np.array([True]))
+    game.enemies.hit_many(np.array([0]), np.array([1000.0]))
+    score = game.statistic.score
+    for _ in range(30):
+        game.defenses.projectiles.update()
+    assert len(projectiles) == 0
+    assert game.statistic.score == score
+
+
+def test_Projectiles_drow():
+    import pygame
+    game = one_target(0.0)
+    projectiles = game.defenses.projectiles
+    projectiles.launch(
+        np.array([100.0, 200.0]), np.array([100.0, 150.0]), np.array([0, 0]),
+        np.array([1.0, 1.0]), np.array([True, False]))
+    rects = projectiles.drow(pygame.Surface((1000, 600)))
+    assert [rect.center for rect in rects] == [(100, 100), (200, 150)]
@@ -0,0 +1,89 @@
+import random
+import pytest
+import numpy as np
+from simulation import Simulation
+from flowfield import GameMap
+from replay import ReplayRecorder, Replay
+
+'''
+Тестируем запись и воспроизведение игры
+'''
+
+def play_session(path, seed):
+    game = Simulation(seed=seed)
+    game.recorder = ReplayRecorder(path, game.seed)
+    game.statistic.update_money(1000)
+    clicks = [(0, Simulation.LEFT, (400, 230)), (50, Simulation.LEFT, (600, 480)),
+              (300, Simulation.LEFT, (400, 230)), (900, Simulation.RIGHT, (600, 480))]
+    for tick, button, position in clicks:
+        game.step(tick - game.ticks)
+        game.click(button, position)
+    game.step(1500 - game.ticks)
+    game.recorder.close(game.ticks)
+    return game
+
+
+def test_Simulation_own_rng():
+    first = Simulation(seed=3)
+    random.seed(1)
+    first.step(2000)
+    second = Simulation(seed=3)
+    random.seed(2)
+    second.step(2000)
+    assert np.array_equal(first.enemies.enemies.x, second.enemies.enemies.x)
+    assert len(first.enemies) > 0
+
+
+def test_Replay_reproduces_game(tmp_path):
+    path = tmp_path / "session.tdr"
+    game = play_session(path, 11)
+    replay = Replay.load(path)
+    assert replay.seed == 11
+    assert replay.end_tick == 1500
+    assert len(replay.events) == 4
+    assert path.stat().st_size == 17 + 9 * 5
+    other = Simulation(seed=11)
+    other.statistic.update_money(1000)
+    replay.play(other)
+    assert other.ticks == game.ticks
+    assert other.statistic.score == game.statistic.score
+    assert other.statistic.money == game.statistic.money
+    assert other.tower.health == game.tower.health
+    assert np.array_equal(other.enemies.enemies.health, game.enemies.enemies.health)
+
+
+def test_Replay_unclosed_and_max_ticks(tmp_path):
+    path = tmp_path / "crash.tdr"
+    recorder = ReplayRecorder(path, 5)
+    recorder.record(10, Simulation.LEFT, (400, 230))
+    recorder.record(40, Simulation.LEFT, (500, 230))
+    replay = Replay.load(path)
+    assert replay.end_tick is None
+    assert replay.play().ticks == 40
+    assert replay.play(max_ticks=20).ticks == 20
+
+
+def test_Replay_bad_file(tmp_path):
+    path = tmp_path / "bad.tdr"
+    path.write_bytes(b"not a replay at all")
+    with pytest.raises(ValueError):
+        Replay.load(path)
+
+
+def test_Replay_keeps_map(tmp_path):
+    path = tmp_path / "map.tdr"
+    game = Simulation(seed=7, game_map=GameMap.load("src/maps/bends.txt"))
+    game.recorder = ReplayRecorder(path, game.seed, game.road.map)
+    game.step(100)
+    game.click(Simulation.LEFT, (500, 300))
+    game.step(2900)
+    game.recorder.close(game.ticks)
+    replay = Replay.load(path)
+    assert replay.map_text == game.road.map.dumps()
+    other = replay.play()
+    assert other.road.map.dumps() == game.road.map.dumps()
+    assert len(other.defenses.defenses) == 1
+    assert other.tower.health < other.tower.total_health
+    assert other.tower.health == game.tower.health
+    assert other.statistic.score == game.statistic.score
+    assert np.array_equal(other.enemies.enemies.y, game.enemies.enemies.y)
@@ -0,0 +1,93 @@
+import subprocess
+import sys
+import pytest
+import pygame
+from simulation import Simulation
+
+'''
+Тестируем класс Simulation
+симуляция должна работать без дисплея и шрифтов
+'''
+
+def test_Simulation_step_headless():
+    game = Simulation()
+    assert game.step(100) == 100
+    assert game.ticks == 100
+    assert game.statistic.font is None
+
+
+def test_Simulation_advance():
+    game = Simulation()
+    assert game.advance(1.0) == Simulation.TICK_RATE
+    assert game.advance(0.5 / Simulation.TICK_RATE) == 0
+    assert game.advance(0.5 / Simulation.TICK_RATE) == 1
+
+
+def test_Simulation_game_over():
+    game = Simulation()
+    game.statistic.level = 100
+    game.step(100000)
+    assert game.is_over()
+    assert game.step(10) == 0
+
+
+def test_Simulation_defense_fires():
+    game = Simulation()
+    game.statistic.update_money(1000)
+    game.defenses.spawn(500, 230, game.statistic)
+    assert len(game.defenses.defenses) == 1
+    game.statistic.level = 30
+    game.step(500)
+    assert game.statistic.score > 0
+
+
+def test_Simulation_frame_rate_independent():
+    slow = Simulation(seed=2)
+    fast = Simulation(seed=2)
+    slow.statistic.level = fast.statistic.level = 30
+    for _ in range(10 * 8):
+        slow.advance(1 / 8)
+    for _ in range(10 * 60):
+        fast.advance(1 / 60)
+    assert abs(slow.ticks - fast.ticks) <= 1
+    fast.step(slow.ticks - fast.ticks)
+    assert fast.enemies.enemies.x.tolist() == slow.enemies.enemies.x.tolist()
+
+
+def test_Simulation_advance_catch_up_limit():
+    game = Simulation()
+    assert game.advance(10.0, max_ticks=6) == 6
+    assert game.time_left < 1 / Simulation.TICK_RATE
+    assert game.advance(16 / 60, max_ticks=16) == 6
+
+
+def test_Simulation_interpolation():
+    game = Simulation(seed=3)
+    game.statistic.level = 100
+    game.step(50)
+    game.advance(0.5 / Simulation.TICK_RATE)
+    assert game.interpolation() == pytest.approx(0.5)
+    store = game.enemies.enemies
+    assert (store.prev_x - store.x == store.speed).all()
+    screen = pygame.Surface((1000, 600))
+    current = game.enemies.drow(screen)
+    between = game.enemies.drow(screen, game.interpolation())
+    shifts = [a.x - b.x for a, b in zip(between, current)]
+    assert shifts and all(0 <= shift <= 1 for shift in shifts)
+
+
+def test_Simulation_build_without_fonts():
+    # отдельный процесс, чтобы шрифты не были уже открыты другими тестами
+    code = (
+        "import pygame\n"
+        "from simulation import Simulation\n"
+        "game = Simulation(seed=1)\n"
+        "game.statistic.update_money(1000)\n"
+        "game.click(Simulation.LEFT, (500, 230))\n"
+        "game.click(Simulation.LEFT, (500, 230))\n"
+        "game.click(Simulation.RIGHT, (500, 230))\n"
+        "game.step(100)\n"
+        "assert game.statistic.money < 1000\n"
+        "assert not pygame.font.get_init()\n"
+        "assert game.defenses.changes == []\n")
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+from spatial import SpatialGrid
+from simulation import Simulation
+
+'''
+Тестируем класс SpatialGrid
+результат поиска должен совпадать с полным перебором
+'''
+
+def brute_nearest(xs, ys, x, y, radius):
+    best = None
+    for i in range(len(xs)):
+        distance2 = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+        if distance2 <= radius ** 2 and (best is None or distance2 < best[0]):
+            best = (distance2, i)
+    return None if best is None else best[1]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_SpatialGrid_nearest(seed):
+    rnd = np.random.default_rng(seed)
+    xs = rnd.integers(-100, 1000, 300).astype(float)
+    ys = rnd.integers(0, 600, 300).astype(float)
+    grid = SpatialGrid(32)
+    grid.rebuild(xs, ys)
+    for _ in range(200):
+        x, y, radius = rnd.integers(0, 1000), rnd.integers(0, 600), rnd.integers(0, 300)
+        assert grid.nearest(x, y, radius) == brute_nearest(xs, ys, x, y, radius)
+
+
+def test_SpatialGrid_valid_and_order():
+    grid = SpatialGrid()
+    grid.rebuild(np.array([0.0, 10.0, 0.0]), np.array([10.0, 0.0, -10.0]))
+    assert grid.nearest(0, 0, 100) == 0
+    assert grid.nearest(0, 0, 100, order=np.array([5, 3, 4])) == 1
+    assert grid.nearest(0, 0, 100, valid=np.array([False, False, True])) == 2
+    assert grid.nearest(0, 0, 5) is None
+
+
+def test_SpatialGrid_in_game():
+    game = Simulation()
+    game.statistic.level = 40
+    game.step(300)
+    enemies = game.enemies
+    rect = game.tower.sprite_rect.move(400, 0)
+    distances = [(enemies.get(i).get_distance(rect), enemies.get(i).uid) for i in range(len(enemies))]
+    expected = distances.index(min(distances))
+    assert enemies.nearest(rect, 10000) == expected
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_SpatialGrid_query_many(seed):
+    rnd = np.random.default_rng(seed)
+    xs = rnd.integers(-100, 1000, 300).astype(float)
+    ys = rnd.integers(0, 600, 300).astype(float)
+    valid = rnd.random(300) < 0.8
+    grid = SpatialGrid(32)
+    grid.rebuild(xs, ys)
+    x = rnd.integers(0, 1000, 50).astype(float)
+    y = rnd.integers(0, 600, 50).astype(float)
+    radius = rnd.integers(0, 200, 50).astype(float)
+    centres, rows, distance2 = grid.query_many(x, y, radius, valid)
+    expected = [
+        (i, j) for i in range(50) for j in range(300)
+        if valid[j] and (xs[j] - x[i]) ** 2 + (ys[j] - y[i]) ** 2 <= radius[i] ** 2]
+    assert sorted(zip(centres.tolist(), rows.tolist())) == expected
+    assert distance2.tolist() == ((xs[rows] - x[centres]) ** 2 + (ys[rows] - y[centres]) ** 2).tolist()
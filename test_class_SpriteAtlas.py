@@ -0,0 +1,86 @@
+import os
+import pytest
+import pygame
+from assets import SpriteAtlas, ATLAS, pack_bundle
+from simulation import Simulation
+
+'''
+Тестируем класс SpriteAtlas
+'''
+
+def test_SpriteAtlas_shared_surfaces():
+    atlas = SpriteAtlas()
+    assert atlas.get("src/enemies/1.png", 90) is atlas.get("src/enemies/1.png", 90)
+    assert atlas.get("src/enemies/1.png") is not atlas.get("src/enemies/1.png", 90)
+    assert len(atlas.images) == 1
+
+
+def test_SpriteAtlas_rotation():
+    atlas = SpriteAtlas()
+    tower = atlas.get("src/tower.png")
+    rotated = atlas.get("src/tower.png", 90)
+    assert rotated.get_size() == (tower.get_height(), tower.get_width())
+
+
+def test_SpriteAtlas_upgrade_does_not_rotate():
+    game = Simulation()
+    game.statistic.update_money(10000)
+    game.defenses.spawn(500, 150, game.statistic)
+    unit = game.defenses.defenses[0]
+    assert unit.direction == 1
+    unit.upgrade(game.statistic)
+    assert unit.sprite is game.atlas.get("src/defenses/3.png", 180)
+
+
+def test_SpriteAtlas_display_format():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((100, 100))
+    atlas = SpriteAtlas()
+    surface = atlas.get("src/enemies/2.png", 90)
+    assert atlas.display_format
+    assert surface.get_flags() & pygame.SRCALPHA
+    pygame.display.quit()
+
+
+def test_SpriteAtlas_shared_between_games():
+    first = Simulation()
+    second = Simulation()
+    assert first.atlas is ATLAS and second.atlas is ATLAS
+    assert first.tower.sprite is second.tower.sprite
+    assert first.enemies.unit_sprites[0] is second.enemies.unit_sprites[0]
+
+
+def test_SpriteAtlas_bundle(tmp_path):
+    path = str(tmp_path / "sprites.bundle")
+    assert pack_bundle(path) == 35
+    atlas = SpriteAtlas()
+    assert atlas.load_bundle(path) == 35
+    for name in ("src/tower.png", "src/enemies/7.png", "src/defenses/15.png"):
+        packed = atlas.images[name]
+        image = pygame.image.load(name)
+        assert packed.get_size() == image.get_size()
+        for x, y in ((0, 0), (20, 30), (image.get_width() // 2, image.get_height() // 2)):
+            assert packed.get_at((x, y)) == image.get_at((x, y))
+    game = Simulation(atlas=atlas)
+    assert game.tower.sprite.get_size() == pygame.image.load("src/tower.png").get_size()
+
+
+def test_SpriteAtlas_stale_bundle(tmp_path):
+    path = str(tmp_path / "sprites.bundle")
+    pack_bundle(path)
+    stat = os.stat("src/tower.png")
+    os.utime("src/tower.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    try:
+        atlas = SpriteAtlas()
+        assert atlas.load_bundle(path) == 34
+        assert "src/tower.png" not in atlas.images
+    finally:
+        os.utime("src/tower.png", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_SpriteAtlas_bad_bundle(tmp_path):
+    path = tmp_path / "sprites.bundle"
+    path.write_bytes(b"not a bundle")
+    with pytest.raises(ValueError):
+        SpriteAtlas().load_bundle(str(path))
@@ -0,0 +1,48 @@
+import pytest
+import pygame
+from fonts import FontRegistry, TextCache, get_font
+from characters import PlayStatistic
+
+'''
+Тестируем реестр шрифтов и кэш надписей
+'''
+
+def test_FontRegistry_shared_font():
+    registry = FontRegistry()
+    assert registry.get("arialalack", 30) is registry.get("arialalack", 30)
+    assert registry.get("arialalack", 30) is not registry.get("arialalack", 31)
+
+
+def test_TextCache_hit():
+    cache = TextCache(FontRegistry())
+    surface = cache.render(("arialalack", 30), "MAX", pygame.Color(50,50,205))
+    assert cache.render(("arialalack", 30), "MAX", (50,50,205,255)) is surface
+    assert cache.render(("arialalack", 30), "MAX", (50,50,205,255), False) is not surface
+
+
+def test_TextCache_lru_eviction():
+    cache = TextCache(FontRegistry(), max_size=2)
+    font = ("arialalack", 20)
+    first = cache.render(font, "a", (0,0,0))
+    cache.render(font, "b", (0,0,0))
+    assert cache.render(font, "a", (0,0,0)) is first
+    cache.render(font, "c", (0,0,0))
+    assert len(cache) == 2
+    assert (font, "b", (0,0,0), True) not in cache.surfaces
+    assert cache.render(font, "a", (0,0,0)) is first
+
+
+def test_PlayStatistic_renders_only_changed():
+    pygame.init()
+    screen = pygame.Surface((1000, 100))
+    statistic = PlayStatistic(1000)
+    statistic.drow(screen)
+    score, money, level = statistic.surfaces
+    statistic.drow(screen)
+    assert statistic.surfaces == [score, money, level]
+    statistic.add_money(5)
+    statistic.drow(screen)
+    assert statistic.surfaces[0] is score
+    assert statistic.surfaces[1] is not money
+    assert statistic.surfaces[2] is level
+    assert statistic.font is get_font("arialalack", 50)
@@ -0,0 +1,60 @@
+import pytest
+import numpy as np
+from env import VectorEnv
+from simulation import Simulation
+
+'''
+Тестируем класс VectorEnv
+игры среды должны идти так же, как отдельные игры с тем же seed и вводом,
+а наблюдения писаться в одни и те же массивы
+'''
+
+def test_VectorEnv_reuses_arrays():
+    env = VectorEnv(4, seed=1)
+    observations = env.reset()
+    assert observations.shape == (4, len(VectorEnv.SCALARS) + len(env.slots) + env.lanes)
+    result = env.step(np.zeros(4, np.int64))
+    assert result[0] is observations
+    assert result[1] is env.rewards and result[2] is env.dones
+    assert env.slot_levels.base is observations
+
+
+def test_VectorEnv_matches_Simulation():
+    env = VectorEnv(3, seed=5, frame_skip=5)
+    env.reset()
+    env.games[1].statistic.update_money(1000)
+    reference = Simulation(seed=6)
+    reference.statistic.update_money(1000)
+    actions = np.zeros(3, np.int64)
+    for step in range(100):
+        actions[1] = 1 if step % 10 == 0 else 0
+        if actions[1]:
+            reference.click(Simulation.LEFT, tuple(env.slots[0]))
+        reference.step(5)
+        env.step(actions)
+    game = env.games[1]
+    assert game.ticks == reference.ticks == 500
+    assert game.statistic.score == reference.statistic.score
+    assert game.enemies.enemies.x.tolist() == reference.enemies.enemies.x.tolist()
+    assert env.slot_levels[1, 0] == reference.defenses.defenses[0].level > 1
+    assert env.scalars[1, 1] == reference.statistic.money
+    assert env.lane_health[1].sum() == pytest.approx(reference.enemies.enemies.health.sum())
+
+
+def test_VectorEnv_autoreset():
+    env = VectorEnv(2, seed=0, frame_skip=10, max_ticks=50)
+    env.reset()
+    for _ in range(4):
+        _, _, dones = env.step(np.zeros(2, np.int64))
+        assert not dones.any()
+    _, _, dones = env.step(np.zeros(2, np.int64))
+    assert dones.all()
+    assert [game.seed for game in env.games] == [2, 3]
+    assert [game.ticks for game in env.games] == [0, 0]
+
+
+def test_VectorEnv_map():
+    env = VectorEnv(2, seed=0, map_path="src/maps/fork.txt")
+    env.reset()
+    env.step(np.zeros(2, np.int64))
+    assert env.games[0].road.map is not env.games[1].road.map
@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+from simulation import Simulation
+
+'''
+Тестируем класс WaveScheduler
+новые враги не должны накладываться друг на друга без проверок при появлении,
+а появления одного тика должны создаваться одной пачкой
+'''
+
+def test_WaveScheduler_events_in_order():
+    game = Simulation(seed=1)
+    waves = game.enemies.waves
+    game.statistic.level = 7
+    events = [next(waves.events) for _ in range(500)]
+    ticks = [tick for tick, _, _ in events]
+    assert ticks == sorted(ticks)
+    assert all(0 <= unit_level <= 14 for _, unit_level, _ in events)
+    assert {slot for _, _, slot in events} == set(range(len(game.enemies.slots)))
+
+
+def test_WaveScheduler_rate_follows_level():
+    game = Simulation(seed=2)
+    waves = game.enemies.waves
+    spawned = sum(len(waves.due()[0]) for _ in range(20000))
+    # в среднем level/101 появлений за тик
+    assert spawned == pytest.approx(20000 / 101, rel=0.2)
+
+
+@pytest.mark.parametrize('level', [3, 40, 400])
+def test_WaveScheduler_no_overlap(level):
+    game = Simulation(seed=3)
+    game.statistic.level = level
+    enemies = game.enemies
+    batches = []
+    spawn_batch = enemies.spawn_batch
+    enemies.spawn_batch = lambda levels, slots: (batches.append(len(levels)), spawn_batch(levels, slots))
+    for _ in range(1500):
+        enemies.update()
+        store = enemies.enemies
+        sizes = enemies.sprite_sizes[store.sprite]
+        dx = np.abs(store.x[:, None] - store.x[None, :]) * 2 < sizes[:, 0][:, None] + sizes[:, 0][None, :]
+        dy = np.abs(store.y[:, None] - store.y[None, :]) * 2 < sizes[:, 1][:, None] + sizes[:, 1][None, :]
+        overlap = dx & dy
+        np.fill_diagonal(overlap, False)
+        assert not overlap.any()
+    assert len(enemies) > 0
+    # больше одного появления за тик бывает, когда поток чаще одного врага за тик
+    assert (max(batches) > 1) == (level > 101)
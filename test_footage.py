@@ -0,0 +1,75 @@
+import threading
+import pygame
+import footage
+from footage import FrameRecorder, FrameReader, render_headless, KEY_EVERY, TO_BYTES
+from render import StaticLayer
+from replay import ReplayRecorder, Replay
+from simulation import Simulation
+
+'''
+Тестируем запись кадров
+записанные кадры должны читаться без потерь,
+а при полной очереди кадры пропускаются без ожидания
+'''
+
+def test_footage_roundtrip(tmp_path):
+    path = tmp_path / "frames.tdv"
+    surface = pygame.Surface((40, 30))
+    recorder = FrameRecorder(path, surface.get_size())
+    expected = []
+    for i in range(KEY_EVERY + 10):
+        surface.fill((i, 2 * i, 0), pygame.Rect(i % 40, 0, 3, 30))
+        recorder.capture(surface, i * 5, block=True)
+        expected.append(TO_BYTES(surface, "RGB"))
+    recorder.close()
+    reader = FrameReader(path)
+    frames = list(reader)
+    assert reader.size == (40, 30)
+    assert [frame[3] for frame in frames] == expected
+    assert [frame[:2] for frame in frames] == [(i, i * 5) for i in range(KEY_EVERY + 10)]
+    assert TO_BYTES(reader.surface(frames[-1][3]), "RGB") == expected[-1]
+
+
+def test_footage_drops_when_busy(tmp_path, monkeypatch):
+    release = threading.Event()
+    compress = footage.zlib.compress
+    monkeypatch.setattr(footage.zlib, "compress", lambda data, level: (release.wait(), compress(data, level))[1])
+    path = tmp_path / "frames.tdv"
+    surface = pygame.Surface((8, 8))
+    recorder = FrameRecorder(path, (8, 8), max_queue=1)
+    assert recorder.capture(surface)
+    while not recorder.queue.empty():
+        pass
+    results = [recorder.capture(surface) for _ in range(4)]
+    release.set()
+    recorder.close()
+    assert results == [True, False, False, False]
+    assert (recorder.captured, recorder.dropped, recorder.written) == (5, 3, 2)
+    assert [frame[0] for frame in FrameReader(path)] == [0, 1]
+
+
+def test_footage_headless(tmp_path):
+    path = tmp_path / "game.tdv"
+    recorder = render_headless(path, 60, seed=2, frame_skip=6, level=20)
+    frames = list(FrameReader(path))
+    assert recorder.dropped == 0
+    assert [frame[1] for frame in frames] == list(range(6, 61, 6))
+    assert frames[0][3] != frames[-1][3]
+
+
+def test_footage_replay_clicks_on_time(tmp_path):
+    record = tmp_path / "game.tdr"
+    recorder = ReplayRecorder(record, 3)
+    recorder.record(4, Simulation.LEFT, (400, 230))
+    recorder.record(17, Simulation.LEFT, (600, 480))
+    recorder.record(23, Simulation.LEFT, (400, 230))
+    recorder.close(200)
+    replay = Replay.load(record)
+    path = tmp_path / "game.tdv"
+    render_headless(path, 200, frame_skip=7, replay=replay)
+    frames = list(FrameReader(path))
+    assert [frame[1] for frame in frames] == list(range(7, 200, 7)) + [200]
+    game = replay.play(Simulation(screen=pygame.Surface((1000, 600)), seed=replay.seed), 196)
+    StaticLayer((1000, 600), (50,205,50)).drow(game)
+    game.drow_dynamic()
+    assert frames[-2][3] == TO_BYTES(game.screen, "RGB")
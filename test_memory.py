@@ -0,0 +1,35 @@
+import pytest
+from characters import Defense
+from simulation import Simulation
+from memory import entity_sizes, session_memory, format_report
+
+'''
+Тестируем отчет о памяти
+сооружения не должны держать собственных словарей, цветов и подписей,
+а занятая память долгой игры не должна расти
+'''
+
+def test_Defense_shares_level_tables():
+    game = Simulation(seed=0)
+    defenses = game.defenses
+    first = Defense(500, 230, defenses.sprites, game.road.y, defenses.flipped_sprites)
+    second = Defense(700, 230, defenses.sprites, game.road.y, defenses.flipped_sprites)
+    assert not hasattr(first, "__dict__")
+    assert first.caption is second.caption
+    assert first.get_caption()[0] is second.get_caption()[0]
+    assert first.sprites is second.sprites
+
+
+def test_entity_sizes():
+    sizes = entity_sizes()
+    assert sizes["enemy"] == 100
+    assert sizes["bullet"] == 37
+    assert sizes["tower"] < 256
+    assert "tower" in format_report(sizes, [])
+
+
+def test_session_memory_flat():
+    samples = session_memory(ticks=4000, level=60, sample_every=1000)
+    traced = [current for _, current, _, _ in samples[1:]]
+    assert max(traced) - min(traced) < 16 * 1024
+    assert max(enemies for _, _, enemies, _ in samples) > 10
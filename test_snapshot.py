@@ -0,0 +1,98 @@
+import pytest
+from simulation import Simulation
+from snapshot import dumps, loads, save, load
+from balance import run_game
+from game import load_autosave
+
+'''
+Тестируем снимки состояния игры
+загруженная игра должна продолжаться так же, как исходная
+'''
+
+def late_game(seed):
+    game = Simulation(seed=seed)
+    game.statistic.update_money(10**6)
+    for x in range(250, 1000, 70):
+        game.click(Simulation.LEFT, (x, 242))
+        game.click(Simulation.LEFT, (x, 462))
+    game.click(Simulation.LEFT, (250, 242))
+    game.statistic.level = 40
+    game.step(1000)
+    return game
+
+
+def state(game):
+    store = game.enemies.enemies
+    projectiles = game.defenses.projectiles.store
+    return (
+        game.ticks,
+        game.tower.health,
+        game.statistic.score,
+        game.statistic.money,
+        game.statistic.level,
+        [(unit.sprite_rect.center, unit.level, unit.wait, unit.sprite) for unit in game.defenses.defenses],
+        [getattr(store, name).tolist() for name, _ in store.FIELDS],
+        [getattr(projectiles, name).tolist() for name, _ in projectiles.FIELDS])
+
+
+def test_snapshot_roundtrip():
+    game = late_game(4)
+    assert len(game.enemies) > 0 and len(game.defenses.projectiles) > 0
+    loaded = loads(dumps(game))
+    assert state(loaded) == state(game)
+    assert loaded.defenses.defenses[0].level == 3
+    game.step(1500)
+    loaded.step(1500)
+    assert state(loaded) == state(game)
+
+
+def test_snapshot_file(tmp_path):
+    game = late_game(5)
+    path = str(tmp_path / "game.tds")
+    save(game, path)
+    assert state(load(path)) == state(game)
+
+
+def test_snapshot_bad_file():
+    with pytest.raises(ValueError):
+        loads(b"TDRP" + bytes(100))
+
+
+def test_snapshot_balance(tmp_path):
+    path = str(tmp_path / "game.tds")
+    game = late_game(6)
+    save(game, path)
+    result = run_game((1, "line", 250, 125, path))
+    assert result["ticks"] == game.ticks + 250
+    assert len(result["money_curve"]) == 2
+    assert result == run_game((1, "line", 250, 125, path))
+
+
+def test_snapshot_keeps_defense_kinds():
+    game = Simulation(seed=6)
+    game.statistic.update_money(10**6)
+    for x in range(250, 1000, 70):
+        game.click(Simulation.WHEEL_DOWN, (0, 0))
+        game.click(Simulation.LEFT, (x, 242))
+    game.statistic.level = 40
+    game.step(800)
+    loaded = loads(dumps(game))
+    assert [type(unit) for unit in loaded.defenses.defenses] == [type(unit) for unit in game.defenses.defenses]
+    assert loaded.defenses.kind == game.defenses.kind
+    game.step(800)
+    loaded.step(800)
+    assert state(loaded) == state(game)
+
+
+def test_autosave_bad_file_starts_new_game(tmp_path):
+    path = tmp_path / "kiosk.tds"
+    assert load_autosave(path, None) is None
+    game = late_game(2)
+    save(game, path)
+    assert load_autosave(path, None).ticks == game.ticks
+    path.write_bytes(path.read_bytes()[:200])
+    with pytest.warns(UserWarning):
+        assert load_autosave(path, None) is None
+    path.write_bytes(b"TDSS\x01")
+    with pytest.warns(UserWarning):
+        assert load_autosave(path, None) is None
@@ -0,0 +1,93 @@
+import math
+
+'''
+Расписание появления врагов.
+События (тик, уровень врага, слот появления) выдаются генератором лениво,
+по одному вперед, так что расписание не хранится целиком и сразу
+учитывает текущий уровень игры. Слоты появления закреплены за местами
+на входе дороги, и новый враг в слоте появляется только когда предыдущий
+враг этого слота отошел на свой размер, поэтому проверять наложение
+новых врагов на остальных не нужно
+'''
+
+
+class WaveScheduler:
+    '''
+    Расписание волн для списка врагов.
+    Появления идут потоком Пуассона со средним level/101 врагов за тик,
+    как прежняя проверка randint(0,100) < level каждый тик, но за один тик
+    может появиться несколько врагов, и все они создаются одной пачкой.
+    Если свободного слота нет, событие сдвигается на тик, когда
+    освободится ближайший слот, и отсчет следующих событий идет от него
+
+    Args:
+        enemies (Enemies): враги, для которых строится расписание.
+            Используются statistic.level, speed, rng, sprites, sprite_sizes и slots
+
+    Attributes:
+        enemies (Enemies): враги
+        tick (int): номер текущего тика расписания
+        time (float): время последнего события в тиках, от него отсчитывается следующее
+        slot_free (list): для каждого слота тик, с которого он снова свободен
+        pending (tuple): следующее событие (тик, уровень, слот), уже выданное генератором
+        events (generator): генератор событий
+    '''
+    def __init__(self, enemies) -> None:
+
+        self.enemies = enemies
+        self.tick = 0
+        self.time = 0.0
+        self.slot_free = [0] * len(enemies.slots)
+        self.pending = None
+        self.events = self.generate()
+
+
+    def generate(self):
+        '''
+        Бесконечный генератор событий. Все его состояние лежит в атрибутах,
+        поэтому после восстановления атрибутов из снимка новый генератор
+        продолжает то же расписание
+        Yields:
+            tuple: (тик, уровень врага, слот появления)
+        '''
+        enemies = self.enemies
+        rng = enemies.rng
+        slot_free = self.slot_free
+        # слот освобождается, когда враг отошел на наибольший размер спрайта
+        size = float(enemies.sprite_sizes.max())
+        while True:
+            level = enemies.statistic.level
+            self.time += rng.expovariate(level / 101)
+            tick = math.ceil(self.time)
+            max_lvl = min(len(enemies.sprites)-1, level*2)
+            unit_level = rng.randint(0, max_lvl)
+            free = [slot for slot, free_at in enumerate(slot_free) if free_at <= tick]
+            if free:
+                slot = free[rng.randrange(len(free))]
+            else:
+                slot = min(range(len(slot_free)), key=slot_free.__getitem__)
+                tick = slot_free[slot]
+                self.time = float(tick)
+            slot_free[slot] = tick + math.ceil(size / enemies.speed)
+            yield tick, unit_level, slot
+
+
+    def due(self) -> tuple:
+        '''
+        События текущего тика, после вызова расписание переходит к следующему тику
+        Returns:
+            tuple: (уровни врагов, слоты появления), пустые списки если появлений нет
+        '''
+        tick = self.tick
+        self.tick += 1
+        levels = []
+        slots = []
+        while True:
+            if self.pending is None:
+                self.pending = next(self.events)
+            event_tick, unit_level, slot = self.pending
+            if event_tick > tick:
+                return levels, slots
+            levels.append(unit_level)
+            slots.append(slot)
+            self.pending = None